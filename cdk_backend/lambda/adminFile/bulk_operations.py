@@ -0,0 +1,432 @@
+"""
+Bulk document operations: archive import and batch delete.
+
+Archive import
+  POST /bulk/archives            {filename, size[, folder]}
+      → {job_id, ...upload session} (upload_sessions.py) into the staging bucket
+  (browser)                      PUT the parts, as for a single document
+  POST /bulk/archives/complete   {job_id, upload_id, parts}
+  POST /bulk/archives/abort      {job_id, upload_id}
+  GET  /bulk/jobs/{job_id}       status, counts, skipped entries
+The staging bucket is not a knowledge base data source, so the archive
+itself is never indexed. Its ObjectCreated event invokes this Lambda,
+which expands it into the KB bucket (expand_archive):
+  - .tar, .tar.gz and .tgz are read as a single forward stream (tarfile "r|*")
+  - a .zip keeps its index at the end. S3RangeReader gives zipfile a
+    seekable view built from ranged GETs, and members are read in file
+    order so the reads keep moving forward
+  - each entry is decompressed PART_SIZE at a time. Entries larger than
+    that become multipart uploads whose parts go up UPLOAD_WORKERS at a
+    time, and at most UPLOAD_WORKERS * 2 parts are buffered
+  - entries are checked like single uploads (name, type, size).
+    Hidden files and folders (".*", "__MACOSX/") are ignored. Content
+    identical to the stored object is not written again
+An archive may hold at most MAX_ENTRIES entries and MAX_EXPANDED_BYTES
+of content.
+
+Batch delete
+  POST /bulk/delete  {keys: [...]} or {prefix: "folder/"}
+removes up to MAX_DELETE_KEYS documents, DELETE_BATCH per delete_objects call.
+
+Both operations hold the kb-sync ingestion scheduler while they write,
+and release it afterwards (kb-sync/ingestion.py). The whole operation
+is therefore indexed by one ingestion job.
+
+Job item (NCMWBulkJobs):
+  job_id       PK
+  status       uploading | queued | expanding | done | failed
+  archive_key  staging bucket key; folder is the KB prefix entries go under
+  counts       {uploaded, unchanged, skipped, ignored, failed}
+  skipped      first MAX_REPORTED skipped entries {key, reason}; errors likewise
+  complete     False if the import stopped early (limits, time)
+  created_at, updated_at, expires_at (TTL)
+"""
+
+import hashlib
+import posixpath
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from base64 import b64encode
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from botocore.exceptions import ClientError
+
+import upload_sessions
+from upload_sessions import PART_SIZE, UploadError
+
+ARCHIVE_TYPES = {
+    ".zip": "application/zip",
+    ".tar": "application/x-tar",
+    ".tgz": "application/gzip",
+    ".gz":  "application/gzip",     # .tar.gz only (archive_name)
+}
+STAGING_PREFIX = "archives/"
+UPLOAD_WORKERS = 8
+RANGE_BLOCK = 8 * 1024 * 1024
+MAX_ENTRIES = 5000
+MAX_EXPANDED_BYTES = 10 * 1024 ** 3
+MAX_REPORTED = 50
+PROGRESS_EVERY = 25
+DELETE_BATCH = 1000                 # delete_objects limit
+MAX_DELETE_KEYS = 10000
+JOB_TTL_SECONDS = 7 * 24 * 3600
+
+
+def archive_name(filename: str) -> str:
+    name = posixpath.basename(upload_sessions.validate_key(filename))
+    upload_sessions.content_type_for(name, "", ARCHIVE_TYPES)
+    if name.lower().endswith(".gz") and not name.lower().endswith(".tar.gz"):
+        raise UploadError("Only .tar.gz archives may be gzip-compressed")
+    return name
+
+
+def validate_folder(folder) -> str:
+    folder = (folder or "").strip().strip("/")
+    return upload_sessions.validate_key(folder) + "/" if folder else ""
+
+
+def entry_key(folder: str, name: str):
+    """KB key for an archive entry; None for hidden files. UploadError if unusable."""
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or ".." in parts:
+        raise UploadError("Unsafe path")
+    if any(p.startswith(".") or p == "__MACOSX" for p in parts):
+        return None
+    return folder + "/".join(parts)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Reading archives
+# ──────────────────────────────────────────────────────────────────────────────
+class S3RangeReader:
+    """Read-only, seekable file over one version (ETag) of an S3 object, read RANGE_BLOCK at a time."""
+
+    def __init__(self, s3, bucket: str, key: str, size: int, etag: str, block: int = RANGE_BLOCK):
+        self.s3, self.bucket, self.key = s3, bucket, key
+        self.size, self.etag, self.block = size, etag, block
+        self.pos = 0
+        self._start, self._data = 0, b""
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        base = {0: 0, 1: self.pos, 2: self.size}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self.pos
+        chunks = []
+        while n > 0 and self.pos < self.size:
+            if not self._start <= self.pos < self._start + len(self._data):
+                end = min(self.size, self.pos + self.block) - 1
+                self._data = self.s3.get_object(
+                    Bucket=self.bucket, Key=self.key, Range=f"bytes={self.pos}-{end}", IfMatch=self.etag,
+                )["Body"].read()
+                self._start = self.pos
+            chunk = self._data[self.pos - self._start:self.pos - self._start + n]
+            chunks.append(chunk)
+            self.pos += len(chunk)
+            n -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        self._data = b""
+
+
+def iter_entries(s3, bucket: str, key: str):
+    """
+    (name, size, stream) for each regular file in the archive. stream is
+    None for a zip member that cannot be read (encrypted, unknown method).
+    Each stream must be consumed before asking for the next entry.
+    """
+    if key.lower().endswith(".zip"):
+        head = s3.head_object(Bucket=bucket, Key=key)
+        with zipfile.ZipFile(S3RangeReader(s3, bucket, key, head["ContentLength"], head["ETag"])) as archive:
+            for info in sorted(archive.infolist(), key=lambda i: i.header_offset):
+                if info.is_dir():
+                    continue
+                try:
+                    stream = archive.open(info)
+                except (NotImplementedError, RuntimeError):
+                    yield info.filename, info.file_size, None
+                    continue
+                with stream:
+                    yield info.filename, info.file_size, stream
+        return
+
+    body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+    with tarfile.open(fileobj=body, mode="r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, member.size, archive.extractfile(member)
+
+
+def _read_exact(stream, n: int) -> bytes:
+    chunks, left = [], n
+    while left > 0:
+        chunk = stream.read(left)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        left -= len(chunk)
+    return b"".join(chunks)
+
+
+def _done(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Writing entries
+# ──────────────────────────────────────────────────────────────────────────────
+class EntryUploader:
+    """
+    Streams entries into the KB bucket. Small entries are single PUTs with a
+    SHA-256 checksum, run in the background; larger ones are multipart
+    uploads whose parts are sent in parallel while the entry is still being
+    read. The slots semaphore bounds the parts held in memory.
+    """
+
+    def __init__(self, s3, bucket: str, max_bytes: int, workers: int = UPLOAD_WORKERS):
+        self.s3, self.bucket, self.max_bytes = s3, bucket, max_bytes
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers * 2)
+        self.bytes_read = 0
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def _submit(self, fn, *args) -> Future:
+        self.slots.acquire()
+        future = self.pool.submit(fn, *args)
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def upload(self, key: str, stream, content_type: str, unchanged) -> Future:
+        """
+        Future of "uploaded" or "unchanged". unchanged(key, sha256_hex) tells
+        whether the KB already holds that content; it runs on this thread.
+        """
+        first = self._read(stream)
+        if not first:
+            raise UploadError("File is empty")
+        second = self._read(stream) if len(first) == PART_SIZE else b""
+        if not second:
+            if len(first) > self.max_bytes:
+                raise UploadError(f"File is over the {self.max_bytes} byte limit")
+            digest = hashlib.sha256(first).digest()
+            if unchanged(key, digest.hex()):
+                return _done("unchanged")
+            return self._submit(self._put, key, first, content_type, digest)
+        return _done(self._multipart(key, stream, content_type, [first, second], unchanged))
+
+    def _read(self, stream) -> bytes:
+        chunk = _read_exact(stream, PART_SIZE)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def _put(self, key, data, content_type, digest) -> str:
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type,
+                           ChecksumSHA256=b64encode(digest).decode("ascii"))
+        return "uploaded"
+
+    def _part(self, key, upload_id, number, data) -> str:
+        return self.s3.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                   PartNumber=number, Body=data)["ETag"]
+
+    def _multipart(self, key, stream, content_type, buffered, unchanged) -> str:
+        upload_id = self.s3.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type,
+        )["UploadId"]
+        sha, total, parts = hashlib.sha256(), 0, []
+        try:
+            while True:
+                chunk = buffered.pop(0) if buffered else self._read(stream)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > self.max_bytes:
+                    raise UploadError(f"File is over the {self.max_bytes} byte limit")
+                sha.update(chunk)
+                parts.append(self._submit(self._part, key, upload_id, len(parts) + 1, chunk))
+            etags = [{"PartNumber": n, "ETag": part.result()} for n, part in enumerate(parts, 1)]
+            # Hashed on the way through; identical content is dropped before it becomes an object
+            if unchanged(key, sha.hexdigest()):
+                self.s3.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+                return "unchanged"
+            self.s3.complete_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id,
+                                              MultipartUpload={"Parts": etags})
+            return "uploaded"
+        except BaseException:
+            wait(parts)
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+
+def expand_archive(s3, staging_bucket: str, archive_key: str, kb_bucket: str, folder: str, *,
+                   max_bytes: int, unchanged, progress, deadline: float) -> dict:
+    """
+    Expand one staged archive into kb_bucket under folder. No entry is
+    started after deadline (epoch seconds). progress(report) is called
+    every PROGRESS_EVERY entries. A corrupt archive raises once the entries
+    already sent have finished.
+    """
+    report = {
+        "counts": {"uploaded": 0, "unchanged": 0, "skipped": 0, "ignored": 0, "failed": 0},
+        "skipped": [], "errors": [], "complete": True,
+    }
+    uploader = EntryUploader(s3, kb_bucket, max_bytes)
+    in_flight = []
+
+    def note(outcome, name, reason):
+        report["counts"][outcome] += 1
+        listed = report["skipped" if outcome == "skipped" else "errors"]
+        if len(listed) < MAX_REPORTED:
+            listed.append({"key": name, "reason": reason})
+
+    def stop(reason):
+        report["complete"] = False
+        report["errors"].append({"key": None, "reason": reason})
+
+    def settle(all_of_them: bool):
+        for key, future in list(in_flight):
+            if all_of_them or future.done():
+                in_flight.remove((key, future))
+                try:
+                    report["counts"][future.result()] += 1
+                except Exception as exc:
+                    note("failed", key, str(exc))
+
+    entries = 0
+    try:
+        for name, size, stream in iter_entries(s3, staging_bucket, archive_key):
+            if time.time() > deadline:
+                stop(f"Time limit reached at {name}; it and the entries after it were not imported")
+                break
+            entries += 1
+            if entries > MAX_ENTRIES:
+                stop(f"Archive has more than {MAX_ENTRIES} entries; the rest were not imported")
+                break
+            try:
+                key = entry_key(folder, name)
+                if key is None:
+                    report["counts"]["ignored"] += 1
+                    continue
+                if stream is None:
+                    raise UploadError("Encrypted, or compressed with an unsupported method")
+                content_type = upload_sessions.content_type_for(key, "")
+                upload_sessions.check_size(size, max_bytes)
+                in_flight.append((key, uploader.upload(key, stream, content_type, unchanged)))
+            except UploadError as exc:
+                note("skipped", name, str(exc))
+            except ClientError as exc:
+                note("failed", name, str(exc))
+            if uploader.bytes_read > MAX_EXPANDED_BYTES:
+                stop(f"Archive expands past {MAX_EXPANDED_BYTES} bytes; the rest was not imported")
+                break
+            settle(False)
+            if entries % PROGRESS_EVERY == 0:
+                progress(report)
+    finally:
+        settle(True)
+        uploader.close()
+    return report
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Batch delete
+# ──────────────────────────────────────────────────────────────────────────────
+def keys_under(s3, bucket: str, prefix: str, limit: int = MAX_DELETE_KEYS) -> list:
+    if not prefix.strip("/"):
+        raise ValueError("prefix must name a folder; the whole bucket cannot be deleted at once")
+    keys = []
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        keys += [obj["Key"] for obj in page.get("Contents", [])]
+        if len(keys) > limit:
+            raise ValueError(f"More than {limit} documents under {prefix}; delete a narrower folder")
+    return keys
+
+
+def delete_keys(s3, bucket: str, keys: list) -> dict:
+    """delete_objects DELETE_BATCH keys at a time; {"deleted", "errors": [{key, code, message}]}."""
+    deleted, errors = 0, []
+    for start in range(0, len(keys), DELETE_BATCH):
+        batch = keys[start:start + DELETE_BATCH]
+        resp = s3.delete_objects(
+            Bucket=bucket,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+        )
+        failed = resp.get("Errors", [])
+        deleted += len(batch) - len(failed)
+        errors += [{"key": e["Key"], "code": e.get("Code"), "message": e.get("Message")} for e in failed]
+    return {"deleted": deleted, "errors": errors}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Job records
+# ──────────────────────────────────────────────────────────────────────────────
+class BulkJobs:
+    def __init__(self, table):
+        self.table = table
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def create(self, job_id: str, **fields) -> dict:
+        now = int(time.time())
+        item = {"job_id": job_id, **fields, "created_at": now, "updated_at": now,
+                "expires_at": now + JOB_TTL_SECONDS}
+        self.table.put_item(Item=item)
+        return item
+
+    def get(self, job_id: str):
+        return self.table.get_item(Key={"job_id": job_id}, ConsistentRead=True).get("Item")
+
+    def update(self, job_id: str, expect=None, **fields) -> bool:
+        """Set fields; with expect, only while status is one of those (False if not)."""
+        fields["updated_at"] = int(time.time())
+        names = {f"#{name}": name for name in fields}
+        values = {f":{name}": value for name, value in fields.items()}
+        kwargs = {}
+        if expect:
+            kwargs["ConditionExpression"] = "#status IN (" + ", ".join(f":was{i}" for i in range(len(expect))) + ")"
+            names["#status"] = "status"
+            values.update({f":was{i}": status for i, status in enumerate(expect)})
+        try:
+            self.table.update_item(
+                Key={"job_id": job_id},
+                UpdateExpression="SET " + ", ".join(f"#{name} = :{name}" for name in fields),
+                ExpressionAttributeNames=names, ExpressionAttributeValues=values, **kwargs,
+            )
+            return True
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+
+def staging_key(job_id: str, name: str) -> str:
+    return f"{STAGING_PREFIX}{job_id}/{name}"
+
+
+def job_id_of(key: str):
+    """Job id from a staging key, or None for keys this feature did not write."""
+    if not key.startswith(STAGING_PREFIX):
+        return None
+    job_id = key[len(STAGING_PREFIX):].split("/", 1)[0]
+    return job_id or None
@@ -0,0 +1,149 @@
+"""
+Admin document listing, served from the knowledge base content manifest.
+
+kb-sync updates NCMWKbContentManifest (one item per object key) as S3
+events arrive. Current objects carry listing = "live", so the sparse
+ListingIndex GSI (listing, object_key) holds exactly the bucket's keys in
+name order. A listing therefore never calls S3 and is not capped at 1000
+keys.
+
+  prefix   keys starting with it (recursive; relative to folder if both given)
+  folder   direct children of a folder only ("" = top level). Subfolders are
+           returned once each in "folders", like S3's Delimiter="/". The
+           keys inside a subfolder are skipped over with a single query.
+  sort     name (default) | size | last_modified, order asc | desc
+  limit    page size, at most MAX_PAGE
+  cursor   next_cursor of the previous page
+
+Name order pages straight off the index. The cursor holds the position of
+the last entry returned, and the next page resumes after it. Size and date
+order need the whole selection, which is read and sorted in memory; that
+cursor is an offset. Either way the cursor records which query it belongs
+to, and is rejected for any other.
+"""
+
+import base64
+import json
+
+LISTING_INDEX = "ListingIndex"
+LIVE = "live"
+DEFAULT_PAGE, MAX_PAGE = 100, 1000
+SORTS = ("name", "size", "last_modified")
+# Sorts after every key that starts with a given folder
+AFTER_FOLDER = "\U0010ffff"
+
+
+def _encode_cursor(query: list, **position) -> str:
+    raw = json.dumps({"q": query, **position}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, query: list) -> dict:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if position.get("q") != query:
+        raise ValueError("Cursor belongs to a different listing")
+    return position
+
+
+def _file(item: dict) -> dict:
+    return {
+        "key": item["object_key"],
+        "size": int(item.get("size", 0)),
+        "last_modified": item.get("last_modified", ""),
+    }
+
+
+class FileIndex:
+    def __init__(self, table):
+        self.table = table
+
+    def _keys(self, prefix: str, ascending: bool, start_after, page: int):
+        """Index items under prefix in name order, resuming after start_after."""
+        kwargs = {
+            "IndexName": LISTING_INDEX,
+            "KeyConditionExpression": "listing = :live" + (" AND begins_with(object_key, :prefix)" if prefix else ""),
+            "ExpressionAttributeValues": {":live": LIVE, **({":prefix": prefix} if prefix else {})},
+            "ScanIndexForward": ascending,
+            "Limit": page,
+        }
+        if start_after is not None:
+            kwargs["ExclusiveStartKey"] = {"listing": LIVE, "object_key": start_after}
+        while True:
+            resp = self.table.query(**kwargs)
+            yield from resp.get("Items", [])
+            if "LastEvaluatedKey" not in resp:
+                return
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def _walk(self, folder, prefix: str, ascending: bool, start_after=None, page: int = DEFAULT_PAGE):
+        """
+        (position, entry) in name order. With a folder, keys in subfolders
+        collapse into one {"folder": ...} entry and the rest of that subfolder
+        is skipped by restarting the query past it.
+        """
+        scope = (folder or "") + prefix
+        while True:
+            jumped = False
+            for item in self._keys(scope, ascending, start_after, page):
+                key = item["object_key"]
+                if folder is None:
+                    yield key, _file(item)
+                    continue
+                rest = key[len(folder):]
+                if not rest:
+                    continue  # the folder's own placeholder object
+                if "/" not in rest:
+                    yield key, _file(item)
+                    continue
+                sub = folder + rest.split("/", 1)[0] + "/"
+                # Ascending, everything in sub sorts before sub + AFTER_FOLDER;
+                # descending, everything in sub sorts after sub itself
+                start_after = sub + AFTER_FOLDER if ascending else sub
+                yield start_after, {"folder": sub}
+                jumped = True
+                break
+            if not jumped:
+                return
+
+    def list_files(self, prefix: str = "", folder=None, sort: str = "name", order: str = "asc",
+                   limit: int = DEFAULT_PAGE, cursor=None) -> dict:
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be asc or desc")
+        if folder and not folder.endswith("/"):
+            folder += "/"
+        limit = max(1, min(int(limit), MAX_PAGE))
+        ascending = order == "asc"
+        query = [prefix, folder, sort, order]
+        position = _decode_cursor(cursor, query) if cursor else {}
+
+        if sort == "name":
+            entries, next_cursor = [], None
+            walk = self._walk(folder, prefix, ascending, position.get("after"), page=limit + 1)
+            for pos, entry in walk:
+                if len(entries) == limit:
+                    # One more exists – the page ends at the previous entry
+                    next_cursor = _encode_cursor(query, after=last)
+                    break
+                entries.append(entry)
+                last = pos
+        else:
+            # Folders first by name, then files by the requested field (name breaks ties)
+            everything = [entry for _, entry in self._walk(folder, prefix, True, page=MAX_PAGE)]
+            folders = [e for e in everything if "folder" in e]
+            files = sorted((e for e in everything if "key" in e),
+                           key=lambda f: (f[sort], f["key"]), reverse=not ascending)
+            offset = int(position.get("offset", 0))
+            entries = (folders + files)[offset:offset + limit]
+            more = offset + limit < len(folders) + len(files)
+            next_cursor = _encode_cursor(query, offset=offset + limit) if more else None
+
+        return {
+            "files": [e for e in entries if "key" in e],
+            "folders": [e["folder"] for e in entries if "folder" in e],
+            "next_cursor": next_cursor,
+        }
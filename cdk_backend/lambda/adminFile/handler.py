@@ -1,21 +1,49 @@
+import hashlib
 import json
 import os
+import re
+import time
 import urllib.parse
 from base64 import b64decode, b64encode
+from contextlib import contextmanager
 from datetime import datetime
 
 import boto3
 from botocore.exceptions import ClientError
 
+import bulk_operations
+import upload_sessions
+from bulk_operations import BulkJobs
+from file_index import FileIndex
+from upload_sessions import UploadError
+
 # ──────────────────────────────────────────────────────────────────────────────
 #  AWS clients & env
 # ──────────────────────────────────────────────────────────────────────────────
 s3            = boto3.client("s3")
-bedrock_agent = boto3.client("bedrock-agent")
+lambda_client = boto3.client("lambda")
+ddb           = boto3.resource("dynamodb")
 
 BUCKET_NAME       = os.environ["BUCKET_NAME"]
-KNOWLEDGE_BASE_ID = os.environ["KNOWLEDGE_BASE_ID"]
-DATA_SOURCE_ID    = os.environ["DATA_SOURCE_ID"]
+# Uploads and deletes reach the KB through S3 events → kb-sync's ingestion scheduler
+KB_SYNC_FUNCTION  = os.environ["KB_SYNC_FUNCTION_NAME"]
+# SHA-256 per object key, kept by kb-sync (content_manifest.py); also the listing index
+content_manifest  = ddb.Table(os.environ["CONTENT_MANIFEST_TABLE"])
+file_index        = FileIndex(content_manifest)
+# Largest document accepted through an upload session
+MAX_UPLOAD_BYTES  = int(os.environ.get("MAX_UPLOAD_MB", "100")) * 1024 * 1024
+# Downloads are presigned GETs valid this long; previews read at most this much
+DOWNLOAD_URL_EXPIRY = 300
+PREVIEW_MAX_BYTES   = 1024 * 1024
+TEXT_TYPES          = ("text/", "application/json", "application/xml")
+# Archives are staged outside the KB bucket and expanded into it (bulk_operations.py)
+STAGING_BUCKET    = os.environ["STAGING_BUCKET_NAME"]
+bulk_jobs         = BulkJobs(ddb.Table(os.environ["BULK_JOBS_TABLE"]))
+MAX_ARCHIVE_BYTES = int(os.environ.get("MAX_ARCHIVE_MB", "2048")) * 1024 * 1024
+# An import cut off by the timeout continues in a fresh invocation at most this often
+MAX_ARCHIVE_RESUMES = 3
+# A batch delete holds ingestion at most this long
+DELETE_HOLD_SECONDS = 120
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  CORS
@@ -61,6 +89,27 @@ def _extract_key(raw_path: str, path_parameters: dict) -> str:
     return urllib.parse.unquote_plus(key)
 
 
+def _stored_sha256(key: str):
+    """
+    Hex SHA-256 of the object currently at key, or None if unknown: the
+    object's own checksum if it was uploaded with one, else the manifest
+    entry as long as it describes this very object (same ETag).
+    """
+    try:
+        head = s3.head_object(Bucket=BUCKET_NAME, Key=key, ChecksumMode="ENABLED")
+    except ClientError as err:
+        if err.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    checksum = head.get("ChecksumSHA256")
+    if checksum and "-" not in checksum:
+        return b64decode(checksum).hex()
+    item = content_manifest.get_item(Key={"object_key": key}).get("Item") or {}
+    if not item.get("deleted") and item.get("etag") == head["ETag"].strip('"'):
+        return item.get("sha256")
+    return None
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 #  Lambda entry-point
 # ──────────────────────────────────────────────────────────────────────────────
@@ -70,6 +119,10 @@ def lambda_handler(event, context):
     log("Resource                   :", event.get("resource"))
     log("Path                       :", event.get("path") or event.get("rawPath"))
 
+    # ── Staged archive uploaded → expand it into the KB bucket ───────────
+    if event.get("Records"):
+        return handle_archive_events(event["Records"], context)
+
     # ── Detect API flavour ────────────────────────────────────────────────
     if "httpMethod" in event:      # REST API
         http_method     = event["httpMethod"]
@@ -91,20 +144,17 @@ def lambda_handler(event, context):
     # ── Route dispatch ───────────────────────────────────────────────────
     try:
         if raw_path == "/files" and http_method == "GET":
-            return handle_list_files()
+            return handle_list_files(event.get("queryStringParameters") or {})
 
         if raw_path == "/files" and http_method == "POST":
-            out = handle_upload_file(event)
-            sync_knowledge_base()
-            return out
+            return handle_upload_file(event)
 
         if raw_path.startswith("/files/") and http_method == "GET":
-            return handle_download_file(raw_path, path_parameters)
+            return handle_download_file(raw_path, path_parameters,
+                                        event.get("queryStringParameters") or {}, event.get("headers") or {})
 
         if raw_path.startswith("/files/") and http_method == "DELETE":
-            out = handle_delete_file(raw_path, path_parameters)
-            sync_knowledge_base()
-            return out
+            return handle_delete_file(raw_path, path_parameters)
 
         if raw_path == "/sync" and http_method == "POST":
             sync_result = sync_knowledge_base()
@@ -113,6 +163,12 @@ def lambda_handler(event, context):
         if raw_path == "/presigned-url" and http_method == "POST":
             return handle_presigned_url(event)
 
+        if raw_path.startswith("/uploads") and http_method == "POST":
+            return handle_upload_session(raw_path, event)
+
+        if raw_path.startswith("/bulk/"):
+            return handle_bulk(raw_path, http_method, event)
+
         log("No matching route")
         return respond(404, {"error": "Route not found"})
 
@@ -124,60 +180,333 @@ def lambda_handler(event, context):
 # ──────────────────────────────────────────────────────────────────────────────
 #  Route handlers
 # ──────────────────────────────────────────────────────────────────────────────
+def _kb_sync(payload: dict) -> dict:
+    """Call a kb-sync action synchronously; its scheduler state summary."""
+    response = lambda_client.invoke(
+        FunctionName=KB_SYNC_FUNCTION,
+        Payload=json.dumps(payload).encode("utf-8"),
+    )
+    return json.loads(json.loads(response["Payload"].read())["body"])
+
+
+@contextmanager
+def ingestion_held(operation: str, seconds: int):
+    """
+    No ingestion job starts while the block runs (at most `seconds`); on
+    exit the scheduler indexes everything written in one job. If kb-sync
+    cannot be reached the operation still runs, only without that guarantee.
+    """
+    try:
+        _kb_sync({"action": "hold", "operation": operation, "seconds": seconds})
+    except Exception as exc:
+        log("KB hold ERROR             :", exc)
+    try:
+        yield
+    finally:
+        try:
+            log("KB release                :", _kb_sync({"action": "release", "operation": operation}))
+        except Exception as exc:
+            log("KB release ERROR          :", exc)
+
+
 def sync_knowledge_base():
-    log("KB sync → start_ingestion_job()")
+    """Ask kb-sync for a sync now; it starts a job, or queues one behind a running job."""
+    log("KB sync → kb-sync request_sync")
     try:
-        response = bedrock_agent.start_ingestion_job(
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            dataSourceId=DATA_SOURCE_ID,
-        )
-        job_id = response.get("ingestionJobId")
-        log("KB sync job id            :", job_id)
-        return {"status": "success", "jobId": job_id}
+        state = _kb_sync({"action": "request_sync"})
+        log("KB sync state             :", state)
+        return {"status": "success", "jobId": state.get("ingestionJobId"), **state}
     except Exception as exc:
         log("KB sync ERROR             :", exc)
         return {"status": "error", "message": str(exc)}
 
 
-def handle_list_files():
-    log("LIST files in bucket       :", BUCKET_NAME)
+def handle_list_files(params: dict):
+    """
+    GET /files?prefix=&folder=&sort=name|size|last_modified&order=asc|desc&limit=&cursor=
+    Served from the manifest's listing index (file_index.py), never from S3.
+    """
+    log("LIST params                :", params)
     try:
-        objects = s3.list_objects_v2(Bucket=BUCKET_NAME)
-        log("S3 returned #keys          :", objects.get("KeyCount", 0))
-
-        files = [
-            {
-                "key": obj["Key"],
-                "size": obj["Size"],
-                "last_modified": obj["LastModified"].isoformat(),
-                "actions": {
-                    "download": {"method": "GET", "endpoint": f"/files/{urllib.parse.quote_plus(obj['Key'])}"},
-                    "delete":   {"method": "DELETE", "endpoint": f"/files/{urllib.parse.quote_plus(obj['Key'])}"},
-                },
-            }
-            for obj in objects.get("Contents", [])
-        ]
-        return respond(200, {"files": files, "upload": {"method": "POST", "endpoint": "/files"}, "sync": {"method": "POST", "endpoint": "/sync"}})
+        page = file_index.list_files(
+            prefix=params.get("prefix", ""),
+            folder=params.get("folder"),
+            sort=params.get("sort", "name"),
+            order=params.get("order", "asc"),
+            limit=params.get("limit", 100),
+            cursor=params.get("cursor"),
+        )
+    except ValueError as exc:
+        return respond(400, {"error": str(exc)})
     except Exception as exc:
         log("LIST error                :", exc)
         return respond(500, {"error": str(exc)})
 
+    log("LIST returned              :", len(page["files"]), "files,", len(page["folders"]), "folders")
+    for f in page["files"]:
+        endpoint = f"/files/{urllib.parse.quote_plus(f['key'])}"
+        f["actions"] = {
+            "download": {"method": "GET", "endpoint": endpoint},
+            "delete":   {"method": "DELETE", "endpoint": endpoint},
+        }
+    return respond(200, {**page, "upload": {"method": "POST", "endpoint": "/files"}, "sync": {"method": "POST", "endpoint": "/sync"}})
+
 
 def handle_upload_file(event):
+    """Single-request upload of a base64 body; small files only (the page uses upload sessions)."""
     body = json.loads(event["body"])
     filename     = body.get("filename") or f"doc_{datetime.utcnow():%Y%m%d_%H%M%S}"
     content_type = body.get("content_type", "application/octet-stream")
     log("UPLOAD filename            :", filename)
     try:
         file_content = b64decode(body["content"])
-        s3.put_object(Bucket=BUCKET_NAME, Key=filename, Body=file_content, ContentType=content_type)
+        digest       = hashlib.sha256(file_content).digest()
+        file_info    = {"name": filename, "url": f"/files/{urllib.parse.quote_plus(filename)}"}
+
+        # Identical content is already indexed – skip the write and the re-index it would cause
+        if _stored_sha256(filename) == digest.hex():
+            log("UPLOAD unchanged, skipped  :", digest.hex())
+            return respond(200, {"message": "Unchanged", "unchanged": True, "file": file_info})
+
+        # S3 verifies and stores the checksum, so kb-sync needn't re-read the body to hash it
+        s3.put_object(Bucket=BUCKET_NAME, Key=filename, Body=file_content, ContentType=content_type,
+                      ChecksumSHA256=b64encode(digest).decode("ascii"))
         log("UPLOAD OK")
-        return respond(200, {"message": "Uploaded", "file": {"name": filename, "url": f"/files/{urllib.parse.quote_plus(filename)}"}})
+        return respond(200, {"message": "Uploaded", "unchanged": False, "file": file_info})
     except Exception as exc:
         log("UPLOAD error              :", exc)
         return respond(500, {"error": str(exc)})
 
 
+def handle_upload_session(raw_path, event):
+    """
+    Direct-to-S3 multipart uploads (upload_sessions.py):
+      POST /uploads            open a session, get presigned part URLs
+      POST /uploads/complete   assemble the uploaded parts
+      POST /uploads/abort      discard them
+    """
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except ValueError:
+        return respond(400, {"error": "Invalid JSON"})
+    action = raw_path[len("/uploads"):].strip("/") or "create"
+    log("UPLOAD SESSION             :", action, body.get("filename") or body.get("key"))
+
+    try:
+        if action == "create":
+            key = upload_sessions.validate_key(body.get("filename"))
+            # Identical content is already indexed – no session, no re-index
+            sha256 = (body.get("sha256") or "").lower()
+            if sha256 and _stored_sha256(key) == sha256:
+                log("UPLOAD SESSION unchanged   :", key)
+                return respond(200, {"unchanged": True, "key": key})
+            session = upload_sessions.create(
+                s3, BUCKET_NAME, key, body.get("content_type"), body.get("size"), MAX_UPLOAD_BYTES,
+            )
+            log("UPLOAD SESSION opened      :", key, len(session["parts"]), "parts")
+            return respond(200, {"unchanged": False, **session})
+
+        if action == "complete":
+            result = upload_sessions.complete(
+                s3, BUCKET_NAME, body.get("key"), body.get("upload_id"), body.get("parts"), MAX_UPLOAD_BYTES,
+            )
+            log("UPLOAD SESSION completed   :", result)
+            return respond(200, {"message": "Uploaded", **result,
+                                 "file": {"name": result["key"], "url": f"/files/{urllib.parse.quote_plus(result['key'])}"}})
+
+        if action == "abort":
+            return respond(200, upload_sessions.abort(s3, BUCKET_NAME, body.get("key"), body.get("upload_id")))
+
+    except UploadError as exc:
+        log("UPLOAD SESSION rejected    :", exc)
+        return respond(400, {"error": str(exc)})
+    except ClientError as err:
+        log("UPLOAD SESSION ClientError :", err.response["Error"]["Code"])
+        return respond(500, {"error": str(err)})
+
+    return respond(404, {"error": "Route not found"})
+
+
+def handle_bulk(raw_path, http_method, event):
+    """
+    Bulk operations (bulk_operations.py), each indexed by one ingestion job:
+      POST /bulk/archives             open an archive upload session (staging bucket)
+      POST /bulk/archives/complete    assemble it; S3 then triggers the import
+      POST /bulk/archives/abort       discard it
+      GET  /bulk/jobs/{job_id}        import progress and outcome
+      POST /bulk/delete               {keys: [...]} or {prefix: "folder/"}
+    """
+    if http_method == "GET" and raw_path.startswith("/bulk/jobs/"):
+        job = bulk_jobs.get(urllib.parse.unquote_plus(raw_path[len("/bulk/jobs/"):]))
+        if not job:
+            return respond(404, {"error": "Job not found"})
+        # DynamoDB numbers come back as Decimal
+        return respond(200, json.loads(json.dumps(job, default=int)))
+    if http_method != "POST":
+        return respond(404, {"error": "Route not found"})
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except ValueError:
+        return respond(400, {"error": "Invalid JSON"})
+    action = raw_path[len("/bulk/"):].strip("/")
+    log("BULK                       :", action, body.get("job_id") or body.get("filename") or body.get("prefix") or "")
+
+    try:
+        if action == "archives":
+            name   = bulk_operations.archive_name(body.get("filename"))
+            folder = bulk_operations.validate_folder(body.get("folder"))
+            job_id = BulkJobs.new_id()
+            key    = bulk_operations.staging_key(job_id, name)
+            session = upload_sessions.create(s3, STAGING_BUCKET, key, "", body.get("size"), MAX_ARCHIVE_BYTES,
+                                             bulk_operations.ARCHIVE_TYPES)
+            bulk_jobs.create(job_id, status="uploading", archive_key=key, folder=folder)
+            log("BULK archive session       :", key, len(session["parts"]), "parts →", folder or "(top level)")
+            return respond(200, {"job_id": job_id, **session})
+
+        if action in ("archives/complete", "archives/abort"):
+            job = bulk_jobs.get(str(body.get("job_id") or ""))
+            if not job:
+                return respond(404, {"error": "Job not found"})
+            if action == "archives/abort":
+                upload_sessions.abort(s3, STAGING_BUCKET, job["archive_key"], body.get("upload_id"))
+                bulk_jobs.update(job["job_id"], expect=("uploading",), status="failed", error="Upload aborted")
+                return respond(200, {"job_id": job["job_id"], "aborted": True})
+            result = upload_sessions.complete(s3, STAGING_BUCKET, job["archive_key"], body.get("upload_id"),
+                                              body.get("parts"), MAX_ARCHIVE_BYTES)
+            # The import may already have claimed the job from the S3 event
+            bulk_jobs.update(job["job_id"], expect=("uploading",), status="queued", archive_size=result["size"])
+            return respond(202, {"job_id": job["job_id"], "status": "queued", "size": result["size"],
+                                 "status_endpoint": f"/bulk/jobs/{job['job_id']}"})
+
+        if action == "delete":
+            return handle_batch_delete(body)
+
+    except UploadError as exc:
+        log("BULK rejected              :", exc)
+        return respond(400, {"error": str(exc)})
+    except ClientError as err:
+        log("BULK ClientError           :", err.response["Error"]["Code"])
+        return respond(500, {"error": str(err)})
+
+    return respond(404, {"error": "Route not found"})
+
+
+def handle_batch_delete(body: dict):
+    keys, prefix = body.get("keys"), body.get("prefix")
+    try:
+        if keys is not None:
+            if not isinstance(keys, list) or not all(isinstance(k, str) and k for k in keys):
+                raise ValueError("keys must be a list of object keys")
+            keys = list(dict.fromkeys(keys))
+            if len(keys) > bulk_operations.MAX_DELETE_KEYS:
+                raise ValueError(f"At most {bulk_operations.MAX_DELETE_KEYS} keys per request")
+        elif prefix is not None:
+            keys = bulk_operations.keys_under(s3, BUCKET_NAME, str(prefix))
+        else:
+            raise ValueError("Give keys or prefix")
+    except ValueError as exc:
+        return respond(400, {"error": str(exc)})
+
+    log("BULK DELETE                :", len(keys), "keys", f"under {prefix}" if prefix else "")
+    if not keys:
+        return respond(200, {"message": "Nothing to delete", "deleted": 0, "errors": []})
+    with ingestion_held(f"delete-{BulkJobs.new_id()}", DELETE_HOLD_SECONDS):
+        result = bulk_operations.delete_keys(s3, BUCKET_NAME, keys)
+    log("BULK DELETE done           :", result["deleted"], "deleted,", len(result["errors"]), "errors")
+    return respond(200, {"message": "Deleted", **result})
+
+
+def handle_archive_events(records, context):
+    """
+    S3 ObjectCreated on the staging bucket: import each completed archive once.
+    One archive per invocation, so each gets the full timeout: the first one
+    claimed is imported here and the remaining records go to fresh invocations.
+    """
+    for index, record in enumerate(records):
+        key = urllib.parse.unquote_plus(record["s3"]["object"]["key"])
+        job_id = bulk_operations.job_id_of(key)
+        job = bulk_jobs.get(job_id) if job_id else None
+        if not job or job.get("archive_key") != key:
+            log("ARCHIVE without a job      :", key)
+            continue
+        # Only the first delivery of the event claims the job
+        if not bulk_jobs.update(job_id, expect=("uploading", "queued"), status="expanding"):
+            log("ARCHIVE already claimed    :", job_id)
+            continue
+        for later in records[index + 1:]:
+            _dispatch_archive_event(later, context)
+        import_archive(job, context)
+        break
+    return {"statusCode": 200, "body": json.dumps({"archives": len(records)})}
+
+
+def _dispatch_archive_event(record: dict, context):
+    """
+    Hand one staging-bucket record to a new asynchronous invocation of this
+    function. If that fails nothing would ever pick the archive up, so its
+    job (still waiting to be claimed) is marked failed instead.
+    """
+    try:
+        lambda_client.invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType="Event",
+            Payload=json.dumps({"Records": [record]}).encode("utf-8"),
+        )
+    except Exception as exc:
+        log("ARCHIVE dispatch failed    :", exc)
+        job_id = bulk_operations.job_id_of(urllib.parse.unquote_plus(record["s3"]["object"]["key"]))
+        if job_id:
+            bulk_jobs.update(job_id, expect=("uploading", "queued"), status="failed",
+                             error=f"Archive import could not be scheduled: {exc}")
+
+
+def import_archive(job: dict, context):
+    """
+    Expand one claimed archive. An import the deadline cuts short goes back to
+    "queued" and continues in a new invocation; entries already imported are
+    found unchanged and skipped, so nothing is written twice.
+    """
+    job_id = job["job_id"]
+    remaining = context.get_remaining_time_in_millis() / 1000
+    # Stop starting entries a minute early: time to finish those in flight and record the outcome
+    deadline = time.time() + remaining - 60
+    log("ARCHIVE import             :", job["archive_key"], "→", job.get("folder") or "(top level)")
+
+    with ingestion_held(f"archive-{job_id}", int(remaining) + 60):
+        try:
+            report = bulk_operations.expand_archive(
+                s3, STAGING_BUCKET, job["archive_key"], BUCKET_NAME, job.get("folder", ""),
+                max_bytes=MAX_UPLOAD_BYTES,
+                unchanged=lambda key, sha256: _stored_sha256(key) == sha256,
+                progress=lambda report: bulk_jobs.update(job_id, counts=report["counts"]),
+                deadline=deadline,
+            )
+        except Exception as exc:
+            log("ARCHIVE import failed      :", exc)
+            bulk_jobs.update(job_id, status="failed", error=f"Archive could not be read: {exc}")
+            return
+
+    # Entries uploaded by earlier invocations are "unchanged" to this one
+    counts = report["counts"]
+    carried = min(int(job.get("uploaded_before", 0)), counts["unchanged"])
+    counts["uploaded"] += carried
+    counts["unchanged"] -= carried
+
+    resumes = int(job.get("resumes", 0))
+    if not report["complete"] and resumes < MAX_ARCHIVE_RESUMES:
+        bulk_jobs.update(job_id, status="queued", counts=counts, resumes=resumes + 1,
+                         uploaded_before=counts["uploaded"])
+        log("ARCHIVE import continues   :", counts, f"(resume {resumes + 1}/{MAX_ARCHIVE_RESUMES})")
+        _dispatch_archive_event({"s3": {"object": {"key": urllib.parse.quote_plus(job["archive_key"])}}}, context)
+        return
+
+    bulk_jobs.update(job_id, status="done", **report)
+    log("ARCHIVE import done        :", counts, "complete" if report["complete"] else "incomplete")
+    # Imported; the staging bucket's lifecycle rule would remove it later anyway
+    s3.delete_object(Bucket=STAGING_BUCKET, Key=job["archive_key"])
+
+
 def handle_delete_file(raw_path, path_parameters):
     key = _extract_key(raw_path, path_parameters)
     log("DELETE key                 :", key)
@@ -195,27 +524,79 @@ def handle_delete_file(raw_path, path_parameters):
         return respond(500, {"error": str(exc)})
 
 
-def handle_download_file(raw_path, path_parameters):
+def _content_disposition(disposition: str, filename: str) -> str:
+    """RFC 6266 header with an ASCII fallback name and the exact UTF-8 name."""
+    fallback = re.sub(r'[^\x20-\x7e]|["\\]', "_", filename) or "download"
+    return f'{disposition}; filename="{fallback}"; filename*=UTF-8\'\'{urllib.parse.quote(filename)}'
+
+
+def _parse_range(value: str, size: int):
+    """(first, last) byte offsets for a single "bytes=a-b" / "bytes=a-" / "bytes=-n" range."""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (value or "").strip())
+    if not match or match.groups() == ("", ""):
+        raise ValueError("range must look like bytes=0-1023")
+    first, last = match.groups()
+    if first == "":                      # suffix: the last n bytes
+        first, last = max(0, size - int(last)), size - 1
+    else:
+        first, last = int(first), min(int(last) if last else size - 1, size - 1)
+    if first > last:
+        raise ValueError("range is outside the object")
+    return first, min(last, first + PREVIEW_MAX_BYTES - 1)
+
+
+def handle_download_file(raw_path, path_parameters, params: dict, headers: dict):
+    """
+    GET /files/{key}
+      default            302 to a presigned S3 GET (DOWNLOAD_URL_EXPIRY seconds);
+                         the bytes never pass through this Lambda
+      ?redirect=false    200 {"url", "expires_in"} for callers that cannot follow
+                         a cross-origin redirect with an Authorization header
+      ?disposition=inline|attachment, ?filename=   Content-Disposition overrides
+                         (inline lets the browser's PDF viewer fetch only the
+                         pages it shows, through its own range requests)
+    Previews (one bounded S3 ranged read, at most PREVIEW_MAX_BYTES):
+      ?range=bytes=a-b   or a Range header: 206 with Content-Range
+      ?lines=n           text documents: the first n lines
+    """
     key = _extract_key(raw_path, path_parameters)
-    log("DOWNLOAD key               :", key)
+    log("DOWNLOAD key               :", key, params)
+    header_range = {k.lower(): v for k, v in headers.items()}.get("range")
     try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        log("DOWNLOAD Content-Type      :", obj["ContentType"])
-
-        return {
-            "statusCode": 200,
-            "headers": {
-                **CORS_HEADERS,
-                "Content-Type":        obj["ContentType"],
-                "Content-Disposition": f'attachment; filename="{key}"',
+        head = s3.head_object(Bucket=BUCKET_NAME, Key=key)
+        content_type = head.get("ContentType") or "application/octet-stream"
+        size = head["ContentLength"]
+
+        if params.get("range") or header_range or params.get("lines"):
+            return _preview(key, params, header_range, content_type, size)
+
+        disposition = "inline" if params.get("disposition") == "inline" else "attachment"
+        filename = params.get("filename") or key.rsplit("/", 1)[-1]
+        url = s3.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": BUCKET_NAME,
+                "Key": key,
+                "ResponseContentDisposition": _content_disposition(disposition, filename),
+                "ResponseContentType": content_type,
             },
-            "body": b64encode(obj["Body"].read()).decode("utf-8"),
-            "isBase64Encoded": True,
+            ExpiresIn=DOWNLOAD_URL_EXPIRY,
+        )
+        log("DOWNLOAD presigned         :", disposition, size, "bytes")
+        if str(params.get("redirect", "true")).lower() == "false":
+            return respond(200, {"url": url, "expires_in": DOWNLOAD_URL_EXPIRY,
+                                 "size": size, "content_type": content_type})
+        return {
+            "statusCode": 302,
+            "headers": {**CORS_HEADERS, "Location": url, "Cache-Control": "no-store"},
+            "body": "",
         }
 
+    except ValueError as exc:
+        return respond(400, {"error": str(exc)})
     except ClientError as err:
         log("DOWNLOAD ClientError code  :", err.response["Error"]["Code"])
-        if err.response["Error"]["Code"] == "NoSuchKey":
+        if err.response["Error"]["Code"] in ("NoSuchKey", "404", "NotFound"):
             return respond(404, {"error": f'File "{key}" not found'})
         return respond(500, {"error": str(err)})
     except Exception as exc:
@@ -223,6 +604,44 @@ def handle_download_file(raw_path, path_parameters):
         return respond(500, {"error": str(exc)})
 
 
+def _preview(key: str, params: dict, header_range, content_type: str, size: int) -> dict:
+    if params.get("lines"):
+        if not content_type.startswith(TEXT_TYPES):
+            raise ValueError("lines previews are for text documents; use range=bytes=... instead")
+        wanted = max(1, int(params["lines"]))
+        body = s3.get_object(Bucket=BUCKET_NAME, Key=key, Range=f"bytes=0-{PREVIEW_MAX_BYTES - 1}")["Body"]
+        lines = []
+        for line in body.iter_lines(keepends=True):
+            lines.append(line)
+            if len(lines) == wanted:
+                break
+        body.close()  # stop the transfer; the rest is not needed
+        text = b"".join(lines).decode("utf-8", errors="replace")
+        return {
+            "statusCode": 200,
+            "headers": {**CORS_HEADERS, "Content-Type": "text/plain; charset=utf-8"},
+            "body": text,
+        }
+
+    if size == 0:
+        raise ValueError("range is outside the object")
+    first, last = _parse_range(params.get("range") or header_range, size)
+    data = s3.get_object(Bucket=BUCKET_NAME, Key=key, Range=f"bytes={first}-{last}")["Body"].read()
+    log("DOWNLOAD preview           :", f"bytes {first}-{last}/{size}")
+    return {
+        "statusCode": 206,
+        "headers": {
+            **CORS_HEADERS,
+            "Content-Type": content_type,
+            "Content-Range": f"bytes {first}-{last}/{size}",
+            "Accept-Ranges": "bytes",
+            "Access-Control-Expose-Headers": "Content-Range",
+        },
+        "body": b64encode(data).decode("utf-8"),
+        "isBase64Encoded": True,
+    }
+
+
 def handle_presigned_url(event):
     """
     Generate a presigned URL for an S3 object.
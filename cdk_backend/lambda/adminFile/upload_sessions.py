@@ -0,0 +1,166 @@
+"""
+Upload sessions: the browser sends documents straight to S3 as a multipart
+upload, so file bytes never pass through API Gateway or this Lambda.
+
+  POST /uploads           {filename, content_type, size[, sha256]}
+      → {upload_id, key, part_size, parts: [{part_number, url}], expires_in}
+  (browser)               PUT each PART_SIZE slice to its url, keep the ETag header
+  POST /uploads/complete  {key, upload_id, parts: [{part_number, etag}]}
+  POST /uploads/abort     {key, upload_id}
+
+The declared name, type and size are checked before a session is opened.
+At completion the parts S3 actually holds are checked again, because the
+presigned URLs cannot limit what is sent. S3 emits the ObjectCreated
+event, and with it the knowledge base sync, only when the upload
+completes. Uploads that are never completed or aborted are removed by the
+bucket's AbortIncompleteMultipartUpload rule
+(scripts/prepare-kb-bucket-uploads.sh).
+"""
+
+import math
+import os
+
+from botocore.exceptions import ClientError
+
+PART_SIZE = 8 * 1024 * 1024     # S3 minimum is 5 MiB for every part but the last
+MAX_PARTS = 10000
+URL_EXPIRY_SECONDS = 3600
+
+# Extensions the knowledge base can parse, with the Content-Type stored on the object
+ALLOWED_TYPES = {
+    ".pdf":  "application/pdf",
+    ".doc":  "application/msword",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xls":  "application/vnd.ms-excel",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".txt":  "text/plain",
+    ".md":   "text/markdown",
+    ".html": "text/html",
+    ".csv":  "text/csv",
+    ".png":  "image/png",
+    ".jpg":  "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+# Browsers report these when they don't know the type; the extension decides then
+GENERIC_TYPES = ("", "application/octet-stream")
+
+
+class UploadError(ValueError):
+    """The request cannot become a valid upload (answered with 400)."""
+
+
+def validate_key(filename: str) -> str:
+    key = (filename or "").strip().lstrip("/")
+    if not key or any(part in ("", ".", "..") for part in key.split("/")):
+        raise UploadError("Invalid filename")
+    return key
+
+
+def content_type_for(key: str, declared: str, allowed_types: dict = ALLOWED_TYPES) -> str:
+    extension = os.path.splitext(key)[1].lower()
+    if extension not in allowed_types:
+        raise UploadError(f"Unsupported file type {extension or '(none)'}; allowed: {', '.join(sorted(allowed_types))}")
+    expected = allowed_types[extension]
+    declared = (declared or "").split(";")[0].strip().lower()
+    if declared not in GENERIC_TYPES and declared != expected:
+        raise UploadError(f"Content type {declared} does not match {extension}")
+    return expected
+
+
+def check_size(size, max_bytes: int) -> int:
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("size must be a number of bytes")
+    if size <= 0:
+        raise UploadError("File is empty")
+    if size > max_bytes:
+        raise UploadError(f"File is {size} bytes; the limit is {max_bytes}")
+    return size
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Session lifecycle
+# ──────────────────────────────────────────────────────────────────────────────
+def create(s3, bucket: str, filename: str, content_type: str, size, max_bytes: int,
+           allowed_types: dict = ALLOWED_TYPES) -> dict:
+    key = validate_key(filename)
+    stored_type = content_type_for(key, content_type, allowed_types)
+    size = check_size(size, max_bytes)
+    parts = max(1, math.ceil(size / PART_SIZE))
+    if parts > MAX_PARTS:
+        raise UploadError(f"File needs {parts} parts; S3 allows {MAX_PARTS}")
+
+    upload_id = s3.create_multipart_upload(
+        Bucket=bucket, Key=key, ContentType=stored_type,
+        Metadata={"declared-size": str(size)},
+    )["UploadId"]
+    urls = [
+        {
+            "part_number": n,
+            "url": s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket, "Key": key, "UploadId": upload_id, "PartNumber": n},
+                ExpiresIn=URL_EXPIRY_SECONDS,
+            ),
+        }
+        for n in range(1, parts + 1)
+    ]
+    return {
+        "upload_id": upload_id,
+        "key": key,
+        "part_size": PART_SIZE,
+        "parts": urls,
+        "expires_in": URL_EXPIRY_SECONDS,
+    }
+
+
+def _uploaded_parts(s3, bucket: str, key: str, upload_id: str) -> dict:
+    """part number -> {"ETag", "Size"} for the parts S3 holds."""
+    parts, kwargs = {}, {}
+    while True:
+        resp = s3.list_parts(Bucket=bucket, Key=key, UploadId=upload_id, **kwargs)
+        parts.update({p["PartNumber"]: p for p in resp.get("Parts", [])})
+        if not resp.get("IsTruncated"):
+            return parts
+        kwargs["PartNumberMarker"] = resp["NextPartNumberMarker"]
+
+
+def complete(s3, bucket: str, key: str, upload_id: str, parts: list, max_bytes: int) -> dict:
+    key = validate_key(key)
+    try:
+        uploaded = _uploaded_parts(s3, bucket, key, upload_id)
+    except ClientError as err:
+        if err.response["Error"]["Code"] == "NoSuchUpload":
+            raise UploadError("Upload not found (already completed, aborted or expired)")
+        raise
+
+    claimed = sorted((int(p["part_number"]), str(p["etag"]).strip('"')) for p in parts or [])
+    if not claimed or [n for n, _ in claimed] != list(range(1, len(claimed) + 1)):
+        raise UploadError("parts must number 1..N without gaps")
+    for number, etag in claimed:
+        held = uploaded.get(number)
+        if held is None or held["ETag"].strip('"') != etag:
+            raise UploadError(f"Part {number} was not uploaded (or was replaced)")
+
+    total = sum(uploaded[n]["Size"] for n, _ in claimed)
+    if total > max_bytes:
+        abort(s3, bucket, key, upload_id)
+        raise UploadError(f"Uploaded {total} bytes; the limit is {max_bytes}")
+
+    resp = s3.complete_multipart_upload(
+        Bucket=bucket, Key=key, UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": n, "ETag": uploaded[n]["ETag"]} for n, _ in claimed]},
+    )
+    return {"key": key, "size": total, "etag": resp.get("ETag", "").strip('"')}
+
+
+def abort(s3, bucket: str, key: str, upload_id: str) -> dict:
+    key = validate_key(key)
+    try:
+        s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+    except ClientError as err:
+        if err.response["Error"]["Code"] != "NoSuchUpload":
+            raise
+    return {"key": key, "aborted": True}
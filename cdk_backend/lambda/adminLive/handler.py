@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import base64
+from datetime import datetime
+
+import boto3
+from botocore.exceptions import ClientError
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Env & AWS clients
+# ──────────────────────────────────────────────────────────────────────────────
+SUBSCRIPTIONS_TABLE = os.environ["SUBSCRIPTIONS_TABLE"]
+WS_CALLBACK_URL     = os.environ["WS_CALLBACK_URL"]
+USER_POOL_ID        = os.environ["USER_POOL_ID"]
+USER_POOL_CLIENT_ID = os.environ.get("USER_POOL_CLIENT_ID")
+# API Gateway closes WebSocket connections after 2 hours; rows expire with them
+SUBSCRIPTION_TTL_SECONDS = 2 * 60 * 60
+# Newest conversation summaries carried per delta
+MAX_CONVERSATIONS = 20
+
+ddb           = boto3.resource("dynamodb")
+subscriptions = ddb.Table(SUBSCRIPTIONS_TABLE)
+cognito       = boto3.client("cognito-idp")
+ws            = boto3.client("apigatewaymanagementapi", endpoint_url=WS_CALLBACK_URL)
+
+ISSUER = f"https://cognito-idp.{USER_POOL_ID.split('_')[0]}.amazonaws.com/{USER_POOL_ID}"
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Helpers
+# ──────────────────────────────────────────────────────────────────────────────
+def log(*msg):
+    print("[ADMIN-LIVE]", *msg)
+
+
+def reply(status_code, body):
+    return {"statusCode": status_code, "body": json.dumps(body)}
+
+
+def token_claims(token: str) -> dict:
+    """Payload of a JWT, without verification (GetUser verifies the token itself)."""
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+
+
+def is_admin_token(token: str) -> bool:
+    """
+    A valid, unexpired access token issued by the admin user pool. GetUser
+    rejects invalid or revoked tokens; the issuer check rejects tokens from
+    any other pool, which GetUser would accept too.
+    """
+    try:
+        claims = token_claims(token)
+        if claims.get("iss") != ISSUER or claims.get("token_use") != "access":
+            return False
+        if USER_POOL_CLIENT_ID and claims.get("client_id") != USER_POOL_CLIENT_ID:
+            return False
+        cognito.get_user(AccessToken=token)
+        return True
+    except (ClientError, ValueError, IndexError) as e:
+        log("Token rejected:", e)
+        return False
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Lambda entry-point
+# ──────────────────────────────────────────────────────────────────────────────
+def lambda_handler(event, context):
+    """
+    WebSocket routes (requestContext.routeKey):
+      subscribeAdmin     {"action": "subscribeAdmin", "token": <Cognito access token>}
+      unsubscribeAdmin   {"action": "unsubscribeAdmin"}
+      $disconnect        drop the subscription, if any
+    SQS batches of admin events (Records): coalesced into one delta and pushed
+    to every subscribed connection.
+    """
+    if "Records" in event:
+        return broadcast(event["Records"])
+
+    request_context = event.get("requestContext", {})
+    connection_id = request_context.get("connectionId")
+    route_key = request_context.get("routeKey")
+
+    if route_key == "subscribeAdmin":
+        try:
+            body = json.loads(event.get("body") or "{}")
+        except ValueError:
+            return reply(400, {"error": "Invalid JSON"})
+        if not is_admin_token(body.get("token") or ""):
+            return reply(403, {"error": "Admin sign-in required"})
+        subscriptions.put_item(Item={
+            "connection_id": connection_id,
+            "subscribed_at": datetime.utcnow().isoformat(),
+            "expires_at": int(time.time()) + SUBSCRIPTION_TTL_SECONDS,
+        })
+        log("Subscribed:", connection_id)
+        return reply(200, {"type": "subscribed"})
+
+    if route_key in ("unsubscribeAdmin", "$disconnect"):
+        subscriptions.delete_item(Key={"connection_id": connection_id})
+        return reply(200, {"type": "unsubscribed"})
+
+    return reply(400, {"error": "Unknown route"})
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Coalescing & push
+# ──────────────────────────────────────────────────────────────────────────────
+def coalesce(events: list) -> dict:
+    """
+    Fold admin events into one delta. Event shapes (see publishers):
+      {"type": "conversations", "messages": n, "categories": {...}, "conversations": [summary, ...]}
+      {"type": "feedback", "from": old rating | None, "to": new rating | None}
+      {"type": "escalation", "from": old status | None, "to": new status}
+    """
+    delta = {
+        "type": "analytics_delta",
+        "events": len(events),
+        "messages": 0,
+        "categories": {},
+        "feedback": {"positive": 0, "negative": 0},
+        "escalations": {},
+        "conversations": [],
+    }
+    for ev in events:
+        kind = ev.get("type")
+        if kind == "conversations":
+            delta["messages"] += int(ev.get("messages", 0))
+            for category, count in (ev.get("categories") or {}).items():
+                delta["categories"][category] = delta["categories"].get(category, 0) + int(count)
+            delta["conversations"].extend(ev.get("conversations") or [])
+        elif kind == "feedback":
+            # A changed rating moves one message between the counts
+            for rating, change in ((ev.get("from"), -1), (ev.get("to"), 1)):
+                if rating in delta["feedback"]:
+                    delta["feedback"][rating] += change
+        elif kind == "escalation":
+            for status, change in ((ev.get("from"), -1), (ev.get("to"), 1)):
+                if status:
+                    delta["escalations"][status] = delta["escalations"].get(status, 0) + change
+
+    delta["conversations"].sort(key=lambda c: c.get("timestamp") or "", reverse=True)
+    delta["conversations"] = delta["conversations"][:MAX_CONVERSATIONS]
+    delta["at"] = datetime.utcnow().isoformat()
+    return delta
+
+
+def connection_ids() -> list:
+    ids, kwargs = [], {"ProjectionExpression": "connection_id"}
+    while True:
+        resp = subscriptions.scan(**kwargs)
+        ids.extend(item["connection_id"] for item in resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            return ids
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def broadcast(records: list) -> dict:
+    events = []
+    for record in records:
+        try:
+            events.append(json.loads(record["body"]))
+        except (TypeError, ValueError) as e:
+            log(f"Skipping undecodable event {record.get('messageId')}: {e}")
+    if not events:
+        return {"batchItemFailures": []}
+
+    targets = connection_ids()
+    if not targets:
+        log(f"{len(events)} events, no subscribers")
+        return {"batchItemFailures": []}
+
+    data = json.dumps(coalesce(events)).encode("utf-8")
+    gone = 0
+    for connection_id in targets:
+        try:
+            ws.post_to_connection(ConnectionId=connection_id, Data=data)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "GoneException":
+                subscriptions.delete_item(Key={"connection_id": connection_id})
+                gone += 1
+            else:
+                log(f"Push to {connection_id} failed: {e}")
+    log(f"Pushed {len(events)} events as one delta to {len(targets) - gone} connections ({gone} gone)")
+    # A missed delta is corrected by the next snapshot; never redeliver
+    return {"batchItemFailures": []}
@@ -7,7 +7,7 @@ This is the core chatbot orchestration engine that:
 2. Invokes Amazon Bedrock Agent with role-specific personalization (learner, instructor, staff)
 3. Streams AI-generated responses back to users via WebSocket API Gateway
 4. Extracts confidence scores and knowledge base citations from agent responses
-5. Triggers background analytics via logclassifier Lambda for sentiment analysis
+5. Publishes each answer to the analytics ingest queue, drained in batches by logclassifier
 
 The function handles both high-confidence responses (direct answers) and low-confidence
 scenarios (email escalation to administrators).
@@ -23,10 +23,12 @@ from datetime import datetime
 bedrock_agent = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
 api_gateway = boto3.client('apigatewaymanagementapi', endpoint_url=os.environ['WS_API_ENDPOINT'])
 lambda_client = boto3.client('lambda')
+sqs = boto3.client('sqs')
 
 agent_id = os.environ["AGENT_ID"]
 agent_alias_id = os.environ["AGENT_ALIAS_ID"]
 LOG_CLASSIFIER_FN_NAME = os.environ['LOG_CLASSIFIER_FN_NAME']
+ANALYTICS_QUEUE_URL = os.environ.get('ANALYTICS_QUEUE_URL')
 
 def send_ws_response(connection_id, response):
     if connection_id and connection_id.startswith("mock-"):
@@ -42,6 +44,23 @@ def send_ws_response(connection_id, response):
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
 
+def publish_for_analytics(payload):
+    """
+    Hand a finished conversation to logclassifier. With ANALYTICS_QUEUE_URL set it is
+    queued and classified in batches; otherwise fall back to one async invoke per answer.
+    """
+    try:
+        if ANALYTICS_QUEUE_URL:
+            sqs.send_message(QueueUrl=ANALYTICS_QUEUE_URL, MessageBody=json.dumps(payload))
+        else:
+            lambda_client.invoke(
+                FunctionName   = LOG_CLASSIFIER_FN_NAME,
+                InvocationType = 'Event',
+                Payload        = json.dumps(payload).encode('utf-8')
+            )
+    except Exception as e:
+        print(f"Analytics publish error: {str(e)}")
+
 def get_role_specific_instructions(user_role):
     """
     Returns role-specific system instructions for the Bedrock Agent.
@@ -88,6 +107,7 @@ def lambda_handler(event, context):
         connection_id = event.get("connectionId")
         session_id = event.get("session_id", context.aws_request_id)
         user_role = event.get("user_role", "guest")
+        user_location = event.get("location")
 
         print(f"Received Query - Session: {session_id}, Role: {user_role}, Query: {query}")
 
@@ -118,6 +138,7 @@ def lambda_handler(event, context):
 
                 full_response = ""
                 citations = []
+                escalated = False
 
                 print(f"🔄 Starting to stream response for connection: {connection_id}")
                 for event in response['completion']:
@@ -209,6 +230,10 @@ def lambda_handler(event, context):
                         trace = event['trace'].get('trace', {})
                         if 'orchestrationTrace' in trace:
                             orch_trace = trace['orchestrationTrace']
+                            # The agent escalates by calling the notify-admin action group
+                            action_input = orch_trace.get('invocationInput', {}).get('actionGroupInvocationInput', {})
+                            if action_input.get('actionGroupName') == 'notify-admin':
+                                escalated = True
                             if 'observation' in orch_trace:
                                 observation = orch_trace['observation']
                                 if 'knowledgeBaseLookupOutput' in observation:
@@ -270,10 +295,15 @@ def lambda_handler(event, context):
             "session_id": session_id,
             "timestamp": datetime.utcnow().isoformat(),
             "query": query,
-            "response": full_response
+            "response": full_response,
+            "user_role": user_role,
+            "escalated": escalated
         }
+        if user_location:
+            payload["location"] = user_location
 
-        print(payload)
+        # One JSON line per conversation – streamed to S3 by the log subscription filter
+        print(json.dumps(payload))
 
         result = {
                 'type': 'complete',
@@ -285,11 +315,7 @@ def lambda_handler(event, context):
         if connection_id:
             send_ws_response(connection_id, result)
 
-        lambda_client.invoke(
-            FunctionName   = LOG_CLASSIFIER_FN_NAME,
-            InvocationType = 'Event',
-            Payload        = json.dumps(payload).encode('utf-8')
-        )
+        publish_for_analytics(payload)
 
         return {'statusCode': 200, 'body': json.dumps(result)}
 
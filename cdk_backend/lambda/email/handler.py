@@ -12,6 +12,10 @@ dynamodb = boto3.resource("dynamodb")
 ESCALATED_TABLE = os.environ.get("ESCALATED_QUERIES_TABLE", "NCMWEscalatedQueries")
 escalated_table = dynamodb.Table(ESCALATED_TABLE)
 
+# Optional queue feeding the live admin dashboards (see adminLive/handler.py)
+ADMIN_EVENTS_QUEUE_URL = os.environ.get("ADMIN_EVENTS_QUEUE_URL")
+sqs = boto3.client("sqs") if ADMIN_EVENTS_QUEUE_URL else None
+
 def lambda_handler(event, context):
     print("Event keys:", list(event.keys()))
 
@@ -76,6 +80,14 @@ def lambda_handler(event, context):
             }
         )
         print(f"Successfully stored query {query_id} in DynamoDB")
+        if sqs is not None:
+            try:
+                sqs.send_message(
+                    QueueUrl=ADMIN_EVENTS_QUEUE_URL,
+                    MessageBody=json.dumps({"type": "escalation", "from": None, "to": "pending"})
+                )
+            except Exception as sqs_exc:
+                print(f"Admin event error: {sqs_exc}", flush=True)
     except Exception as ddb_exc:
         print(f"DynamoDB Error: {ddb_exc}", flush=True)
 
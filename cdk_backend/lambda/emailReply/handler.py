@@ -8,13 +8,10 @@ from datetime import datetime
 
 # AWS clients
 s3              = boto3.client('s3')
-bedrock_agent   = boto3.client('bedrock-agent')
 
 # Environment variables
 SOURCE_BUCKET   = os.environ['SOURCE_BUCKET_NAME']       # your SES email bucket
 DEST_BUCKET     = os.environ['DESTINATION_BUCKET_NAME']  # Knowledge base data bucket
-KB_ID           = os.environ['KNOWLEDGE_BASE_ID']
-DS_ID           = os.environ['DATA_SOURCE_ID']
 ADMIN_EMAIL     = os.environ['ADMIN_EMAIL']
 
 def lambda_handler(event, context):
@@ -87,13 +84,9 @@ def lambda_handler(event, context):
         )
         print(f"Uploaded Q&A to s3://{DEST_BUCKET}/{out_key}")
 
-        # 5) Trigger Bedrock ingestion
-        resp = bedrock_agent.start_ingestion_job(
-            knowledgeBaseId = KB_ID,
-            dataSourceId    = DS_ID
-        )
+        # 5) Indexing: the put above is an S3 event on the KB bucket, so kb-sync's
+        #    ingestion scheduler picks it up (batched with any other changes)
 
-        print("Bedrock ingestion response:", resp)
         return { 'status': 'SUCCESS' }
 
     except Exception as e:
@@ -10,6 +10,9 @@ from boto3.dynamodb.conditions import Key, Attr
 TABLE_NAME = os.environ["ESCALATED_QUERIES_TABLE"]
 ddb = boto3.resource("dynamodb")
 table = ddb.Table(TABLE_NAME)
+# Optional queue feeding the live admin dashboards (see adminLive/handler.py)
+ADMIN_EVENTS_QUEUE_URL = os.environ.get("ADMIN_EVENTS_QUEUE_URL")
+sqs = boto3.client("sqs") if ADMIN_EVENTS_QUEUE_URL else None
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  Helpers
@@ -125,8 +128,8 @@ def handle_update_query_status(event):
         if new_status not in ["pending", "in_progress", "resolved"]:
             return cors_response(400, {"error": "Invalid status"})
 
-        # Update the item
-        table.update_item(
+        # Update the item (old status kept for the live dashboard counters)
+        result = table.update_item(
             Key={"query_id": query_id, "timestamp": body.get("timestamp")},
             UpdateExpression="SET #status = :status, admin_notes = :notes, updated_at = :updated",
             ExpressionAttributeNames={"#status": "status"},
@@ -134,11 +137,25 @@ def handle_update_query_status(event):
                 ":status": new_status,
                 ":notes": admin_notes,
                 ":updated": datetime.utcnow().isoformat() + "Z"
-            }
+            },
+            ReturnValues="UPDATED_OLD"
         )
+        old_status = result.get("Attributes", {}).get("status")
+        if old_status != new_status:
+            publish_admin_event({"type": "escalation", "from": old_status, "to": new_status})
 
         return cors_response(200, {"message": "Status updated successfully"})
 
     except Exception as e:
         log("ERROR:", str(e))
         return cors_response(500, {"error": str(e)})
+
+
+def publish_admin_event(event):
+    """Best effort – the dashboards resync from this API on reload."""
+    if sqs is None:
+        return
+    try:
+        sqs.send_message(QueueUrl=ADMIN_EVENTS_QUEUE_URL, MessageBody=json.dumps(event))
+    except Exception as e:
+        log("Admin event error:", str(e))
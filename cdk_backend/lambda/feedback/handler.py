@@ -1,6 +1,7 @@
 import json
 import boto3
 import os
+from boto3.dynamodb.conditions import Key
 from datetime import datetime
 from decimal import Decimal
 
@@ -8,6 +9,21 @@ dynamodb = boto3.resource('dynamodb')
 table_name = os.environ.get('FEEDBACK_TABLE', 'NCMWResponseFeedback')
 table = dynamodb.Table(table_name)
 
+# Optional hour/day rollup table shared with logclassifier (see logclassifier/rollups.py)
+ROLLUP_TABLE = os.environ.get('ROLLUP_TABLE')
+rollup_table = dynamodb.Table(ROLLUP_TABLE) if ROLLUP_TABLE else None
+
+# Optional queue feeding the live admin dashboards (see adminLive/handler.py)
+ADMIN_EVENTS_QUEUE_URL = os.environ.get('ADMIN_EVENTS_QUEUE_URL')
+
+# Optional analytics ingest queue: a thumbs-down asks logclassifier to score the
+# conversation's sentiment if sampling skipped it (see logclassifier/handler.py)
+ANALYTICS_QUEUE_URL = os.environ.get('ANALYTICS_QUEUE_URL')
+# Gives the conversation itself time to go through the same queue first
+RESCORE_DELAY_SECONDS = int(os.environ.get('RESCORE_DELAY_SECONDS', '60'))
+
+sqs = boto3.client('sqs') if ADMIN_EVENTS_QUEUE_URL or ANALYTICS_QUEUE_URL else None
+
 def lambda_handler(event, context):
     """
     Handle feedback submissions for chatbot responses
@@ -82,28 +98,11 @@ def handle_submit_feedback(event, headers):
 
         timestamp = datetime.utcnow().isoformat()
 
-        # If feedback is null, delete the feedback entry
-        if feedback is None:
-            try:
-                table.delete_item(
-                    Key={
-                        'message_id': message_id,
-                        'timestamp': timestamp
-                    }
-                )
-                return {
-                    'statusCode': 200,
-                    'headers': headers,
-                    'body': json.dumps({
-                        'message': 'Feedback removed successfully',
-                        'messageId': message_id
-                    })
-                }
-            except Exception as e:
-                print(f"Error deleting feedback: {str(e)}")
-                # Continue to update/create instead of delete
-
-        # Create or update feedback entry
+        # The rating this click replaces, so the rollups count each message once
+        previous = current_rating(message_id)
+
+        # Every click is a new row; clearing writes feedback=None so the newest
+        # row is always the message's current rating
         item = {
             'message_id': message_id,
             'timestamp': timestamp,
@@ -115,11 +114,16 @@ def handle_submit_feedback(event, headers):
 
         table.put_item(Item=item)
 
+        record_feedback_rollup(previous, feedback, timestamp)
+        publish_admin_event(previous, feedback)
+        if feedback == 'negative' and previous != 'negative':
+            request_rescore(session_id, item['message_preview'])
+
         return {
             'statusCode': 200,
             'headers': headers,
             'body': json.dumps({
-                'message': 'Feedback submitted successfully',
+                'message': 'Feedback removed successfully' if feedback is None else 'Feedback submitted successfully',
                 'messageId': message_id,
                 'feedback': feedback
             })
@@ -133,6 +137,79 @@ def handle_submit_feedback(event, headers):
             'body': json.dumps({'error': f'Failed to submit feedback: {str(e)}'})
         }
 
+def current_rating(message_id):
+    """Feedback of the message's newest row (None if it was never rated or was cleared)."""
+    response = table.query(
+        KeyConditionExpression=Key('message_id').eq(message_id),
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get('Items', [])
+    return items[0].get('feedback') if items else None
+
+def record_feedback_rollup(previous, feedback, timestamp):
+    """
+    Move the message's rating in the hour and day rollups so the dashboard
+    can read feedback totals without scanning this table: the replaced rating
+    is taken off and the new one added in one UpdateItem per bucket, and a
+    repeated click changes nothing.
+    """
+    if rollup_table is None or previous == feedback:
+        return
+    deltas = {f'feedback:{value}': amount
+              for value, amount in ((previous, -1), (feedback, 1)) if value in ('positive', 'negative')}
+    if not deltas:
+        return
+    names = {f'#f{i}': attr for i, attr in enumerate(deltas)}
+    values = {f':d{i}': amount for i, amount in enumerate(deltas.values())}
+    for bucket in (f"H#{timestamp[:13]}", f"D#{timestamp[:10]}"):
+        try:
+            rollup_table.update_item(
+                Key={'bucket': bucket},
+                UpdateExpression='ADD ' + ', '.join(f'#f{i} :d{i}' for i in range(len(deltas))),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except Exception as e:
+            # Counters are repaired by logclassifier's rebuild_rollups action
+            print(f"Error updating feedback rollup: {str(e)}")
+
+def request_rescore(session_id, message_preview):
+    """
+    Queue a sentiment re-score of the rated answer, so negative feedback always
+    gets a score even when sampling skipped the conversation. Best effort.
+    """
+    if not ANALYTICS_QUEUE_URL or not message_preview:
+        return
+    try:
+        sqs.send_message(
+            QueueUrl=ANALYTICS_QUEUE_URL,
+            MessageBody=json.dumps({
+                'action': 'rescore',
+                'session_id': session_id,
+                'message_preview': message_preview,
+                'feedback': 'negative'
+            }),
+            DelaySeconds=RESCORE_DELAY_SECONDS
+        )
+    except Exception as e:
+        print(f"Error queueing sentiment re-score: {str(e)}")
+
+def publish_admin_event(previous, feedback):
+    """
+    Push the rating change to the live admin dashboards. Best effort: the
+    dashboards resync from the analytics API on reload.
+    """
+    if not ADMIN_EVENTS_QUEUE_URL or previous == feedback:
+        return
+    try:
+        sqs.send_message(
+            QueueUrl=ADMIN_EVENTS_QUEUE_URL,
+            MessageBody=json.dumps({'type': 'feedback', 'from': previous, 'to': feedback})
+        )
+    except Exception as e:
+        print(f"Error publishing admin event: {str(e)}")
+
 def handle_get_feedback_stats(event, headers):
     """
     Get feedback statistics (for admin dashboard)
@@ -0,0 +1,229 @@
+"""
+SHA-256 content manifest for the knowledge base bucket.
+
+Every S3 event on the KB bucket used to count as a change, so re-uploading
+an identical PDF (admin upload, bucket sync) still cost a full ingestion
+job. The manifest records the digest of every object key. An event is
+passed on to the ingestion scheduler only when the key's content really
+changed:
+  created, new key          → "added"
+  created, digest differs   → "modified"
+  created, digest the same  → dropped
+  removed, key known        → "removed"
+  removed, already removed  → dropped
+
+Digests come from the object's stored SHA-256 checksum when it was
+uploaded with one (adminFile sends ChecksumSHA256), otherwise the body is
+streamed through hashlib in HASH_CHUNK_BYTES pieces. An event whose ETag
+matches the manifest is unchanged without reading anything.
+
+S3 delivers events out of order, so each item keeps the sequencer of the
+last event applied to it. Events older than that are dropped, and removed
+keys stay as tombstones so a late "created" cannot bring them back.
+
+Item per object key (NCMWKbContentManifest):
+  object_key   PK
+  sha256       hex digest of the body (absent on tombstones)
+  etag, size, last_modified
+  listing      "live" on current objects only; the sparse ListingIndex GSI
+               (listing, object_key) is the admin file listing (adminFile)
+  deleted      True once the key was removed
+  sequencer    zero-padded S3 sequencer of the last applied event
+  revision     bumped on every write; writers check it (optimistic locking)
+  updated_at   epoch seconds
+"""
+
+import base64
+import hashlib
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+HASH_CHUNK_BYTES = 1024 * 1024
+RECONCILE_WORKERS = 8
+SEQUENCER_WIDTH = 32  # S3 sequencers are hex strings of varying length; compare left-padded
+APPLY_RETRIES = 5
+
+
+def _pad(sequencer: str) -> str:
+    return (sequencer or "").rjust(SEQUENCER_WIDTH, "0")
+
+
+def _etag(value: str) -> str:
+    return (value or "").strip('"')
+
+
+def _timestamp(dt) -> str:
+    """Same shape as an S3 event's eventTime, so the two sort together."""
+    return f"{dt:%Y-%m-%dT%H:%M:%S}.{dt.microsecond // 1000:03d}Z"
+
+
+def digest_object(s3, bucket: str, key: str):
+    """(sha256 hex, etag, size) of the object, or None if it no longer exists."""
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key, ChecksumMode="ENABLED")
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    etag, size = _etag(head["ETag"]), head["ContentLength"]
+
+    checksum = head.get("ChecksumSHA256")
+    if checksum and "-" not in checksum:  # "-N" marks a composite multipart checksum
+        return base64.b64decode(checksum).hex(), etag, size
+
+    sha = hashlib.sha256()
+    try:
+        body = s3.get_object(Bucket=bucket, Key=key, IfMatch=head["ETag"])["Body"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "PreconditionFailed"):
+            return None  # replaced or removed while we looked; its own event follows
+        raise
+    for chunk in body.iter_chunks(HASH_CHUNK_BYTES):
+        sha.update(chunk)
+    return sha.hexdigest(), etag, size
+
+
+class ContentManifest:
+    def __init__(self, table, s3):
+        self.table = table
+        self.s3 = s3
+
+    def get(self, key: str):
+        return self.table.get_item(Key={"object_key": key}, ConsistentRead=True).get("Item")
+
+    # ── S3 events ────────────────────────────────────────────────────────
+    def apply(self, record: dict):
+        """
+        Fold one S3 event record into the manifest. Returns the effective
+        change {"key", "change", "event"}, or None when the content is unchanged
+        or the event is older than what the manifest already holds. Raises
+        RuntimeError when concurrent writers keep winning; the handler lets it
+        fail the S3 invocation so Lambda retries the event.
+        """
+        s3_info = record.get("s3", {})
+        bucket = s3_info.get("bucket", {}).get("name", "")
+        obj = s3_info.get("object", {})
+        key = urllib.parse.unquote_plus(obj.get("key", ""))
+        sequencer = _pad(obj.get("sequencer"))
+        removed = record.get("eventName", "").startswith("ObjectRemoved")
+
+        for _ in range(APPLY_RETRIES):
+            item = self.get(key)
+            if item and item.get("sequencer", "") >= sequencer:
+                print(f"[manifest] {key}: event {sequencer} older than applied {item['sequencer']} – dropped")
+                return None
+
+            if removed:
+                change = None if item and item.get("deleted") else "removed"
+                fields = {"deleted": True}
+            else:
+                if item and not item.get("deleted") and item.get("etag") == _etag(obj.get("eTag")):
+                    digest = (item["sha256"], item["etag"], item.get("size", obj.get("size", 0)))
+                else:
+                    digest = digest_object(self.s3, bucket, key)
+                if digest is None:
+                    print(f"[manifest] {key}: gone before it was hashed – left to its removal event")
+                    return None
+                sha256, etag, size = digest
+                if not item or item.get("deleted"):
+                    change = "added"
+                else:
+                    change = None if item.get("sha256") == sha256 else "modified"
+                fields = {"sha256": sha256, "etag": etag, "size": size, "deleted": False,
+                          "listing": "live", "last_modified": record.get("eventTime", "")}
+
+            if self._write(key, fields, sequencer, item):
+                if change is None:
+                    print(f"[manifest] {key}: no content change – no re-index")
+                    return None
+                return {"key": key, "change": change, "event": record.get("eventName", "")}
+            # Another event for this key was applied in between – re-read and decide again
+        raise RuntimeError(f"Manifest item {key} kept changing – gave up after {APPLY_RETRIES} attempts")
+
+    def _write(self, key: str, fields: dict, sequencer: str, read_item) -> bool:
+        """Put the item unless it was rewritten since read_item was read."""
+        revision = int(read_item["revision"]) if read_item else 0
+        item = {"object_key": key, **fields, "sequencer": sequencer,
+                "revision": revision + 1, "updated_at": int(time.time())}
+        if read_item is None:
+            condition = {"ConditionExpression": "attribute_not_exists(object_key)"}
+        else:
+            condition = {
+                "ConditionExpression": "revision = :read",
+                "ExpressionAttributeValues": {":read": revision},
+            }
+        try:
+            self.table.put_item(Item=item, **condition)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+    # ── Reconcile ────────────────────────────────────────────────────────
+    def reconcile(self, bucket: str) -> dict:
+        """
+        Recompute the manifest from the bucket: list every object, hash them
+        RECONCILE_WORKERS at a time, and correct the items that disagree.
+        Items an S3 event rewrote while this ran are left alone. Returns the
+        drift found: {"objects", "unchanged", "added", "modified", "removed",
+        "skipped", "keys"}. Items whose content matches but whose listing
+        fields are missing (written before them) are rewritten and counted
+        as "refreshed", not as drift.
+        """
+        listed = {}
+        for page in self.s3.get_paginator("list_objects_v2").paginate(Bucket=bucket):
+            for obj in page.get("Contents", []):
+                listed[obj["Key"]] = obj
+
+        manifest, kwargs = {}, {}
+        while True:
+            resp = self.table.scan(**kwargs)
+            manifest.update({item["object_key"]: item for item in resp.get("Items", [])})
+            if "LastEvaluatedKey" not in resp:
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+        def current(key):
+            item = manifest.get(key)
+            if item and not item.get("deleted") and item.get("etag") == _etag(listed[key]["ETag"]):
+                return key, (item["sha256"], item["etag"], item.get("size", listed[key]["Size"]))
+            return key, digest_object(self.s3, bucket, key)
+
+        # Hashing streams each body and is I/O bound; manifest writes stay on this thread
+        with ThreadPoolExecutor(max_workers=RECONCILE_WORKERS) as pool:
+            digests = dict(pool.map(current, listed))
+
+        report = {"objects": len(listed), "unchanged": 0, "refreshed": 0, "added": 0, "modified": 0,
+                  "removed": 0, "skipped": 0, "keys": []}
+        for key in sorted(set(listed) | set(manifest)):
+            item, digest = manifest.get(key), digests.get(key)
+            if digest is None:
+                if not item or item.get("deleted"):
+                    continue
+                change, fields = "removed", {"deleted": True}
+            else:
+                sha256, etag, size = digest
+                fields = {"sha256": sha256, "etag": etag, "size": size, "deleted": False,
+                          "listing": "live", "last_modified": _timestamp(listed[key]["LastModified"])}
+                if item and not item.get("deleted") and item.get("sha256") == sha256:
+                    if "listing" in item:
+                        report["unchanged"] += 1
+                        continue
+                    change = "refreshed"
+                else:
+                    change = "modified" if item and not item.get("deleted") else "added"
+
+            # Keep the event sequencer, so later events are still ordered against it
+            if self._write(key, fields, (item or {}).get("sequencer", ""), item):
+                report[change] += 1
+                if change != "refreshed":
+                    report["keys"].append({"key": key, "change": change})
+            else:
+                report["skipped"] += 1
+
+        print(f"[manifest] reconcile: { {k: v for k, v in report.items() if k != 'keys'} }")
+        return report
@@ -1,27 +1,98 @@
 import os
 import json
+import time
 import boto3
 from datetime import datetime
-from botocore.exceptions import ClientError
+
+from content_manifest import ContentManifest
+from ingestion import IngestionScheduler
+import job_monitor
 
 # Environment variables
 KNOWLEDGE_BASE_ID = os.environ['KNOWLEDGE_BASE_ID']
 DATA_SOURCE_ID = os.environ['DATA_SOURCE_ID']
+INGESTION_STATE_TABLE = os.environ['INGESTION_STATE_TABLE']
+CONTENT_MANIFEST_TABLE = os.environ['CONTENT_MANIFEST_TABLE']
+KB_BUCKET_NAME = os.environ['KB_BUCKET_NAME']
+# Quiet period before a burst of changes is indexed, and the longest a change may wait
+INGESTION_DEBOUNCE_SECONDS = int(os.environ.get('INGESTION_DEBOUNCE_SECONDS', '60'))
+INGESTION_MAX_DELAY_SECONDS = int(os.environ.get('INGESTION_MAX_DELAY_SECONDS', '600'))
 
 # AWS Clients
 bedrock_agent = boto3.client('bedrock-agent')
 sns = boto3.client('sns')
+s3 = boto3.client('s3')
+events = boto3.client('events')
+dynamodb = boto3.resource('dynamodb')
+
+manifest = ContentManifest(dynamodb.Table(CONTENT_MANIFEST_TABLE), s3)
+
+
+def job_finished(summary):
+    """Report a finished ingestion job: metrics, completion event, admin notice."""
+    job_monitor.publish(events, KNOWLEDGE_BASE_ID, DATA_SOURCE_ID, summary)
+    notify_sync_finished(summary)
+
+
+scheduler = IngestionScheduler(
+    dynamodb.Table(INGESTION_STATE_TABLE),
+    bedrock_agent,
+    KNOWLEDGE_BASE_ID,
+    DATA_SOURCE_ID,
+    debounce_seconds=INGESTION_DEBOUNCE_SECONDS,
+    max_delay_seconds=INGESTION_MAX_DELAY_SECONDS,
+    on_finished=job_finished,
+)
 
 def lambda_handler(event, context):
     """
-    Triggered by S3 events (PUT, DELETE) to sync the Bedrock Knowledge Base.
-    Starts an ingestion job to re-index the knowledge base with updated documents.
+    Entry shapes:
+      - S3 events (PUT, DELETE) on the KB bucket: events whose content digest
+        changed (content_manifest.py) mark the data source dirty; the
+        ingestion job starts once the burst has been quiet (ingestion.py)
+      - {"action": "tick"} every minute: start due jobs, report and follow up
+        finished ones (job_monitor.py)
+      - {"action": "request_sync"} manual sync (adminFile POST /sync): due now
+      - {"action": "reconcile", "request_sync": true|false} rehash the whole
+        bucket into the manifest; any drift found is queued for indexing
+        unless request_sync is false
+      - {"action": "hold", "operation": id, "seconds": n} /
+        {"action": "release", "operation": id} bracket a bulk operation
+        (adminFile archive import, batch delete) so that everything it
+        writes is indexed by a single job
     """
 
     print(f"Received event: {json.dumps(event)}")
 
-    # Extract S3 event details
     try:
+        action = event.get('action')
+        if action == 'tick':
+            state = scheduler.tick()
+            return {'statusCode': 200, 'body': json.dumps(state_summary(state))}
+
+        if action == 'request_sync':
+            scheduler.mark_dirty(immediate=True)
+            state = scheduler.tick()
+            return {'statusCode': 200, 'body': json.dumps(state_summary(state))}
+
+        if action in ('hold', 'release'):
+            operation = event.get('operation')
+            if not operation:
+                return {'statusCode': 400, 'body': json.dumps('operation is required')}
+            if action == 'hold':
+                state = scheduler.hold(operation, int(event.get('seconds', 900)))
+            else:
+                state = scheduler.release(operation)
+            return {'statusCode': 200, 'body': json.dumps(state_summary(state))}
+
+        if action == 'reconcile':
+            report = manifest.reconcile(KB_BUCKET_NAME)
+            drift = report['added'] + report['modified'] + report['removed']
+            if drift and event.get('request_sync', True):
+                report.update(state_summary(scheduler.mark_dirty(changes=drift)))
+            return {'statusCode': 200, 'body': json.dumps(report)}
+
+        # Extract S3 event details
         records = event.get('Records', [])
         if not records:
             return {
@@ -29,86 +100,74 @@ def lambda_handler(event, context):
                 'body': json.dumps('No S3 records found in event')
             }
 
-        # Collect all file changes
+        # Keep only events whose content actually changed
         file_changes = []
-        for record in records:
-            event_name = record.get('eventName', '')
-            s3_info = record.get('s3', {})
-            bucket = s3_info.get('bucket', {}).get('name', '')
-            key = s3_info.get('object', {}).get('key', '')
-
-            file_changes.append({
-                'event': event_name,
-                'bucket': bucket,
-                'key': key,
-                'timestamp': record.get('eventTime', '')
-            })
+        try:
+            for record in records:
+                change = manifest.apply(record)
+                if change:
+                    file_changes.append({**change, 'timestamp': record.get('eventTime', '')})
+        except Exception:
+            # The retry drops the records already applied (their sequencer is
+            # recorded), so queue their changes before failing the invocation
+            if file_changes:
+                scheduler.mark_dirty(changes=len(file_changes))
+            raise
+
+        print(f"{len(file_changes)} of {len(records)} events changed content: {json.dumps(file_changes)}")
 
-        print(f"Processing {len(file_changes)} file changes: {json.dumps(file_changes)}")
+        if not file_changes:
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'No content changes – nothing to index',
+                    'filesProcessed': len(records),
+                    'changes': []
+                })
+            }
 
-        # Start Knowledge Base ingestion job
-        response = start_ingestion_job()
+        # Queue the changes; one job will cover the whole burst
+        state = scheduler.mark_dirty(changes=len(file_changes))
 
         # Notify admins (optional)
-        notify_admins(file_changes, response)
+        notify_admins(file_changes, state)
 
         return {
             'statusCode': 200,
             'body': json.dumps({
-                'message': 'Knowledge base sync initiated successfully',
-                'ingestionJobId': response.get('ingestionJob', {}).get('ingestionJobId'),
-                'filesProcessed': len(file_changes),
+                'message': 'Knowledge base sync scheduled',
+                **state_summary(state),
+                'filesProcessed': len(records),
                 'changes': file_changes
             })
         }
 
     except Exception as e:
-        print(f"Error processing S3 event: {str(e)}")
+        print(f"Error processing event: {str(e)}")
+        if 'Records' in event:
+            # Fail the async S3 invocation so Lambda retries it
+            raise
         return {
             'statusCode': 500,
             'body': json.dumps(f'Error: {str(e)}')
         }
 
 
-def start_ingestion_job():
-    """
-    Starts a Bedrock Knowledge Base ingestion job to sync documents.
-    """
-    try:
-        print(f"Starting ingestion job for Knowledge Base: {KNOWLEDGE_BASE_ID}, Data Source: {DATA_SOURCE_ID}")
-
-        response = bedrock_agent.start_ingestion_job(
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            dataSourceId=DATA_SOURCE_ID,
-            description=f"Auto-sync triggered by S3 event at {datetime.utcnow().isoformat()}"
-        )
-
-        ingestion_job = response.get('ingestionJob', {})
-        job_id = ingestion_job.get('ingestionJobId')
-        status = ingestion_job.get('status')
-
-        print(f"Ingestion job started successfully. Job ID: {job_id}, Status: {status}")
-
-        return response
-
-    except ClientError as e:
-        error_code = e.response['Error']['Code']
+def state_summary(state):
+    """JSON-safe view of the scheduler state item."""
+    return {
+        'state': state.get('state'),
+        'ingestionJobId': state.get('job_id'),
+        'pendingChanges': int(state.get('changes', 0)),
+        'rerunQueued': bool(state.get('rerun')),
+        'kbVersion': int(state.get('kb_version', 0)),
+        'heldBy': IngestionScheduler.live_holds(state, int(time.time())),
+        # DynamoDB numbers come back as Decimal
+        'lastJob': json.loads(json.dumps(state.get('last_job'), default=int)),
+    }
 
-        # Handle conflict - ingestion job already in progress
-        if error_code == 'ConflictException':
-            print("Ingestion job already in progress. Skipping...")
-            return {
-                'ingestionJob': {
-                    'ingestionJobId': 'existing-job',
-                    'status': 'IN_PROGRESS'
-                }
-            }
-        else:
-            print(f"Error starting ingestion job: {str(e)}")
-            raise
 
-
-def notify_admins(file_changes, ingestion_response):
+def notify_admins(file_changes, state):
     """
     Sends SNS notification to admins about knowledge base sync.
     """
@@ -119,11 +178,11 @@ def notify_admins(file_changes, ingestion_response):
         return
 
     try:
-        job_id = ingestion_response.get('ingestionJob', {}).get('ingestionJobId', 'N/A')
+        status = 'Queued behind the running job' if state.get('state') == 'running' else 'Queued'
 
         # Build notification message
         file_list = "\n".join([
-            f"- {change['event']}: {change['key']}"
+            f"- {change['change']}: {change['key']}"
             for change in file_changes[:10]  # Limit to first 10 files
         ])
 
@@ -139,11 +198,10 @@ The MHFA Learning Navigator knowledge base is being synchronized with the latest
 Files Changed: {len(file_changes)}
 {file_list}
 
-Ingestion Job ID: {job_id}
-Status: Started
+Status: {status}
 Timestamp: {datetime.utcnow().isoformat()}
 
-The chatbot will automatically use updated information once the sync completes (typically 2-5 minutes).
+Changes are indexed together once uploads pause for {INGESTION_DEBOUNCE_SECONDS}s. You will get another notification when that sync has finished.
 
 Note: No action required. This is an automated notification.
 """
@@ -161,19 +219,38 @@ Note: No action required. This is an automated notification.
         # Don't fail the entire function if notification fails
 
 
-def get_ingestion_job_status(job_id):
+def notify_sync_finished(summary):
     """
-    Check the status of an ingestion job (optional monitoring function).
+    Sends SNS notification to admins when an ingestion job has finished.
     """
+    sns_topic_arn = os.environ.get('ADMIN_NOTIFICATION_TOPIC_ARN')
+
+    if not sns_topic_arn:
+        return
+
     try:
-        response = bedrock_agent.get_ingestion_job(
-            knowledgeBaseId=KNOWLEDGE_BASE_ID,
-            dataSourceId=DATA_SOURCE_ID,
-            ingestionJobId=job_id
-        )
+        docs = summary['documents']
+        outcome = 'Failed' if job_monitor.failed(summary) else 'Completed'
+        reasons = "\n".join(f"- {reason}" for reason in summary['failure_reasons'])
 
-        return response.get('ingestionJob', {})
+        message = f"""
+Knowledge Base Sync {outcome}
+====================================
+
+Job: {summary['job_id']} ({summary['status']})
+Duration: {summary['duration_seconds']}s ({summary['lag_seconds']}s after the first change it includes)
+Knowledge base version: {summary['kb_version']}
+
+Documents scanned: {docs['scanned']}
+New: {docs['new']}, modified: {docs['modified']}, deleted: {docs['deleted']}, failed: {docs['failed']}
+{reasons}
+"""
+
+        sns.publish(
+            TopicArn=sns_topic_arn,
+            Subject=f'Knowledge Base Sync {outcome}',
+            Message=message
+        )
 
-    except ClientError as e:
-        print(f"Error getting ingestion job status: {str(e)}")
-        return None
+    except Exception as e:
+        print(f"Error sending sync completion notification: {str(e)}")
@@ -0,0 +1,312 @@
+"""
+Debounced, coalescing scheduler for Knowledge Base ingestion jobs.
+
+Every writer of the KB bucket (adminFile uploads/deletes, emailReply admin
+answers, console uploads) reaches this through S3 events. Instead of
+starting an ingestion job per event, each change only marks the data
+source dirty. A scheduled tick starts one job once changes have been
+quiet for DEBOUNCE_SECONDS, or at the latest MAX_DELAY_SECONDS after the
+first unindexed change. Changes that land while a job runs set `rerun`,
+and the finished job is followed by another, so nothing written during a
+job is left out of the index. A FAILED job goes back to dirty and is
+retried after a doubling backoff, at most MAX_FAILED_RETRIES times in a
+row; a new change resets the count.
+
+A bulk operation (adminFile archive import or batch delete) writes many
+objects over several minutes. Pauses between its writes, and the
+MAX_DELAY_SECONDS cap, could otherwise start a job partway through and a
+second one for the rest. Such an operation takes a hold first: no job
+starts while any hold is live. Its release restarts the debounce, so the
+S3 events still in flight for its last writes join the same job. Each
+hold lapses by itself at its expiry, so a crashed operation cannot block
+indexing for good.
+
+State item, one per data source (NCMWKbIngestionState):
+  data_source_id   PK
+  state            "idle" | "dirty" | "running"
+  due_at           epoch seconds the dirty state may start a job
+  dirty_since      epoch seconds of the first unindexed change
+  changes          changes folded into the next job
+  rerun            running only: changes arrived after the job started
+  job_id           running only: Bedrock ingestion job id (absent while claiming)
+  started_at       running only
+  indexing_since   running only: first change the job picks up
+  job_changes      running only: changes the job picks up
+  last_job         summary of the last finished job (job_monitor.summarize)
+  kb_version       bumped each time a finished job changed the index
+  holds            {operation: epoch seconds}: bulk operations in progress
+  failed_attempts  consecutive FAILED jobs for the pending changes
+Every transition is a conditional update, so concurrent S3 notifications
+and ticks can never start two jobs or drop a change.
+"""
+
+import time
+
+from botocore.exceptions import ClientError
+
+from job_monitor import changed_index, summarize
+
+DEBOUNCE_SECONDS = 60
+MAX_DELAY_SECONDS = 600
+# A claim whose StartIngestionJob never reported back (crash) is released after this
+CLAIM_TIMEOUT_SECONDS = 300
+FINISHED_STATUSES = ("COMPLETE", "FAILED", "STOPPED")
+# Retries of a FAILED job, debounce * 2^attempt apart, before waiting for the next change
+MAX_FAILED_RETRIES = 3
+
+
+def _conditional(fn):
+    """Run a conditional write; its response, or None when its condition did not hold."""
+    try:
+        return fn()
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return None
+        raise
+
+
+class IngestionScheduler:
+    def __init__(self, table, bedrock_agent, knowledge_base_id: str, data_source_id: str,
+                 debounce_seconds: int = DEBOUNCE_SECONDS, max_delay_seconds: int = MAX_DELAY_SECONDS,
+                 on_finished=None):
+        self.table = table
+        self.bedrock_agent = bedrock_agent
+        self.kb_id = knowledge_base_id
+        self.ds_id = data_source_id
+        self.debounce = debounce_seconds
+        self.max_delay = max_delay_seconds
+        # Called with the summary of every finished job, once, by the tick that recorded it
+        self.on_finished = on_finished
+
+    @property
+    def key(self) -> dict:
+        return {"data_source_id": self.ds_id}
+
+    def get(self) -> dict:
+        item = self.table.get_item(Key=self.key, ConsistentRead=True).get("Item")
+        # A hold can create the item before any change has
+        return {**self.key, "state": "idle", **(item or {})}
+
+    @staticmethod
+    def live_holds(item: dict, now: int) -> list:
+        return sorted(op for op, until in (item.get("holds") or {}).items() if int(until) > now)
+
+    # ── Transitions ──────────────────────────────────────────────────────
+    def mark_dirty(self, changes: int = 1, immediate: bool = False, now: float = None) -> dict:
+        """
+        Record changes. idle/dirty → dirty (debounce restarted, capped by
+        MAX_DELAY_SECONDS); running → rerun once the job finishes.
+        """
+        now = int(now or time.time())
+        due = now if immediate else now + self.debounce
+        values = {":n": changes, ":now": now, ":running": "running"}
+
+        # idle/dirty (or no item yet) → dirty
+        if _conditional(lambda: self.table.update_item(
+            Key=self.key,
+            UpdateExpression=(
+                "SET #s = :dirty, dirty_since = if_not_exists(dirty_since, :now), "
+                "due_at = :due, last_change_at = :now REMOVE failed_attempts ADD changes :n"
+            ),
+            ConditionExpression="attribute_not_exists(#s) OR #s <> :running",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={**values, ":dirty": "dirty", ":due": due},
+        )):
+            print(f"[ingestion] {changes} change(s) → dirty, due in {due - now}s")
+            return self.get()
+
+        # running → remember to run again afterwards
+        if _conditional(lambda: self.table.update_item(
+            Key=self.key,
+            UpdateExpression=(
+                "SET rerun = :true, dirty_since = if_not_exists(dirty_since, :now), "
+                "last_change_at = :now ADD changes :n"
+            ),
+            ConditionExpression="#s = :running",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={**values, ":true": True},
+        )):
+            print(f"[ingestion] {changes} change(s) during a running job → rerun queued")
+            return self.get()
+
+        # The state flipped between the two writes (job just finished) – retry once more
+        return self.mark_dirty(changes, immediate, now)
+
+    def hold(self, operation: str, seconds: int, now: float = None) -> dict:
+        """Keep jobs from starting until release(operation), or for `seconds` at most."""
+        now = int(now or time.time())
+        # The map must exist before one of its entries can be set
+        self.table.update_item(
+            Key=self.key,
+            UpdateExpression="SET holds = if_not_exists(holds, :empty)",
+            ExpressionAttributeValues={":empty": {}},
+        )
+        # Lapsed holds of operations that never released are dropped on the way
+        lapsed = [op for op, until in self.get().get("holds", {}).items() if int(until) <= now and op != operation]
+        names = {"#op": operation, **{f"#l{i}": op for i, op in enumerate(lapsed)}}
+        remove = f" REMOVE {', '.join(f'holds.#l{i}' for i in range(len(lapsed)))}" if lapsed else ""
+        self.table.update_item(
+            Key=self.key,
+            UpdateExpression=f"SET holds.#op = :until{remove}",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={":until": now + int(seconds)},
+        )
+        print(f"[ingestion] hold {operation} for up to {seconds}s")
+        return self.get()
+
+    def release(self, operation: str, now: float = None) -> dict:
+        """
+        End a hold. If changes are waiting, their debounce starts over from
+        now (MAX_DELAY_SECONDS too): the operation's last S3 events may
+        still be on their way and should land in the same job.
+        """
+        now = int(now or time.time())
+        _conditional(lambda: self.table.update_item(
+            Key=self.key,
+            UpdateExpression="REMOVE holds.#op",
+            ConditionExpression="attribute_exists(holds)",
+            ExpressionAttributeNames={"#op": operation},
+        ))
+        if _conditional(lambda: self.table.update_item(
+            Key=self.key,
+            UpdateExpression="SET due_at = :due, dirty_since = :now",
+            ConditionExpression="#s = :dirty",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={":dirty": "dirty", ":due": now + self.debounce, ":now": now},
+        )):
+            print(f"[ingestion] released {operation} → job due in {self.debounce}s")
+        else:
+            print(f"[ingestion] released {operation}")
+        return self.get()
+
+    def tick(self, now: float = None) -> dict:
+        """Advance the state machine: finish a running job, or start a due one."""
+        now = int(now or time.time())
+        item = self.get()
+        if item["state"] == "running":
+            return self._check_running(item, now)
+        if item["state"] == "dirty":
+            held = self.live_holds(item, now)
+            if held:
+                print(f"[ingestion] dirty, held by {', '.join(held)}")
+                return item
+            due = min(int(item["due_at"]), int(item.get("dirty_since", now)) + self.max_delay)
+            if now >= due:
+                return self._start(item, now)
+        return item
+
+    def _start(self, item: dict, now: int) -> dict:
+        # Claim first: only one caller wins dirty → running for this due_at
+        if not _conditional(lambda: self.table.update_item(
+            Key=self.key,
+            UpdateExpression=(
+                "SET #s = :running, started_at = :now, rerun = :false, "
+                "indexing_since = :since, job_changes = :n "
+                "REMOVE job_id, due_at, dirty_since, changes"
+            ),
+            ConditionExpression="#s = :dirty AND due_at = :due",
+            ExpressionAttributeNames={"#s": "state"},
+            ExpressionAttributeValues={
+                ":running": "running", ":dirty": "dirty", ":now": now, ":false": False, ":due": item["due_at"],
+                ":since": item.get("dirty_since", now), ":n": item.get("changes", 0),
+            },
+        )):
+            return self.get()
+
+        try:
+            job = self.bedrock_agent.start_ingestion_job(
+                knowledgeBaseId=self.kb_id,
+                dataSourceId=self.ds_id,
+                description=f"{int(item.get('changes', 0))} change(s) since {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(int(item.get('dirty_since', now))))}",
+            )["ingestionJob"]
+        except ClientError as e:
+            # ConflictException: a job started elsewhere (console) is running –
+            # stay dirty and try again on the next tick
+            print(f"[ingestion] start failed ({e.response['Error']['Code']}) – staying dirty")
+            self.table.update_item(
+                Key=self.key,
+                UpdateExpression=(
+                    "SET #s = :dirty, due_at = :retry, dirty_since = :since "
+                    "REMOVE started_at, rerun, indexing_since, job_changes ADD changes :n"
+                ),
+                ExpressionAttributeNames={"#s": "state"},
+                ExpressionAttributeValues={
+                    ":dirty": "dirty", ":retry": now + self.debounce,
+                    ":since": item.get("dirty_since", now), ":n": item.get("changes", 0),
+                },
+            )
+            return self.get()
+
+        self.table.update_item(
+            Key=self.key,
+            UpdateExpression="SET job_id = :job",
+            ExpressionAttributeValues={":job": job["ingestionJobId"]},
+        )
+        print(f"[ingestion] started job {job['ingestionJobId']} for {int(item.get('changes', 0))} change(s)")
+        return self.get()
+
+    def _check_running(self, item: dict, now: int) -> dict:
+        job_id = item.get("job_id")
+        summary = None
+        if not job_id:
+            if now - int(item.get("started_at", 0)) < CLAIM_TIMEOUT_SECONDS:
+                return item
+            status = "ABANDONED"
+        else:
+            job = self.bedrock_agent.get_ingestion_job(
+                knowledgeBaseId=self.kb_id, dataSourceId=self.ds_id, ingestionJobId=job_id,
+            )["ingestionJob"]
+            status = job["status"]
+            if status not in FINISHED_STATUSES:
+                return item
+            summary = summarize(job, item.get("indexing_since"), item.get("job_changes"), now)
+
+        # Changes queued during the job, or a claim that never started one, need
+        # another run straight away. A FAILED job's own changes go back to dirty
+        # after a backoff; once MAX_FAILED_RETRIES is spent the next change retries.
+        attempts = int(item.get("failed_attempts", 0))
+        follow_up = bool(item.get("rerun")) or status == "ABANDONED"
+        retry = not follow_up and status == "FAILED" and attempts < MAX_FAILED_RETRIES
+        condition = "#s = :running AND job_id = :job" if job_id else "#s = :running AND attribute_not_exists(job_id)"
+        values = {":running": "running", **({":job": job_id} if job_id else {})}
+        removes = ["job_id", "started_at", "rerun", "indexing_since", "job_changes"]
+        adds = []
+        if follow_up:
+            sets = "#s = :dirty, due_at = :due, dirty_since = if_not_exists(dirty_since, :now)"
+            values.update({":dirty": "dirty", ":due": now, ":now": now})
+            removes.append("failed_attempts")
+        elif retry:
+            # dirty_since restarts too, or MAX_DELAY_SECONDS would cut the backoff short
+            sets = "#s = :dirty, due_at = :due, dirty_since = :now"
+            values.update({
+                ":dirty": "dirty", ":due": now + self.debounce * 2 ** attempts, ":now": now,
+                ":changes": item.get("job_changes", 0), ":one": 1,
+            })
+            adds += ["changes :changes", "failed_attempts :one"]
+        else:
+            sets = "#s = :idle"
+            values[":idle"] = "idle"
+            removes.append("failed_attempts")
+        if summary:
+            sets += ", last_job = :last"
+            adds.append("kb_version :bump")
+            values.update({":last": summary, ":bump": int(changed_index(summary))})
+        update = f"SET {sets} REMOVE {', '.join(removes)}" + (f" ADD {', '.join(adds)}" if adds else "")
+        response = _conditional(lambda: self.table.update_item(
+            Key=self.key, UpdateExpression=update, ConditionExpression=condition,
+            ExpressionAttributeNames={"#s": "state"}, ExpressionAttributeValues=values,
+            ReturnValues="ALL_NEW",
+        ))
+        if retry:
+            outcome = f"retry {attempts + 1}/{MAX_FAILED_RETRIES} in {self.debounce * 2 ** attempts}s"
+        elif follow_up:
+            outcome = "follow-up job"
+        elif status == "FAILED":
+            outcome = f"idle, gave up after {attempts} retries"
+        else:
+            outcome = "idle"
+        print(f"[ingestion] job {job_id} ended {status} → {outcome}")
+        if response and summary and self.on_finished:
+            # Only the tick whose write won reports the job
+            self.on_finished({**summary, "kb_version": int(response["Attributes"].get("kb_version", 0))})
+        return self.tick(now) if follow_up else self.get()
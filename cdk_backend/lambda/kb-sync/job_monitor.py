@@ -0,0 +1,120 @@
+"""
+Completion reporting for knowledge base ingestion jobs.
+
+The scheduler (ingestion.py) checks the running job on every one-minute
+tick. When the job has finished, it calls summarize() and stores the
+result as `last_job` on the state item, in the same conditional write that
+leaves the running state. A job whose documents changed the index also
+bumps `kb_version` in that write. The version therefore rises strictly
+once per index change, and anything caching knowledge base answers can
+key on it.
+
+publish() runs only for the caller whose write won. It then:
+  - prints CloudWatch embedded-metric lines (namespace METRIC_NAMESPACE):
+    SyncDurationSeconds, IndexLagSeconds (oldest indexed change → done),
+    DocumentsScanned / Indexed / Deleted / Failed, SyncFailed (0 or 1);
+  - sends a "Knowledge Base Sync Completed" event to the default
+    EventBridge bus (source EVENT_SOURCE) with the summary as detail.
+"""
+
+import json
+import time
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+METRIC_NAMESPACE = "NCMW/KnowledgeBase"
+EVENT_SOURCE = "ncmw.knowledge-base"
+EVENT_DETAIL_TYPE = "Knowledge Base Sync Completed"
+MAX_FAILURE_REASONS = 5
+
+
+def _epoch(value) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def summarize(job: dict, indexing_since, changes, now: int) -> dict:
+    """DynamoDB-safe summary (ints and strings only) of a finished GetIngestionJob result."""
+    stats = job.get("statistics", {})
+    started = _epoch(job.get("startedAt", now))
+    finished = _epoch(job.get("updatedAt", now))
+    documents = {
+        "scanned": int(stats.get("numberOfDocumentsScanned", 0)),
+        "new": int(stats.get("numberOfNewDocumentsIndexed", 0)),
+        "modified": int(stats.get("numberOfModifiedDocumentsIndexed", 0)),
+        "deleted": int(stats.get("numberOfDocumentsDeleted", 0)),
+        "failed": int(stats.get("numberOfDocumentsFailed", 0)),
+    }
+    return {
+        "job_id": job["ingestionJobId"],
+        "status": job["status"],
+        "started_at": started,
+        "finished_at": finished,
+        "duration_seconds": max(0, finished - started),
+        # From the first change this job picked up until it was searchable
+        "lag_seconds": max(0, finished - int(indexing_since or started)),
+        "changes": int(changes or 0),
+        "documents": documents,
+        "failure_reasons": list(job.get("failureReasons", []))[:MAX_FAILURE_REASONS],
+    }
+
+
+def changed_index(summary: dict) -> bool:
+    """Whether the job may have changed what retrieval returns (partial failures included)."""
+    docs = summary["documents"]
+    return docs["new"] + docs["modified"] + docs["deleted"] > 0
+
+
+def failed(summary: dict) -> bool:
+    return summary["status"] != "COMPLETE" or summary["documents"]["failed"] > 0
+
+
+def publish(events, knowledge_base_id: str, data_source_id: str, summary: dict):
+    """Metrics and the completion event for one finished job (best effort)."""
+    docs = summary["documents"]
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRIC_NAMESPACE,
+                "Dimensions": [["DataSourceId"]],
+                "Metrics": [
+                    {"Name": "SyncDurationSeconds", "Unit": "Seconds"},
+                    {"Name": "IndexLagSeconds", "Unit": "Seconds"},
+                    {"Name": "DocumentsScanned", "Unit": "Count"},
+                    {"Name": "DocumentsIndexed", "Unit": "Count"},
+                    {"Name": "DocumentsDeleted", "Unit": "Count"},
+                    {"Name": "DocumentsFailed", "Unit": "Count"},
+                    {"Name": "SyncFailed", "Unit": "Count"},
+                ],
+            }],
+        },
+        "DataSourceId": data_source_id,
+        "SyncDurationSeconds": summary["duration_seconds"],
+        "IndexLagSeconds": summary["lag_seconds"],
+        "DocumentsScanned": docs["scanned"],
+        "DocumentsIndexed": docs["new"] + docs["modified"],
+        "DocumentsDeleted": docs["deleted"],
+        "DocumentsFailed": docs["failed"],
+        "SyncFailed": int(failed(summary)),
+        "JobId": summary["job_id"],
+        "Status": summary["status"],
+        "KbVersion": summary.get("kb_version"),
+    }))
+
+    try:
+        response = events.put_events(Entries=[{
+            "Source": EVENT_SOURCE,
+            "DetailType": EVENT_DETAIL_TYPE,
+            "Detail": json.dumps({
+                "knowledgeBaseId": knowledge_base_id,
+                "dataSourceId": data_source_id,
+                **summary,
+            }),
+        }])
+        if response.get("FailedEntryCount"):
+            print(f"[job_monitor] completion event rejected: {response['Entries']}")
+    except ClientError as e:
+        print(f"[job_monitor] completion event not sent: {e}")
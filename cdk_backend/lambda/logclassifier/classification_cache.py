@@ -0,0 +1,121 @@
+"""
+Memo cache for LLM question classifications.
+
+Lookups go in-process LRU → DynamoDB table (items expire through TTL) → miss.
+Keys are a SHA-256 of the taxonomy version plus the normalised question
+(lowercased, punctuation and whitespace folded), so "How do I renew?" and
+"how do i renew" share an entry and a taxonomy bump invalidates everything.
+"""
+
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from taxonomy import TAXONOMY_VERSION, VALID_CATEGORIES
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class ClassificationCache:
+    def __init__(self, dynamodb=None, table=None, max_entries=4096, ttl_days=30, taxonomy_version=TAXONOMY_VERSION):
+        # batch_get_item lives on the service resource (the table's own client returns raw AttributeValues)
+        self.dynamodb = dynamodb
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_days * 86400
+        self.taxonomy_version = taxonomy_version
+        self._lru = OrderedDict()
+
+    def key(self, question: str) -> str:
+        raw = f"{self.taxonomy_version}\n{normalize_question(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ── reads ────────────────────────────────────────────────────────────────
+    def lookup(self, questions: list) -> tuple:
+        """
+        Return (categories, memory_hits, table_hits): one cached category or None
+        per question, plus where the hits came from.
+        """
+        keys = [self.key(q) for q in questions]
+        found, memory_hits = {}, 0
+        for k in set(keys):
+            if k in self._lru:
+                self._lru.move_to_end(k)
+                found[k] = self._lru[k]
+                memory_hits += keys.count(k)
+
+        missing = [k for k in set(keys) if k not in found]
+        from_table = self._get_from_table(missing) if missing else {}
+        for k, category in from_table.items():
+            self._remember(k, category)
+        found.update(from_table)
+        table_hits = sum(1 for k in keys if k in from_table)
+
+        return [found.get(k) for k in keys], memory_hits, table_hits
+
+    def _get_from_table(self, keys: list) -> dict:
+        if self.table is None:
+            return {}
+        found = {}
+        now = int(time.time())
+        for start in range(0, len(keys), 100):
+            chunk = keys[start:start + 100]
+            try:
+                resp = self.dynamodb.batch_get_item(RequestItems={
+                    self.table.name: {
+                        "Keys": [{"question_hash": k} for k in chunk],
+                        "ProjectionExpression": "question_hash, category, taxonomy_version, expires_at",
+                    }
+                })
+            except Exception as e:
+                # The cache is an optimisation – never fail classification because of it
+                print(f"[classification_cache] batch_get_item error: {e}")
+                continue
+            for item in resp.get("Responses", {}).get(self.table.name, []):
+                # TTL deletion is lazy, so expired rows can still be returned
+                if item.get("taxonomy_version") != self.taxonomy_version or int(item.get("expires_at", 0)) < now:
+                    continue
+                if item.get("category") in VALID_CATEGORIES:
+                    found[item["question_hash"]] = item["category"]
+        return found
+
+    # ── writes ───────────────────────────────────────────────────────────────
+    def store(self, questions: list, categories: list):
+        """Remember fresh LLM labels in memory and in the table."""
+        entries = {}
+        for question, category in zip(questions, categories):
+            k = self.key(question)
+            self._remember(k, category)
+            entries[k] = (question, category)
+
+        if self.table is None or not entries:
+            return
+        now = int(time.time())
+        try:
+            with self.table.batch_writer(overwrite_by_pkeys=["question_hash"]) as writer:
+                for k, (question, category) in entries.items():
+                    writer.put_item(Item={
+                        "question_hash": k,
+                        "category": category,
+                        "taxonomy_version": self.taxonomy_version,
+                        "question": normalize_question(question)[:500],
+                        "created_at": now,
+                        "expires_at": now + self.ttl_seconds,
+                    })
+        except Exception as e:
+            print(f"[classification_cache] write error: {e}")
+
+    def _remember(self, key: str, category: str):
+        self._lru[key] = category
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
@@ -0,0 +1,72 @@
+"""
+Day-bucket attribute behind the DayBucketIndex GSI on the session-logs table.
+
+  day_bucket  = "YYYY-MM-DD#<shard>"   GSI partition key
+  original_ts                          GSI sort key
+
+Each day is spread over `shards` partitions by a stable hash of session_id, so
+a busy day never puts every write on one GSI partition. A timeframe is read
+with one Query per (day, shard) instead of a full-table Scan.
+
+retrieveSessionLogs/day_index.py queries the same layout – keep the two in
+sync, and never change the shard count without re-running the backfill.
+"""
+
+import time
+import zlib
+
+from boto3.dynamodb.conditions import Attr
+
+
+def shard_for(session_id: str, shards: int) -> int:
+    # crc32, not hash(): str hashes are salted per process
+    return zlib.crc32((session_id or "").encode("utf-8")) % shards
+
+
+def day_bucket(iso_ts: str, session_id: str, shards: int) -> str:
+    return f"{iso_ts[:10]}#{shard_for(session_id, shards)}"
+
+
+def backfill(table, shards: int, start_key=None, time_budget_seconds: float = 90.0) -> dict:
+    """
+    Set day_bucket on items written before the index existed (or with a different
+    shard count). Stops once the time budget is spent and returns the scan position
+    as `resume_key`; invoke again with that key until it comes back as None.
+    """
+    deadline = time.monotonic() + time_budget_seconds
+    kwargs = {
+        "ProjectionExpression": "session_id, #ts, original_ts, day_bucket",
+        "ExpressionAttributeNames": {"#ts": "timestamp"},
+    }
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+
+    scanned = updated = 0
+    while True:
+        resp = table.scan(**kwargs)
+        for item in resp.get("Items", []):
+            scanned += 1
+            ts = item.get("original_ts") or ""
+            if len(ts) < 10:
+                continue
+            bucket = day_bucket(ts, item["session_id"], shards)
+            if item.get("day_bucket") == bucket:
+                continue
+            try:
+                table.update_item(
+                    Key={"session_id": item["session_id"], "timestamp": item["timestamp"]},
+                    UpdateExpression="SET day_bucket = :b",
+                    # Skip rows deleted since the scan page was read
+                    ConditionExpression=Attr("session_id").exists(),
+                    ExpressionAttributeValues={":b": bucket},
+                )
+                updated += 1
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                pass
+
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key or time.monotonic() > deadline:
+            break
+        kwargs["ExclusiveStartKey"] = start_key
+
+    return {"scanned": scanned, "updated": updated, "resume_key": start_key}
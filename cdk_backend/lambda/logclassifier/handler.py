@@ -1,19 +1,101 @@
 import os
 import json
+import hashlib
+import random
+import time
 import uuid
 from datetime import datetime
 from decimal import Decimal
 import boto3
 from botocore.exceptions import ClientError
 
+import day_buckets
+import local_classifier
+import rollups
+from classification_cache import ClassificationCache
+from sentiment_sampling import SentimentSampler, is_throttle
+from taxonomy import CATEGORIES, VALID_CATEGORIES
+
 # ─── Configuration ────────────────────────────────────────────────────────────
 DYNAMODB_TABLE   = os.environ['DYNAMODB_TABLE']
 BEDROCK_MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'us.amazon.nova-lite-v1:0')
+# Max conversations folded into a single Bedrock prompt when draining the queue
+CLASSIFY_BATCH_SIZE = int(os.environ.get('CLASSIFY_BATCH_SIZE', '10'))
+
+# Local classifier artifact (written by train_classifier.py) – S3 key in BUCKET, or a local path
+BUCKET                 = os.environ.get('BUCKET')
+CLASSIFIER_MODEL_KEY   = os.environ.get('CLASSIFIER_MODEL_KEY', 'models/category_model.json')
+CLASSIFIER_MODEL_PATH  = os.environ.get('CLASSIFIER_MODEL_PATH')
+# Share of locally-classified questions re-checked by the LLM to track agreement
+CLASSIFIER_SHADOW_RATE = float(os.environ.get('CLASSIFIER_SHADOW_RATE', '0.05'))
+
+# Memo cache for LLM labels (optional table; the in-process LRU works without it)
+CLASSIFICATION_CACHE_TABLE = os.environ.get('CLASSIFICATION_CACHE_TABLE')
+CLASSIFICATION_CACHE_TTL_DAYS = int(os.environ.get('CLASSIFICATION_CACHE_TTL_DAYS', '30'))
+
+# Sentiment sampling – base share of conversations scored, reduced under backlog/throttling
+SENTIMENT_BASE_RATE      = float(os.environ.get('SENTIMENT_BASE_RATE', '0.25'))
+SENTIMENT_MIN_RATE       = float(os.environ.get('SENTIMENT_MIN_RATE', '0.02'))
+SENTIMENT_BACKLOG_TARGET = int(os.environ.get('SENTIMENT_BACKLOG_TARGET', '500'))
+ANALYTICS_QUEUE_URL      = os.environ.get('ANALYTICS_QUEUE_URL')
+
+# Hour/day rollup counters read by the analytics endpoint (optional)
+ROLLUP_TABLE   = os.environ.get('ROLLUP_TABLE')
+FEEDBACK_TABLE = os.environ.get('FEEDBACK_TABLE')
+
+# Partitions per day in the DayBucketIndex GSI – must match retrieveSessionLogs
+DAY_BUCKET_SHARDS = int(os.environ.get('DAY_BUCKET_SHARDS', '4'))
+
+# Live admin dashboard events (adminLive lambda, optional)
+ADMIN_EVENTS_QUEUE_URL = os.environ.get('ADMIN_EVENTS_QUEUE_URL')
+# Same preview length as the analytics conversation list
+PREVIEW_CHARS = 200
+# Leading answer characters compared when matching a feedback re-score request
+# (lambda/feedback stores the first 200 as message_preview)
+RESCORE_MATCH_CHARS = 120
+
+METRICS_NAMESPACE = 'LearningNavigator/Analytics'
+
+NEUTRAL_SENTIMENT = {"sentiment": "neutral", "score": 50, "reason": "Could not analyze sentiment"}
 
 # ─── AWS Clients ───────────────────────────────────────────────────────────────
 ddb      = boto3.resource('dynamodb')
 table    = ddb.Table(DYNAMODB_TABLE)
 bedrock  = boto3.client('bedrock-runtime')
+s3       = boto3.client('s3')
+sqs      = boto3.client('sqs')
+rollup_table = ddb.Table(ROLLUP_TABLE) if ROLLUP_TABLE else None
+classification_cache = ClassificationCache(
+    dynamodb=ddb,
+    table=ddb.Table(CLASSIFICATION_CACHE_TABLE) if CLASSIFICATION_CACHE_TABLE else None,
+    ttl_days=CLASSIFICATION_CACHE_TTL_DAYS,
+)
+sentiment_sampler = SentimentSampler(
+    base_rate=SENTIMENT_BASE_RATE,
+    min_rate=SENTIMENT_MIN_RATE,
+    backlog_target=SENTIMENT_BACKLOG_TARGET,
+)
+_backlog = {"value": 0, "checked_at": 0.0}
+
+
+def emit_metrics(metrics: dict, units: dict = None, **dimensions):
+    """
+    Publish metrics via CloudWatch Embedded Metric Format – a structured log line,
+    so no PutMetricData call on the hot path. Unit defaults to Count.
+    """
+    units = units or {}
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": units.get(name, "Count")} for name in metrics],
+            }],
+        },
+        **dimensions,
+        **metrics,
+    }))
 
 
 def classify_question(question: str) -> str:
@@ -22,9 +104,7 @@ def classify_question(question: str) -> str:
     """
     prompt = (
         "Classify this MHFA Learning Ecosystem question into exactly one category:\n\n"
-        "[Training & Courses, Instructor Certification, Learner Support, Administrative Procedures, "
-        "Course Materials, MHFA Connect Platform, Recertification, Mental Health Resources, "
-        "Scheduling & Registration, Policies & Guidelines, Technical Support]\n\n"
+        f"[{', '.join(CATEGORIES)}]\n\n"
         f"Question: {question}\n\n"
         "- Respond ONLY with the category name in quotes (e.g., \"Training & Courses\").\n"
         "- No explanations or additional text.\n"
@@ -39,14 +119,134 @@ def classify_question(question: str) -> str:
         out = resp["output"]["message"]["content"][0]["text"].strip().strip('"')
     except ClientError as e:
         print(f"[classify_question] error: {e}")
+        if is_throttle(e):
+            sentiment_sampler.record_throttle()
         out = "Unknown"
 
-    valid = {
-        "Training & Courses","Instructor Certification","Learner Support","Administrative Procedures",
-        "Course Materials","MHFA Connect Platform","Recertification","Mental Health Resources",
-        "Scheduling & Registration","Policies & Guidelines","Technical Support","Unknown"
-    }
-    return out if out in valid else "Unknown"
+    return out if out in VALID_CATEGORIES else "Unknown"
+
+
+def _parse_json_array(text: str, expected: int) -> list:
+    """
+    Pull the first JSON array out of a model reply and check it has one entry per input.
+    """
+    if "[" not in text or "]" not in text:
+        raise ValueError("No JSON array in response")
+    result = json.loads(text[text.index("["):text.rindex("]") + 1])
+    if not isinstance(result, list) or len(result) != expected:
+        raise ValueError(f"Expected {expected} results, got {len(result) if isinstance(result, list) else 'non-list'}")
+    return result
+
+
+def classify_questions(questions: list) -> list:
+    """
+    Classification cascade, cheapest first:
+      keyword rules → local TF-IDF model → memo cache of earlier LLM labels
+      → one batched Bedrock call for whatever is still uncertain.
+    Returns one (category, source) tuple per question, in input order,
+    where source is "rules", "model" or "llm" (cached LLM labels count as "llm").
+    """
+    model = local_classifier.load_model(s3, BUCKET, CLASSIFIER_MODEL_KEY, CLASSIFIER_MODEL_PATH)
+
+    results = [None] * len(questions)
+    uncertain, shadow, guesses = [], [], {}
+    for i, question in enumerate(questions):
+        category, source = local_classifier.match_rules(question), "rules"
+        if not category and model:
+            guess, probability = model.predict(question)
+            guesses[i] = guess
+            if probability >= model.threshold:
+                category, source = guess, "model"
+
+        if not category:
+            uncertain.append(i)
+            continue
+        results[i] = (category, source)
+        if random.random() < CLASSIFIER_SHADOW_RATE:
+            shadow.append(i)
+
+    cached, memory_hits, table_hits = classification_cache.lookup([questions[i] for i in uncertain])
+    labels = {i: category for i, category in zip(uncertain, cached) if category}
+
+    # Identical questions in one batch only need to be asked once
+    to_ask = {}
+    for i in [i for i in uncertain if i not in labels] + shadow:
+        to_ask.setdefault(classification_cache.key(questions[i]), []).append(i)
+    if to_ask:
+        groups = list(to_ask.values())
+        answers = _llm_classify_questions([questions[group[0]] for group in groups])
+        fresh = []
+        for group, category in zip(groups, answers):
+            for i in group:
+                labels[i] = category
+            if category != "Unknown":  # "Unknown" may just be a failed call – don't pin it
+                fresh.append((questions[group[0]], category))
+        classification_cache.store([q for q, _ in fresh], [c for _, c in fresh])
+
+    for i in uncertain:
+        results[i] = (labels[i], "llm")
+
+    shadow_agreed = sum(1 for i in shadow if results[i][0] == labels[i])
+    uncertain_agreed = sum(1 for i in uncertain if i in guesses and guesses[i] == labels[i])
+    emit_metrics({
+        "ClassifiedByRules": sum(1 for r in results if r[1] == "rules"),
+        "ClassifiedByModel": sum(1 for r in results if r[1] == "model"),
+        "ClassifiedByLLM": len(uncertain),
+        "ShadowComparisons": len(shadow),
+        "ShadowAgreements": shadow_agreed,
+        "UncertainAgreements": uncertain_agreed,
+    }, Component="classifier")
+
+    cache_hits = memory_hits + table_hits
+    emit_metrics({
+        "CacheHitsMemory": memory_hits,
+        "CacheHitsTable": table_hits,
+        "CacheMisses": len(uncertain) - cache_hits,
+        # Every hit is a question that would otherwise have gone into a Bedrock prompt
+        "BedrockCallsSaved": cache_hits,
+        "CacheHitRate": round(100.0 * cache_hits / len(uncertain), 1) if uncertain else 0.0,
+        "BedrockQuestionsAsked": len(to_ask),
+    }, units={"CacheHitRate": "Percent"}, Component="classification-cache")
+    return results
+
+
+def _llm_classify_questions(questions: list) -> list:
+    """
+    Classify several questions with one Bedrock Converse call.
+    Returns one category per question, in input order.
+    """
+    if len(questions) == 1:
+        return [classify_question(questions[0])]
+
+    numbered = "\n".join(f"{i + 1}. {q}" for i, q in enumerate(questions))
+    prompt = (
+        "Classify each MHFA Learning Ecosystem question below into exactly one category:\n\n"
+        f"[{', '.join(CATEGORIES)}]\n\n"
+        f"Questions:\n{numbered}\n\n"
+        f"- Respond ONLY with a JSON array of {len(questions)} category names, in question order "
+        "(e.g., [\"Training & Courses\", \"Recertification\"]).\n"
+        "- No explanations or additional text.\n"
+        "- Use \"Unknown\" for any question that doesn't fit."
+    )
+    try:
+        resp = bedrock.converse(
+            modelId=BEDROCK_MODEL_ID,
+            messages=[{"role": "user", "content": [{"text": prompt}]}],
+            inferenceConfig={"maxTokens": 16 * len(questions), "temperature": 0.0, "topP": 1.0}
+        )
+        out = resp["output"]["message"]["content"][0]["text"].strip()
+        labels = _parse_json_array(out, len(questions))
+    except Exception as e:
+        # A malformed batch reply should not cost us the whole batch
+        if is_throttle(e):
+            # Fanning out to single calls would only deepen the throttling
+            print(f"[classify_questions] throttled: {e}")
+            sentiment_sampler.record_throttle()
+            return ["Unknown"] * len(questions)
+        print(f"[classify_questions] batch error, falling back to single calls: {e}")
+        return [classify_question(q) for q in questions]
+
+    return [label if label in VALID_CATEGORIES else "Unknown" for label in map(str, labels)]
 
 
 def analyze_sentiment(question: str, response: str) -> dict:
@@ -80,97 +280,425 @@ def analyze_sentiment(question: str, response: str) -> dict:
             json_end = out.rindex("}") + 1
             result = json.loads(out[json_start:json_end])
 
-            # Validate sentiment
-            if result.get("sentiment") not in ["positive", "neutral", "negative"]:
-                result["sentiment"] = "neutral"
-
-            # Validate score
-            score = result.get("score", 50)
-            result["score"] = max(0, min(100, int(score)))
-
-            return result
+            # Validate sentiment & score
+            return _validate_sentiment(result)
         else:
             raise ValueError("No JSON in response")
 
     except Exception as e:
         print(f"[analyze_sentiment] error: {e}")
-        return {
-            "sentiment": "neutral",
-            "score": 50,
-            "reason": "Could not analyze sentiment"
-        }
+        if is_throttle(e):
+            sentiment_sampler.record_throttle()
+        return dict(NEUTRAL_SENTIMENT)
 
 
-def lambda_handler(event, context):
+def _validate_sentiment(result) -> dict:
+    if not isinstance(result, dict):
+        return dict(NEUTRAL_SENTIMENT)
+    sentiment = result.get("sentiment")
+    try:
+        score = max(0, min(100, int(result.get("score", 50))))
+    except (TypeError, ValueError):
+        score = 50
+    return {
+        "sentiment": sentiment if sentiment in ("positive", "neutral", "negative") else "neutral",
+        "score": score,
+        "reason": str(result.get("reason", "")),
+    }
+
+
+def analyze_sentiments(pairs: list) -> list:
     """
-    Expects a single‐record event with keys:
-      session_id, timestamp, query, response, location, [confidence]
+    Batch version of analyze_sentiment: one Bedrock call for a list of (question, response) pairs.
+    Returns one {sentiment, score, reason} dict per pair, in input order.
     """
-    print("Received event:", json.dumps(event))
+    if len(pairs) == 1:
+        return [analyze_sentiment(*pairs[0])]
 
-    # 1) Session ID
-    session_id = event.get("session_id") or str(uuid.uuid4())
+    conversations = "\n\n".join(
+        f"Conversation {i + 1}:\nUser Question: {q}\nBot Response: {r}"
+        for i, (q, r) in enumerate(pairs)
+    )
+    prompt = (
+        "Analyze the sentiment of each chatbot conversation below and determine user satisfaction.\n\n"
+        f"{conversations}\n\n"
+        "For each conversation determine:\n"
+        "1. Overall Sentiment: positive, neutral, or negative\n"
+        "2. Satisfaction Score: 0-100 (0=very dissatisfied, 100=very satisfied)\n"
+        "3. Brief Reason (one sentence)\n\n"
+        f"Respond with a JSON array of {len(pairs)} objects in conversation order, exactly like:\n"
+        '[{"sentiment": "positive", "score": 85, "reason": "User received helpful answer"}]'
+    )
 
-    # 2) Timestamp + unique suffix for SK
-    iso_ts = event.get("timestamp") or datetime.utcnow().isoformat()
-    sort_key = f"{iso_ts}#{uuid.uuid4().hex[:8]}"
+    try:
+        resp = bedrock.converse(
+            modelId=BEDROCK_MODEL_ID,
+            messages=[{"role": "user", "content": [{"text": prompt}]}],
+            inferenceConfig={"maxTokens": 128 * len(pairs), "temperature": 0.1, "topP": 1.0}
+        )
+        out = resp["output"]["message"]["content"][0]["text"].strip()
+        results = _parse_json_array(out, len(pairs))
+    except Exception as e:
+        if is_throttle(e):
+            print(f"[analyze_sentiments] throttled: {e}")
+            sentiment_sampler.record_throttle()
+            return [dict(NEUTRAL_SENTIMENT) for _ in pairs]
+        print(f"[analyze_sentiments] batch error, falling back to single calls: {e}")
+        return [analyze_sentiment(q, r) for q, r in pairs]
 
-    # 3) Pull fields
-    question      = event.get("query", "")
-    response_text = event.get("response", "")
-    location      = event.get("location", "")
-    confidence    = event.get("confidence", None)
+    return [_validate_sentiment(r) for r in results]
 
-    if not question or not response_text:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Missing query or response"})
-        }
 
-    # 4) Classify category
-    category = classify_question(question)
+def build_item(payload: dict, classification: tuple, sentiment_result, sample_rate: float) -> dict:
+    """
+    Turn one conversation payload plus its analytics into a DynamoDB item.
+    Accepts both producer shapes: query/response (chatResponseHandler)
+    and querytext/responsetext (streamingHandler).
+    sentiment_result is None when the conversation was not sampled for sentiment.
+    """
+    # 1) Session ID
+    session_id = payload.get("session_id") or str(uuid.uuid4())
 
-    # 5) Analyze sentiment
-    sentiment_result = analyze_sentiment(question, response_text)
+    # 2) Timestamp + suffix derived from the content for SK, so a redelivered
+    #    message overwrites its own row instead of adding a second one
+    iso_ts = payload.get("timestamp") or datetime.utcnow().isoformat()
+    digest = hashlib.sha256(
+        json.dumps([session_id, iso_ts, _question(payload), _response(payload)]).encode("utf-8")
+    ).hexdigest()
+    sort_key = f"{iso_ts}#{digest[:8]}"
 
-    # 6) Build item
+    category, category_source = classification
     item = {
         "session_id": session_id,   # PK
         "timestamp":  sort_key,     # SK
         "original_ts": iso_ts,
-        "query":       question,
-        "response":    response_text,
-        "location":    location,
+        "day_bucket":  day_buckets.day_bucket(iso_ts, session_id, DAY_BUCKET_SHARDS),  # GSI PK
+        "query":       _question(payload),
+        "response":    _response(payload),
+        "location":    payload.get("location") or "",
         "category":    category,
-        "sentiment":   sentiment_result["sentiment"],
-        "satisfaction_score": Decimal(str(sentiment_result["score"])),
-        "sentiment_reason": sentiment_result["reason"]
+        "category_source": category_source,
+        # Readers weight satisfaction by 1 / sample_rate to undo the sampling
+        "sentiment_sampled": sentiment_result is not None,
+        "sample_rate": Decimal(str(round(sample_rate, 4))),
     }
+    if sentiment_result is not None:
+        item["sentiment"] = sentiment_result["sentiment"]
+        item["satisfaction_score"] = Decimal(str(sentiment_result["score"]))
+        item["sentiment_reason"] = sentiment_result["reason"]
+    if payload.get("user_role"):
+        item["user_role"] = payload["user_role"]
+    if category_source == "model":
+        item["classifier_version"] = local_classifier.load_model().version
+
+    confidence = payload.get("confidence")
     if confidence is not None:
         try:
             item["confidence"] = Decimal(str(confidence))
         # amazonq-ignore-next-line
         except:
             pass
+    return item
+
+
+def _question(payload: dict) -> str:
+    return payload.get("query") or payload.get("querytext") or ""
 
-    # 6) Write to DynamoDB
+
+def _response(payload: dict) -> str:
+    return payload.get("response") or payload.get("responsetext") or ""
+
+
+def queue_backlog() -> int:
+    """Approximate ingest-queue depth, refreshed at most every 30s per container."""
+    if not ANALYTICS_QUEUE_URL or time.monotonic() - _backlog["checked_at"] < 30:
+        return _backlog["value"]
     try:
-        # amazonq-ignore-next-line
-        table.put_item(Item=item)
+        attrs = sqs.get_queue_attributes(
+            QueueUrl=ANALYTICS_QUEUE_URL,
+            AttributeNames=["ApproximateNumberOfMessages"],
+        )["Attributes"]
+        _backlog["value"] = int(attrs.get("ApproximateNumberOfMessages", 0))
+    except Exception as e:
+        print(f"[queue_backlog] error: {e}")
+    _backlog["checked_at"] = time.monotonic()
+    return _backlog["value"]
+
+
+def process_conversations(records: list, backlog: int = 0) -> tuple:
+    """
+    Classify, score and store a list of (record_id, payload) conversations.
+
+    Conversations are analysed CLASSIFY_BATCH_SIZE at a time (at most one Bedrock
+    prompt per chunk for categories, one for the sentiment sample) and written with
+    batch_writer. A chunk that fails anywhere – classification, scoring or the
+    write – is reported on its own; the chunks already stored are not retried.
+    Returns (items_written, failed_record_ids).
+    """
+    valid = []
+    for record_id, payload in records:
+        if not _question(payload) or not _response(payload):
+            # Retrying can never fix this, so drop it instead of reporting a failure
+            print(f"[process_conversations] dropping {record_id}: missing query or response")
+            continue
+        valid.append((record_id, payload))
+
+    rate = sentiment_sampler.current_rate(backlog)
+    decisions = [sentiment_sampler.decide(payload, rate) for _, payload in valid]
+    emit_metrics({
+        "SentimentSampled": sum(1 for sampled, _ in decisions if sampled),
+        "SentimentForced": sum(1 for sampled, r in decisions if sampled and r == 1.0),
+        "SentimentSkipped": sum(1 for sampled, _ in decisions if not sampled),
+        "SentimentSampleRate": round(rate, 4),
+    }, units={"SentimentSampleRate": "None"}, Component="sentiment")
+
+    written, failed = [], []
+    for start in range(0, len(valid), CLASSIFY_BATCH_SIZE):
+        chunk = valid[start:start + CLASSIFY_BATCH_SIZE]
+        chunk_decisions = decisions[start:start + CLASSIFY_BATCH_SIZE]
+        payloads = [payload for _, payload in chunk]
+
+        try:
+            classifications = classify_questions([_question(p) for p in payloads])
+            sampled = [i for i, (is_sampled, _) in enumerate(chunk_decisions) if is_sampled]
+            scored = analyze_sentiments([(_question(payloads[i]), _response(payloads[i])) for i in sampled]) if sampled else []
+            sentiments = dict(zip(sampled, scored))
+            items = [
+                build_item(p, c, sentiments.get(i), chunk_decisions[i][1])
+                for i, (p, c) in enumerate(zip(payloads, classifications))
+            ]
+            # amazonq-ignore-next-line
+            with table.batch_writer() as writer:
+                for item in items:
+                    writer.put_item(Item=item)
+            written.extend(items)
+        except Exception as e:
+            # Rows are keyed by content, so a partly written chunk is simply rewritten on retry
+            print(f"[process_conversations] chunk of {len(chunk)} failed: {e}")
+            failed.extend(record_id for record_id, _ in chunk)
+            continue
+
+        if rollup_table is not None:
+            try:
+                rollups.apply(rollup_table, rollups.accumulate(items))
+            except Exception as e:
+                # Raw items are already stored; retrying would duplicate them.
+                # Drift is repaired by the rebuild_rollups action.
+                print(f"[process_conversations] rollup update error: {e}")
+
+    print(f"[process_conversations] records={len(records)} written={len(written)} failed={len(failed)}")
+    if written:
+        publish_admin_event(written)
+    return written, failed
+
+
+def _preview(text) -> str:
+    text = str(text or "")
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS].rstrip() + "…"
+
+
+def publish_admin_event(items: list):
+    """
+    Tell the live admin dashboards about newly stored conversations: counts per
+    category plus list entries shaped like the analytics conversation list.
+    Best effort – the dashboards resync from the analytics API on reload.
+    """
+    if not ADMIN_EVENTS_QUEUE_URL:
+        return
+    categories = {}
+    for item in items:
+        categories[item["category"]] = categories.get(item["category"], 0) + 1
+    newest = sorted(items, key=lambda it: it["original_ts"], reverse=True)[:20]
+    event = {
+        "type": "conversations",
+        "messages": len(items),
+        "categories": categories,
+        "conversations": [{
+            "key": {"session_id": it["session_id"], "timestamp": it["timestamp"]},
+            "session_id": it["session_id"],
+            "timestamp": it["original_ts"],
+            "query": _preview(it["query"]),
+            "response": _preview(it["response"]),
+            "category": it["category"],
+            "location": it["location"],
+            "user_role": it.get("user_role"),
+            "sentiment": "neutral",
+            "satisfaction_score": float(it["satisfaction_score"]) if "satisfaction_score" in it else None,
+        } for it in newest],
+    }
+    try:
+        sqs.send_message(QueueUrl=ADMIN_EVENTS_QUEUE_URL, MessageBody=json.dumps(event))
     except Exception as e:
-        print(f"[lambda_handler] DynamoDB error: {e}")
+        print(f"[publish_admin_event] error: {e}")
+
+
+def _fold(text) -> str:
+    return " ".join(str(text or "").split())
+
+
+def find_conversation(session_id: str, message_preview: str):
+    """Newest stored conversation of `session_id` whose response starts with the preview."""
+    wanted = _fold(message_preview)[:RESCORE_MATCH_CHARS]
+    if not session_id or not wanted:
+        return None
+    kwargs = {
+        "KeyConditionExpression": "session_id = :sid",
+        "ExpressionAttributeValues": {":sid": session_id},
+        "ScanIndexForward": False,
+    }
+    while True:
+        resp = table.query(**kwargs)
+        for item in resp.get("Items", []):
+            if _fold(item.get("response"))[:RESCORE_MATCH_CHARS] == wanted:
+                return item
+        if "LastEvaluatedKey" not in resp:
+            return None
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def rescore_conversation(request: dict) -> bool:
+    """
+    Score a conversation that was skipped by sentiment sampling once its answer
+    gets a thumbs-down (queued by lambda/feedback). The stored row is updated in
+    place and its rollup counters corrected. Returns False when the Bedrock call
+    did not produce a score, so the message is retried.
+    """
+    item = find_conversation(request.get("session_id"), request.get("message_preview"))
+    if item is None:
+        # Conversation not stored (or no longer matches) – nothing to re-score
+        print(f"[rescore_conversation] no conversation for session {request.get('session_id')}")
+        return True
+    if not sentiment_sampler.must_analyze({**item, "feedback": request.get("feedback")}):
+        return True
+    if item.get("sentiment_sampled") and Decimal(str(item.get("sample_rate") or 1)) == 1:
+        return True
+
+    result = analyze_sentiment(item.get("query") or "", item.get("response") or "")
+    if result["reason"] == NEUTRAL_SENTIMENT["reason"]:
+        print(f"[rescore_conversation] no score for session {item['session_id']}, retrying later")
+        return False
+
+    updated = {
+        **item,
+        "sentiment": result["sentiment"],
+        "satisfaction_score": Decimal(str(result["score"])),
+        "sentiment_reason": result["reason"],
+        "sentiment_sampled": True,
+        "sample_rate": Decimal("1"),
+    }
+    table.update_item(
+        Key={"session_id": item["session_id"], "timestamp": item["timestamp"]},
+        UpdateExpression=(
+            "SET sentiment = :s, satisfaction_score = :score, sentiment_reason = :r, "
+            "sentiment_sampled = :sampled, sample_rate = :rate"
+        ),
+        ExpressionAttributeValues={
+            ":s": updated["sentiment"],
+            ":score": updated["satisfaction_score"],
+            ":r": updated["sentiment_reason"],
+            ":sampled": True,
+            ":rate": updated["sample_rate"],
+        },
+    )
+    if rollup_table is not None:
+        try:
+            rollups.apply(rollup_table, rollups.replace_delta(item, updated))
+        except Exception as e:
+            # The row is already updated; rebuild_rollups repairs the drift
+            print(f"[rescore_conversation] rollup update error: {e}")
+    print(f"[rescore_conversation] session {item['session_id']} scored {result['sentiment']}")
+    return True
+
+
+def handle_sqs_batch(event) -> dict:
+    """
+    Drain one SQS delivery. Only the messages that could not be stored are
+    reported back, so SQS redelivers those (and eventually dead-letters them)
+    without replaying the rest of the batch.
+    Besides conversations the queue carries {"action": "rescore", ...} requests.
+    """
+    records, failures = [], []
+    for record in event["Records"]:
+        message_id = record["messageId"]
+        try:
+            body = json.loads(record["body"])
+        except (TypeError, ValueError) as e:
+            print(f"[handle_sqs_batch] undecodable message {message_id}: {e}")
+            failures.append(message_id)
+            continue
+        if body.get("action") != "rescore":
+            records.append((message_id, body))
+            continue
+        try:
+            if not rescore_conversation(body):
+                failures.append(message_id)
+        except Exception as e:
+            print(f"[handle_sqs_batch] rescore {message_id} failed: {e}")
+            failures.append(message_id)
+
+    if records:
+        _, failed = process_conversations(records, backlog=queue_backlog())
+        failures.extend(failed)
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]}
+
+
+def lambda_handler(event, context):
+    """
+    Entry shapes:
+      - SQS batch ({"Records": [...]}) from the analytics ingest queue
+      - {"action": "rebuild_rollups", ...} reconciliation run
+      - {"action": "backfill_day_buckets", [resume_key]} one-off index backfill
+      - a single record (direct invoke) with keys:
+          session_id, timestamp, query, response, location,
+          [user_role], [confidence], [escalated], [feedback]
+    """
+    if event.get("Records"):
+        print(f"Received SQS batch of {len(event['Records'])} messages")
+        return handle_sqs_batch(event)
+
+    if event.get("action") == "rebuild_rollups":
+        # {"action": "rebuild_rollups", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+        print("Rebuilding rollups:", json.dumps(event))
+        if rollup_table is None:
+            return {"statusCode": 400, "body": json.dumps({"error": "ROLLUP_TABLE is not configured"})}
+        result = rollups.rebuild(
+            table, rollup_table, event["start_date"], event.get("end_date") or event["start_date"],
+            feedback_table=ddb.Table(FEEDBACK_TABLE) if FEEDBACK_TABLE else None,
+        )
+        return {"statusCode": 200, "body": json.dumps(result)}
+
+    if event.get("action") == "backfill_day_buckets":
+        # Re-invoke with the returned resume_key until it comes back null
+        print("Backfilling day_bucket:", json.dumps(event))
+        budget = context.get_remaining_time_in_millis() / 1000 - 15 if context else 90
+        result = day_buckets.backfill(table, DAY_BUCKET_SHARDS, event.get("resume_key"), budget)
+        print(f"[backfill_day_buckets] {result}")
+        return {"statusCode": 200, "body": json.dumps(result)}
+
+    print("Received event:", json.dumps(event))
+
+    if not _question(event) or not _response(event):
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Missing query or response"})
+        }
+
+    written, failed = process_conversations([("direct", event)])
+    if failed or not written:
         return {
             "statusCode": 500,
             "body": json.dumps({"error": "Failed to write to DynamoDB"})
         }
 
+    item = written[0]
     return {
         "statusCode": 200,
         "body": json.dumps({
-            "session_id": session_id,
-            "timestamp":  sort_key,
-            "category":   category,
-            "sentiment":  sentiment_result["sentiment"],
-            "satisfaction_score": sentiment_result["score"]
+            "session_id": item["session_id"],
+            "timestamp":  item["timestamp"],
+            "category":   item["category"],
+            "sentiment":  item.get("sentiment"),
+            "satisfaction_score": int(item["satisfaction_score"]) if "satisfaction_score" in item else None,
+            "sentiment_sampled": item["sentiment_sampled"]
         })
     }
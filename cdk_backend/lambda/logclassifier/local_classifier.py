@@ -0,0 +1,265 @@
+"""
+In-process question classifier used ahead of Bedrock.
+
+Two layers, cheapest first:
+  1. Keyword/regex rules  - high-precision patterns; only fire when exactly one category matches.
+  2. TF-IDF + multinomial logistic regression trained offline (train_classifier.py)
+     from the LLM-labelled rows of the conversation table.
+
+Anything below the model's confidence threshold is left for the LLM. Everything is
+plain Python on sparse dicts: the Lambda ships as a zip asset without third-party
+packages, and at this vocabulary size a prediction takes microseconds.
+"""
+
+import json
+import math
+import os
+import random
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "in", "on", "for", "and", "or",
+    "i", "me", "my", "we", "our", "you", "your", "it", "its", "this", "that", "do", "does", "did",
+    "can", "could", "how", "what", "where", "when", "which", "who", "with", "at", "as", "by", "if",
+    "about", "from", "there", "have", "has", "would", "should", "will", "please", "get",
+}
+
+RULE_CONFIDENCE = 0.97
+
+# Patterns are deliberately narrow: a miss costs one LLM call, a wrong hit costs a bad label.
+KEYWORD_RULES = [
+    ("Recertification",           re.compile(r"\bre-?certif\w*|\brenew\w* (?:my )?(?:mhfa )?certif\w*|\bcertification (?:has )?expir\w*")),
+    ("Instructor Certification",  re.compile(r"\bbecome an? (?:mhfa )?instructor\b|\binstructor (?:certification|training|candidate)\b")),
+    ("MHFA Connect Platform",     re.compile(r"\bmhfa connect\b|\bconnect platform\b")),
+    ("Technical Support",         re.compile(r"\b(?:reset|forgot|change) (?:my )?password\b|\bcan(?:no|')?t log ?in\b|\berror (?:message|code)\b|\bpage (?:is )?not loading\b")),
+    ("Scheduling & Registration", re.compile(r"\bregist(?:er|ration) for\b|\bsign up for\b|\benroll in\b|\bschedule (?:a|an|my) (?:course|class|training)\b")),
+    ("Course Materials",          re.compile(r"\b(?:participant|instructor) (?:manual|guide|workbook)\b|\bcourse materials?\b|\bprocessing guide\b")),
+    ("Policies & Guidelines",     re.compile(r"\bpolic(?:y|ies)\b|\bguidelines?\b|\bcode of conduct\b")),
+    ("Mental Health Resources",   re.compile(r"\b988\b|\bcrisis (?:line|hotline|text)\b|\bsuicid\w*")),
+]
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word unigrams plus adjacent bigrams, stopwords removed."""
+    words = [w for w in TOKEN_RE.findall((text or "").lower()) if w not in STOPWORDS]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+def match_rules(text: str):
+    """Return the single category whose pattern matches, or None if none/several match."""
+    lowered = (text or "").lower()
+    hits = {category for category, pattern in KEYWORD_RULES if pattern.search(lowered)}
+    return hits.pop() if len(hits) == 1 else None
+
+
+class QuestionModel:
+    """
+    Multinomial logistic regression over L2-normalised TF-IDF features.
+    Weights are stored sparsely: {category: {token: weight}}.
+    """
+
+    def __init__(self, version, categories, idf, weights, bias, threshold, metrics=None):
+        self.version = version
+        self.categories = categories
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold
+        self.metrics = metrics or {}
+
+    # ── features ─────────────────────────────────────────────────────────────
+    def features(self, text: str) -> dict:
+        counts = Counter(t for t in tokenize(text) if t in self.idf)
+        vec = {t: (1 + math.log(c)) * self.idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    # ── inference ────────────────────────────────────────────────────────────
+    def probabilities(self, text: str) -> dict:
+        return _softmax_scores(self.features(text), self.categories, self.weights, self.bias)
+
+    def predict(self, text: str) -> tuple:
+        """Return (category, probability) for the most likely category."""
+        probs = self.probabilities(text)
+        category = max(probs, key=probs.get)
+        return category, probs[category]
+
+    # ── persistence ──────────────────────────────────────────────────────────
+    def to_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "categories": self.categories,
+            "idf": self.idf,
+            "weights": self.weights,
+            "bias": self.bias,
+            "threshold": self.threshold,
+            "metrics": self.metrics,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuestionModel":
+        return cls(
+            version=data["version"],
+            categories=data["categories"],
+            idf=data["idf"],
+            weights=data["weights"],
+            bias=data["bias"],
+            threshold=data["threshold"],
+            metrics=data.get("metrics"),
+        )
+
+
+def _softmax_scores(features, categories, weights, bias) -> dict:
+    logits = {
+        c: bias.get(c, 0.0) + sum(weights[c].get(t, 0.0) * v for t, v in features.items())
+        for c in categories
+    }
+    top = max(logits.values())
+    exps = {c: math.exp(l - top) for c, l in logits.items()}
+    total = sum(exps.values())
+    return {c: e / total for c, e in exps.items()}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Training (offline – see train_classifier.py)
+# ──────────────────────────────────────────────────────────────────────────────
+def train(examples, categories, epochs=15, learning_rate=0.5, l2=1e-4, min_df=2,
+          holdout=0.2, target_agreement=0.9, seed=13) -> QuestionModel:
+    """
+    Fit a QuestionModel on (question, llm_category) pairs.
+
+    A holdout split is used to measure agreement with the LLM labels and to pick the
+    lowest confidence threshold whose accepted predictions still agree with the LLM at
+    least `target_agreement` of the time.
+    """
+    rng = random.Random(seed)
+    examples = [(q, c) for q, c in examples if q and c in categories]
+    rng.shuffle(examples)
+    split = int(len(examples) * (1 - holdout))
+    train_set, test_set = examples[:split], examples[split:]
+
+    df = Counter()
+    for question, _ in train_set:
+        df.update(set(tokenize(question)))
+    n_docs = max(len(train_set), 1)
+    idf = {t: math.log((1 + n_docs) / (1 + d)) + 1 for t, d in df.items() if d >= min_df}
+
+    model = QuestionModel(
+        version=f"local-{datetime.utcnow():%Y%m%dT%H%M%S}",
+        categories=list(categories),
+        idf=idf,
+        weights={c: defaultdict(float) for c in categories},
+        bias={c: 0.0 for c in categories},
+        threshold=1.0,
+    )
+
+    vectors = [(model.features(q), c) for q, c in train_set]
+    for epoch in range(epochs):
+        rng.shuffle(vectors)
+        rate = learning_rate / (1 + epoch)
+        for features, label in vectors:
+            probs = _softmax_scores(features, model.categories, model.weights, model.bias)
+            for c in model.categories:
+                grad = probs[c] - (1.0 if c == label else 0.0)
+                if abs(grad) < 1e-6:
+                    continue
+                w = model.weights[c]
+                for t, v in features.items():
+                    w[t] -= rate * (grad * v + l2 * w[t])
+                model.bias[c] -= rate * grad
+
+    # Drop negligible weights so the artifact stays small
+    model.weights = {
+        c: {t: round(w, 5) for t, w in ws.items() if abs(w) >= 1e-3}
+        for c, ws in model.weights.items()
+    }
+
+    model.metrics = evaluate(model, test_set)
+    model.threshold = choose_threshold(model, test_set, target_agreement)
+    model.metrics.update(agreement_at_threshold(model, test_set, model.threshold))
+    model.metrics.update({"train_size": len(train_set), "holdout_size": len(test_set)})
+    return model
+
+
+def evaluate(model, examples) -> dict:
+    """Overall and per-category agreement of the model's top guess with the LLM label."""
+    if not examples:
+        return {"agreement": None, "per_category": {}}
+
+    correct = 0
+    per_category = defaultdict(lambda: {"support": 0, "predicted": 0, "correct": 0})
+    for question, label in examples:
+        predicted, _ = model.predict(question)
+        per_category[label]["support"] += 1
+        per_category[predicted]["predicted"] += 1
+        if predicted == label:
+            correct += 1
+            per_category[label]["correct"] += 1
+
+    report = {}
+    for c, s in per_category.items():
+        report[c] = {
+            "support": s["support"],
+            "precision": round(s["correct"] / s["predicted"], 3) if s["predicted"] else None,
+            "recall": round(s["correct"] / s["support"], 3) if s["support"] else None,
+        }
+    return {"agreement": round(correct / len(examples), 3), "per_category": report}
+
+
+def agreement_at_threshold(model, examples, threshold) -> dict:
+    """Coverage (share handled locally) and agreement among those, at a given threshold."""
+    scored = [(model.predict(q), label) for q, label in examples]
+    accepted = [(p, label) for (p, conf), label in scored if conf >= threshold]
+    agreed = sum(1 for p, label in accepted if p == label)
+    return {
+        "threshold": threshold,
+        "coverage": round(len(accepted) / len(scored), 3) if scored else 0.0,
+        "agreement_at_threshold": round(agreed / len(accepted), 3) if accepted else None,
+    }
+
+
+def choose_threshold(model, examples, target_agreement) -> float:
+    """Lowest threshold (max coverage) whose accepted predictions meet the target agreement."""
+    for threshold in [round(0.30 + 0.05 * i, 2) for i in range(14)]:
+        stats = agreement_at_threshold(model, examples, threshold)
+        if stats["agreement_at_threshold"] is not None and stats["agreement_at_threshold"] >= target_agreement:
+            return threshold
+    # Never good enough – keep the model effectively in shadow mode
+    return 1.01
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Runtime loading – once per container
+# ──────────────────────────────────────────────────────────────────────────────
+_MODEL = None
+_MODEL_LOADED = False
+
+
+def load_model(s3_client=None, bucket=None, key=None, path=None):
+    """
+    Load the model artifact from a local path or S3 the first time it is needed and
+    keep it for the life of the container. Returns None when no artifact is configured
+    or it cannot be read (the cascade then goes straight to rules + LLM).
+    """
+    global _MODEL, _MODEL_LOADED
+    if _MODEL_LOADED:
+        return _MODEL
+    _MODEL_LOADED = True
+
+    try:
+        if path and os.path.exists(path):
+            with open(path) as fh:
+                _MODEL = QuestionModel.from_dict(json.load(fh))
+        elif s3_client is not None and bucket and key:
+            obj = s3_client.get_object(Bucket=bucket, Key=key)
+            _MODEL = QuestionModel.from_dict(json.loads(obj["Body"].read()))
+    except Exception as e:
+        print(f"[local_classifier] model not loaded: {e}")
+        _MODEL = None
+
+    if _MODEL:
+        print(f"[local_classifier] loaded model {_MODEL.version} (threshold={_MODEL.threshold})")
+    return _MODEL
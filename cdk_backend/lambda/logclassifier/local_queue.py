@@ -0,0 +1,64 @@
+"""
+In-process stand-in for the analytics ingest SQS queue.
+
+Producers call send_message() exactly as they would on a boto3 SQS client, so
+it can be swapped in for the `sqs` client of chatResponseHandler or
+streamingHandler. drain() then delivers the buffered messages to a consumer
+(normally handler.lambda_handler) in SQS event shape and redelivers whatever
+the consumer reports in batchItemFailures, dead-lettering after
+max_receive_count attempts just like the real redrive policy.
+"""
+
+import uuid
+from collections import deque
+
+
+class LocalAnalyticsQueue:
+    def __init__(self, batch_size: int = 10, max_receive_count: int = 3):
+        self.batch_size = batch_size
+        self.max_receive_count = max_receive_count
+        self.dead_letters = []
+        self._messages = deque()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def send_message(self, QueueUrl: str = "", MessageBody: str = "", **kwargs) -> dict:
+        message_id = str(uuid.uuid4())
+        self._messages.append({"messageId": message_id, "body": MessageBody, "receiveCount": 0})
+        return {"MessageId": message_id}
+
+    def drain(self, consumer) -> int:
+        """
+        Feed every queued message to consumer(event, context) in batches.
+        Returns the number of consumer invocations it took.
+        """
+        invocations = 0
+        while self._messages:
+            batch = [self._messages.popleft() for _ in range(min(self.batch_size, len(self._messages)))]
+            for message in batch:
+                message["receiveCount"] += 1
+
+            event = {
+                "Records": [
+                    {
+                        "messageId": message["messageId"],
+                        "body": message["body"],
+                        "eventSource": "aws:sqs",
+                        "attributes": {"ApproximateReceiveCount": str(message["receiveCount"])},
+                    }
+                    for message in batch
+                ]
+            }
+            result = consumer(event, None) or {}
+            invocations += 1
+
+            failed = {f["itemIdentifier"] for f in result.get("batchItemFailures", [])}
+            for message in batch:
+                if message["messageId"] not in failed:
+                    continue
+                if message["receiveCount"] >= self.max_receive_count:
+                    self.dead_letters.append(message)
+                else:
+                    self._messages.append(message)
+        return invocations
@@ -0,0 +1,178 @@
+"""
+Pre-aggregated dashboard counters, maintained at ingest time.
+
+One rollup item per time bucket:
+  bucket = "H#YYYY-MM-DDTHH"  (hour)   or   "D#YYYY-MM-DD"  (day)
+
+Every counter is a top-level number attribute updated with UpdateItem ADD, so
+concurrent writers never lose increments:
+  messages, category:<name>, location:<name>, role:<name>, sentiment:<label>,
+  feedback:<positive|negative>, satisfaction_sum, satisfaction_count,
+  satisfaction_weighted_sum, satisfaction_weight,
+  satisfaction_hist:<0-100>  (weighted satisfaction histogram, see sketches.py)
+plus an `hll` number set: HyperLogLog codes for distinct sessions, ADDed as a
+set union. Buckets written before sketches carry a `sessions` string set instead.
+The feedback:* counters are ADDed by lambda/feedback as ratings arrive; the
+rest are written here.
+
+retrieveSessionLogs/rollups.py reads the same layout – keep the two in sync.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sketches import HyperLogLog
+
+
+def hour_bucket(iso_ts: str) -> str:
+    return f"H#{iso_ts[:13]}"
+
+
+def day_bucket(iso_ts: str) -> str:
+    return f"D#{iso_ts[:10]}"
+
+
+def new_deltas() -> dict:
+    return defaultdict(lambda: {"counters": defaultdict(Decimal), "hll": HyperLogLog()})
+
+
+def _label(value, limit=100) -> str:
+    return str(value).strip()[:limit]
+
+
+def accumulate(items, deltas=None) -> dict:
+    """
+    Fold conversation items into {bucket: {"counters": {...}, "hll": HyperLogLog}}.
+    Folding a whole batch first means one UpdateItem per bucket, not per conversation.
+    """
+    deltas = deltas if deltas is not None else new_deltas()
+    for item in items:
+        ts = item.get("original_ts") or ""
+        if len(ts) < 13:
+            continue
+        for bucket in (hour_bucket(ts), day_bucket(ts)):
+            counters = deltas[bucket]["counters"]
+            counters["messages"] += 1
+            counters[f"category:{_label(item.get('category') or 'Unknown')}"] += 1
+            if item.get("location"):
+                counters[f"location:{_label(item['location'])}"] += 1
+            if item.get("user_role"):
+                counters[f"role:{_label(item['user_role'])}"] += 1
+            if item.get("sentiment"):
+                counters[f"sentiment:{_label(item['sentiment'])}"] += 1
+            if item.get("satisfaction_score") is not None:
+                score = Decimal(str(item["satisfaction_score"]))
+                weight = 1 / Decimal(str(item.get("sample_rate") or 1))
+                counters["satisfaction_sum"] += score
+                counters["satisfaction_count"] += 1
+                counters["satisfaction_weighted_sum"] += (score * weight).quantize(Decimal("0.0001"))
+                counters["satisfaction_weight"] += weight.quantize(Decimal("0.0001"))
+                counters[f"satisfaction_hist:{min(100, max(0, int(round(score))))}"] += weight.quantize(Decimal("0.0001"))
+            if item.get("session_id"):
+                deltas[bucket]["hll"].add(item["session_id"])
+    return deltas
+
+
+def apply(table, deltas: dict):
+    """Add each bucket's deltas with a single atomic UpdateItem ADD."""
+    for bucket, delta in deltas.items():
+        names, values, clauses = {}, {}, []
+        for i, (attr, amount) in enumerate(sorted(delta["counters"].items())):
+            names[f"#c{i}"] = attr
+            values[f":c{i}"] = amount
+            clauses.append(f"#c{i} :c{i}")
+        codes = delta["hll"].codes()
+        if codes:
+            names["#h"] = "hll"
+            values[":h"] = codes
+            clauses.append("#h :h")
+        if not clauses:
+            continue
+        table.update_item(
+            Key={"bucket": bucket},
+            UpdateExpression="ADD " + ", ".join(clauses),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+
+
+def replace_delta(old_item: dict, new_item: dict) -> dict:
+    """
+    Deltas that turn one stored conversation's counts into another's (e.g. after a
+    re-score). Counters that come out equal cancel; no sessions are added.
+    """
+    old, new = accumulate([old_item]), accumulate([new_item])
+    deltas = new_deltas()
+    for bucket in set(old) | set(new):
+        before = old[bucket]["counters"] if bucket in old else {}
+        after = new[bucket]["counters"] if bucket in new else {}
+        for attr in set(before) | set(after):
+            change = after.get(attr, 0) - before.get(attr, 0)
+            if change:
+                deltas[bucket]["counters"][attr] += change
+    return deltas
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Reconciliation
+# ──────────────────────────────────────────────────────────────────────────────
+def rebuild(conversation_table, rollup_table, start_date: str, end_date: str, feedback_table=None) -> dict:
+    """
+    Recompute every hour/day rollup between start_date and end_date (YYYY-MM-DD,
+    inclusive) from the raw conversation (and feedback) tables and overwrite them.
+    Meant for closed days: live ADDs landing on a bucket while it is rebuilt are lost.
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    start_iso, end_iso = start.isoformat(), end.isoformat()
+
+    deltas = accumulate(_scan_between(
+        conversation_table, "original_ts", start_iso, end_iso,
+        "session_id, original_ts, category, #loc, user_role, sentiment, satisfaction_score, sample_rate",
+        {"#loc": "location"},
+    ))
+    if feedback_table is not None:
+        # Every click is a row; only each message's newest one is its rating
+        latest = {}
+        for fb in _scan_between(feedback_table, "#ts", start_iso, end_iso, "message_id, feedback, #ts", {"#ts": "timestamp"}):
+            if fb.get("timestamp", "") > latest.get(fb.get("message_id"), {}).get("timestamp", ""):
+                latest[fb.get("message_id")] = fb
+        for fb in latest.values():
+            if fb.get("feedback") in ("positive", "negative") and len(fb.get("timestamp", "")) >= 13:
+                for bucket in (hour_bucket(fb["timestamp"]), day_bucket(fb["timestamp"])):
+                    deltas[bucket]["counters"][f"feedback:{fb['feedback']}"] += 1
+
+    # Write every bucket in range, including empty ones, so stale counters are cleared
+    buckets = []
+    cursor = start
+    while cursor < end:
+        buckets.append(day_bucket(cursor.isoformat()))
+        buckets.extend(hour_bucket((cursor + timedelta(hours=h)).isoformat()) for h in range(24))
+        cursor += timedelta(days=1)
+
+    with rollup_table.batch_writer() as writer:
+        for bucket in buckets:
+            delta = deltas.get(bucket, {"counters": {}, "hll": HyperLogLog()})
+            item = {"bucket": bucket, **{k: v for k, v in delta["counters"].items() if v}}
+            codes = delta["hll"].codes()
+            if codes:
+                item["hll"] = codes  # one code per register – also compacts the set
+            writer.put_item(Item=item)
+
+    return {"buckets_written": len(buckets), "non_empty": sum(1 for b in buckets if b in deltas)}
+
+
+def _scan_between(table, attr, start_iso, end_iso, projection, names):
+    kwargs = {
+        "FilterExpression": f"{attr} BETWEEN :start AND :end",
+        "ProjectionExpression": projection,
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": {":start": start_iso, ":end": end_iso},
+    }
+    while True:
+        resp = table.scan(**kwargs)
+        yield from resp.get("Items", [])
+        if "LastEvaluatedKey" not in resp:
+            return
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
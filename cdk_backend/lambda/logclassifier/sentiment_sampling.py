@@ -0,0 +1,68 @@
+"""
+Sampling policy for the Bedrock sentiment pass.
+
+Every conversation is classified, but only a sample is sent for sentiment scoring:
+  - always analysed: escalations, negative feedback, low agent confidence
+    (negative feedback arrives later, as a "rescore" request queued by lambda/feedback)
+  - otherwise analysed with probability `rate`, which starts at the base rate and
+    shrinks as the ingest backlog grows or Bedrock starts throttling.
+
+Each stored item records whether it was sampled and the rate it was sampled at,
+so readers can weight scores by 1/rate and keep averages unbiased.
+"""
+
+import random
+import time
+from collections import deque
+
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+
+class SentimentSampler:
+    def __init__(self, base_rate=0.25, min_rate=0.02, backlog_target=500,
+                 throttle_window_seconds=300, low_confidence=0.5):
+        self.base_rate = base_rate
+        self.min_rate = min_rate
+        self.backlog_target = backlog_target
+        self.throttle_window_seconds = throttle_window_seconds
+        self.low_confidence = low_confidence
+        self._throttles = deque()
+
+    # ── load signals ─────────────────────────────────────────────────────────
+    def record_throttle(self):
+        self._throttles.append(time.monotonic())
+
+    def recent_throttles(self) -> int:
+        cutoff = time.monotonic() - self.throttle_window_seconds
+        while self._throttles and self._throttles[0] < cutoff:
+            self._throttles.popleft()
+        return len(self._throttles)
+
+    def current_rate(self, backlog: int = 0) -> float:
+        """Base rate, scaled down in proportion to backlog overrun and halved per recent throttle."""
+        rate = self.base_rate
+        if backlog > self.backlog_target:
+            rate *= self.backlog_target / backlog
+        rate /= 2 ** min(self.recent_throttles(), 10)
+        return max(self.min_rate, min(1.0, rate))
+
+    # ── decision ─────────────────────────────────────────────────────────────
+    def must_analyze(self, payload: dict) -> bool:
+        if payload.get("escalated") or payload.get("feedback") == "negative":
+            return True
+        confidence = payload.get("confidence")
+        try:
+            return confidence is not None and float(confidence) < self.low_confidence
+        except (TypeError, ValueError):
+            return False
+
+    def decide(self, payload: dict, rate: float) -> tuple:
+        """Return (sampled, sample_rate) for one conversation."""
+        if self.must_analyze(payload):
+            return True, 1.0
+        return random.random() < rate, rate
+
+
+def is_throttle(error) -> bool:
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") in THROTTLE_CODES
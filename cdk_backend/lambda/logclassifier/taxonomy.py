@@ -0,0 +1,16 @@
+"""
+Question categories shared by the LLM prompts, the local classifier and its training command.
+"""
+
+import hashlib
+
+CATEGORIES = [
+    "Training & Courses", "Instructor Certification", "Learner Support", "Administrative Procedures",
+    "Course Materials", "MHFA Connect Platform", "Recertification", "Mental Health Resources",
+    "Scheduling & Registration", "Policies & Guidelines", "Technical Support",
+]
+VALID_CATEGORIES = set(CATEGORIES) | {"Unknown"}
+
+# Part of every classification-cache key: editing CATEGORIES (or bumping the prefix to force
+# a re-classification with an unchanged list) makes all previously cached labels unreachable.
+TAXONOMY_VERSION = "v1-" + hashlib.sha256("|".join(CATEGORIES).encode("utf-8")).hexdigest()[:8]
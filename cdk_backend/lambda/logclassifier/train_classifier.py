@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Offline training command for the local question classifier.
+
+Trains on the conversation table rows whose category came from the LLM, prints
+agreement metrics against those labels and writes a versioned JSON artifact that
+logclassifier loads from the dashboard logs bucket.
+
+Examples:
+  python train_classifier.py --table NCMWDashboardSessionlogs --out model.json
+  python train_classifier.py --table NCMWDashboardSessionlogs \\
+      --upload s3://<dashboard-logs-bucket>/models/category_model.json
+  python train_classifier.py --from-jsonl labelled.jsonl --out model.json
+"""
+
+import argparse
+import json
+import sys
+
+from local_classifier import train
+from taxonomy import CATEGORIES
+
+
+def load_from_table(table_name: str) -> list:
+    import boto3
+
+    table = boto3.resource("dynamodb").Table(table_name)
+    kwargs = {
+        "ProjectionExpression": "#q, category, category_source",
+        "ExpressionAttributeNames": {"#q": "query"},
+    }
+    examples = []
+    while True:
+        resp = table.scan(**kwargs)
+        for item in resp.get("Items", []):
+            # Only learn from LLM labels, never from our own earlier predictions
+            if item.get("category_source", "llm") != "llm":
+                continue
+            if item.get("category") in CATEGORIES:
+                examples.append((item.get("query", ""), item["category"]))
+        if "LastEvaluatedKey" not in resp:
+            return examples
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def load_from_jsonl(path: str) -> list:
+    with open(path) as fh:
+        rows = [json.loads(line) for line in fh if line.strip()]
+    return [(r.get("query", ""), r.get("category")) for r in rows if r.get("category") in CATEGORIES]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--table", help="DynamoDB conversation table to read labelled rows from")
+    source.add_argument("--from-jsonl", help="local JSONL file with {query, category} rows")
+    parser.add_argument("--out", help="write the artifact to this local path")
+    parser.add_argument("--upload", help="s3://bucket/key to upload the artifact to")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--target-agreement", type=float, default=0.9)
+    parser.add_argument("--epochs", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    examples = load_from_table(args.table) if args.table else load_from_jsonl(args.from_jsonl)
+    if len(examples) < 50:
+        print(f"Only {len(examples)} labelled examples – not enough to train.", file=sys.stderr)
+        return 1
+
+    print(f"Training on {len(examples)} LLM-labelled questions ...")
+    model = train(examples, CATEGORIES, epochs=args.epochs, holdout=args.holdout,
+                  target_agreement=args.target_agreement)
+
+    print(f"Model version         : {model.version}")
+    print(f"Holdout agreement     : {model.metrics['agreement']}")
+    print(f"Confidence threshold  : {model.threshold}")
+    print(f"Coverage @ threshold  : {model.metrics['coverage']}")
+    print(f"Agreement @ threshold : {model.metrics['agreement_at_threshold']}")
+    for category, stats in sorted(model.metrics["per_category"].items()):
+        print(f"  {category:28s} support={stats['support']:<5} precision={stats['precision']} recall={stats['recall']}")
+
+    body = json.dumps(model.to_dict())
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(body)
+        print(f"Wrote {args.out} ({len(body) // 1024} KiB)")
+    if args.upload:
+        import boto3
+
+        bucket, _, key = args.upload.replace("s3://", "", 1).partition("/")
+        boto3.client("s3").put_object(Bucket=bucket, Key=key, Body=body.encode("utf-8"),
+                                      ContentType="application/json",
+                                      Metadata={"model-version": model.version})
+        print(f"Uploaded {args.upload}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Single-pass aggregation over streamed conversation items.
+
+Items are folded in as they arrive and never kept: counters and the weighted
+satisfaction sums are running totals, distinct sessions and the satisfaction
+distribution are fixed-size sketches (sketches.py), and the most recent
+conversations are held in a fixed-size min-heap keyed by timestamp. Memory is
+O(top_k + distinct categories/locations), independent of how many items the
+window holds – unless exact session ids are tracked for a feedback join.
+"""
+
+import heapq
+import itertools
+from collections import defaultdict
+
+import sketches
+
+TOP_K = 50
+PREVIEW_CHARS = 200
+
+
+def preview(text, limit: int = PREVIEW_CHARS) -> str:
+    text = str(text or "")
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def conversation_summary(it: dict) -> dict:
+    """
+    List entry for one conversation: text cut to a preview, plus the table key
+    to fetch the full query/response from GET /session-logs/{session_id}.
+    """
+    score = it.get("satisfaction_score")
+    return {
+        "key": {"session_id": it.get("session_id"), "timestamp": it.get("timestamp")},
+        "session_id": it.get("session_id"),
+        "timestamp": it.get("original_ts"),
+        "query": preview(it.get("query")),
+        "response": preview(it.get("response")),
+        "category": it.get("category", "Unknown"),
+        "location": it.get("location") or "",
+        "user_role": it.get("user_role"),
+        "sentiment": "neutral",  # set from user feedback once the page is known
+        "satisfaction_score": float(score) if score is not None else None,  # None → not sampled
+    }
+
+
+class StreamingAggregate:
+    def __init__(self, top_k: int = TOP_K, track_sessions: bool = False):
+        self.top_k = top_k
+        self.messages = 0
+        self.hll = sketches.HyperLogLog()
+        # Exact ids only for callers that join on them (feedback); counts use the sketch
+        self.sessions = set() if track_sessions else None
+        self.histogram = {}
+        self.locations = defaultdict(int)
+        self.categories = defaultdict(int)
+        # Only a sample of conversations gets a satisfaction score; each sampled score
+        # stands in for 1 / sample_rate conversations (legacy items have no rate → weight 1)
+        self.weighted_score_sum = 0.0
+        self.weight_sum = 0.0
+        self._latest = []  # min-heap of (timestamp, seq, conversation)
+        self._seq = itertools.count()
+
+    def add(self, it: dict):
+        self.messages += 1
+        if sid := it.get("session_id"):
+            self.hll.add(sid)
+            if self.sessions is not None:
+                self.sessions.add(sid)
+        if loc := it.get("location"):
+            if isinstance(loc, str) and loc:  # Only count valid location strings
+                self.locations[loc] += 1
+        if cat := it.get("category"):
+            self.categories[cat] += 1
+        score = it.get("satisfaction_score")
+        if score is not None:
+            weight = 1.0 / float(it.get("sample_rate") or 1)
+            self.weighted_score_sum += float(score) * weight
+            self.weight_sum += weight
+            sketches.histogram_add(self.histogram, score, weight)
+
+        # Only build the conversation entry if it makes the top k
+        if self.top_k <= 0:
+            return
+        timestamp = it.get("original_ts") or ""
+        if len(self._latest) >= self.top_k and timestamp <= self._latest[0][0]:
+            return
+        entry = (timestamp, next(self._seq), conversation_summary(it))
+        if len(self._latest) < self.top_k:
+            heapq.heappush(self._latest, entry)
+        else:
+            heapq.heapreplace(self._latest, entry)
+
+    def consume(self, items):
+        for it in items:
+            self.add(it)
+        return self
+
+    def to_partial(self) -> dict:
+        """
+        JSON-serializable state, mergeable into another aggregate (top-k excluded).
+        Tracked session ids are included under "sessions" for the caller's join.
+        """
+        partial = {
+            "messages": self.messages,
+            "hll": self.hll.to_b64(),
+            "locations": dict(self.locations),
+            "categories": dict(self.categories),
+            "weighted_score_sum": self.weighted_score_sum,
+            "weight_sum": self.weight_sum,
+            "histogram": dict(self.histogram),
+        }
+        if self.sessions is not None:
+            partial["sessions"] = sorted(self.sessions)
+        return partial
+
+    def merge_partial(self, partial: dict):
+        self.messages += partial["messages"]
+        self.hll.merge(sketches.HyperLogLog.from_b64(partial["hll"]))
+        if self.sessions is not None:
+            self.sessions.update(partial.get("sessions", ()))
+        for loc, count in partial["locations"].items():
+            self.locations[loc] += count
+        for cat, count in partial["categories"].items():
+            self.categories[cat] += count
+        self.weighted_score_sum += partial["weighted_score_sum"]
+        self.weight_sum += partial["weight_sum"]
+        sketches.histogram_merge(self.histogram, partial["histogram"])
+        return self
+
+    def conversations(self) -> list:
+        """Top-k conversation summaries, most recent first."""
+        return [conv for _, _, conv in sorted(self._latest, key=lambda e: (e[0], e[1]), reverse=True)]
+
+    def summary(self) -> dict:
+        return {
+            "user_count": self.hll.estimate(),
+            "total_messages": self.messages,
+            "locations":  sorted(self.locations),
+            "categories": dict(self.categories),
+            # Calculate average satisfaction (inverse-probability weighted)
+            "avg_satisfaction": round(self.weighted_score_sum / self.weight_sum, 1) if self.weight_sum else 0,
+            "satisfaction_percentiles": sketches.percentiles(self.histogram),
+        }
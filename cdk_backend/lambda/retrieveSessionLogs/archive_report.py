@@ -0,0 +1,136 @@
+"""
+Aggregations over the Parquet conversation archive
+(layout documented in sessionLogs/archive.py – keep the two in sync).
+
+Reads go through pyarrow.dataset, so only the needed columns are decoded
+(column pruning) and the day range plus any category / role / location
+filters are pushed into the scan: non-matching dt= partitions are never
+opened, and row groups whose statistics rule the predicate out are skipped.
+
+Results are per-day partials in the StreamingAggregate.to_partial() layout
+(with the day's session ids, for the feedback join), so archived days merge
+with day-cache and index-read days.
+"""
+
+from collections import defaultdict
+
+import sketches
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+except ImportError:  # provided by a Lambda layer; archive reads are disabled without it
+    pa = None
+
+# Archive column -> filter name accepted by day_partials
+FILTER_COLUMNS = {"category": "category", "role": "user_role", "location": "location"}
+AGGREGATE_COLUMNS = ["session_id", "original_ts", "location", "category", "satisfaction_score", "sample_rate"]
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def filesystem(uri: str):
+    """(FileSystem, root path) for an s3:// URI or a local directory."""
+    if "://" in uri:
+        return pafs.FileSystem.from_uri(uri)
+    return pafs.LocalFileSystem(), uri.rstrip("/")
+
+
+def archived_days(uri: str) -> set:
+    """
+    Days whose dt= partition holds its final part file (one recursive LIST of
+    the archive root). A day still being written only has the staging file.
+    """
+    fs, root = filesystem(uri)
+    try:
+        infos = fs.get_file_info(pafs.FileSelector(root, allow_not_found=True, recursive=True))
+    except OSError as e:
+        print(f"[archive_report] cannot list {uri}: {e}")
+        return set()
+    days = set()
+    for info in infos:
+        if info.type != pafs.FileType.File or info.base_name != "part-0.parquet":
+            continue
+        partition = info.path.rsplit("/", 2)[-2]
+        if partition.startswith("dt="):
+            days.add(partition[3:])
+    return days
+
+
+def dataset(uri: str):
+    fs, root = filesystem(uri)
+    return ds.dataset(
+        root, filesystem=fs, format="parquet",
+        partitioning=ds.partitioning(pa.schema([("dt", pa.string())]), flavor="hive"),
+    )
+
+
+def read(uri: str, days, start_iso: str, end_iso: str, filters: dict = None, columns=AGGREGATE_COLUMNS):
+    """Arrow table of `columns` (plus dt) for items of `days` within [start_iso, end_iso]."""
+    days = sorted(days)
+    predicate = (
+        (ds.field("dt") >= days[0]) & (ds.field("dt") <= days[-1]) & ds.field("dt").isin(days)
+        & (ds.field("original_ts") >= start_iso) & (ds.field("original_ts") <= end_iso)
+    )
+    for name, value in (filters or {}).items():
+        predicate = predicate & (ds.field(FILTER_COLUMNS[name]) == value)
+    return dataset(uri).to_table(columns=list(columns) + ["dt"], filter=predicate)
+
+
+def _group_counts(table, keys) -> list:
+    """[(key values..., count)] rows of a group-by count."""
+    grouped = table.group_by(keys).aggregate([([], "count_all")]).to_pylist()
+    return [tuple(row[k] for k in keys) + (row["count_all"],) for row in grouped]
+
+
+def day_partials(uri: str, days, start_iso: str, end_iso: str, filters: dict = None) -> dict:
+    """{day: partial} for each of `days` (days without matching items get an empty partial)."""
+    empty_hll = sketches.HyperLogLog().to_b64()
+    partials = {day: {
+        "messages": 0, "hll": empty_hll, "sessions": [], "locations": {}, "categories": {},
+        "weighted_score_sum": 0.0, "weight_sum": 0.0, "histogram": {},
+    } for day in days}
+    if not days:
+        return partials
+    table = read(uri, days, start_iso, end_iso, filters)
+    if table.num_rows == 0:
+        return partials
+
+    for day, count in _group_counts(table, ["dt"]):
+        partials[day]["messages"] = count
+    sessions = defaultdict(list)
+    for day, session_id, _ in _group_counts(table.filter(pc.is_valid(table["session_id"])), ["dt", "session_id"]):
+        sessions[day].append(session_id)
+    for day, ids in sessions.items():
+        hll = sketches.HyperLogLog()
+        for session_id in ids:
+            hll.add(session_id)
+        partials[day]["sessions"] = sorted(ids)
+        partials[day]["hll"] = hll.to_b64()
+    for day, location, count in _group_counts(table.filter(pc.not_equal(table["location"], "")), ["dt", "location"]):
+        if location:
+            partials[day]["locations"][location] = count
+    for day, category, count in _group_counts(table, ["dt", "category"]):
+        if category:
+            partials[day]["categories"][category] = count
+
+    # Inverse-probability weights, as in StreamingAggregate (no rate → weight 1)
+    scored = table.filter(pc.is_valid(table["satisfaction_score"]))
+    if scored.num_rows:
+        weight = pc.divide(1.0, pc.fill_null(scored["sample_rate"], 1.0))
+        weighted = pa.table({
+            "dt": scored["dt"],
+            "weighted": pc.multiply(scored["satisfaction_score"], weight),
+            "weight": weight,
+            "score": pc.max_element_wise(0, pc.min_element_wise(100, pc.round(scored["satisfaction_score"]))),
+        })
+        for row in weighted.group_by(["dt"]).aggregate([("weighted", "sum"), ("weight", "sum")]).to_pylist():
+            partials[row["dt"]]["weighted_score_sum"] = row["weighted_sum"]
+            partials[row["dt"]]["weight_sum"] = row["weight_sum"]
+        for row in weighted.group_by(["dt", "score"]).aggregate([("weight", "sum")]).to_pylist():
+            partials[row["dt"]]["histogram"][str(int(row["score"]))] = row["weight_sum"]
+    return partials
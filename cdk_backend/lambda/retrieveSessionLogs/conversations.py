@@ -0,0 +1,180 @@
+"""
+Cursor-paginated conversation browsing over the DayBucketIndex GSI.
+
+Pages run newest first. Within a day the (day, shard) partitions are queried
+in descending original_ts order and merged, so a page is exactly the next
+`limit` conversations across all shards; then the walk moves to the previous day.
+
+The cursor is opaque to clients: base64url JSON holding the time range, a
+fingerprint of the filters, the day being walked, and per shard the key of the
+last conversation handed out (used as ExclusiveStartKey on the next call).
+Conversations read ahead but not handed out are simply read again next time.
+"""
+
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import feedback_join
+import scan_engine
+from aggregation import conversation_summary
+
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 100
+# Bound on items read per call, so sparse filters return early with a cursor
+MAX_EVALUATED = 3000
+
+SUMMARY_PROJECTION = ("session_id, #ts, original_ts, day_bucket, #q, #r, category, #loc, "
+                      "user_role, satisfaction_score, sample_rate")
+SUMMARY_NAMES = {"#ts": "timestamp", "#q": "query", "#r": "response", "#loc": "location"}
+FEEDBACK_SENTIMENTS = ("positive", "negative", "neutral")
+
+
+class CursorError(ValueError):
+    pass
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Cursor
+# ──────────────────────────────────────────────────────────────────────────────
+def fingerprint(filters: dict) -> str:
+    raw = json.dumps(filters, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(state: dict) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, filters: dict) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        state["positions"] = {int(shard): key for shard, key in state.get("positions", {}).items()}
+        state["exhausted"] = set(state.get("exhausted", []))
+        if not (state["start"] and state["end"] and state["day"]):
+            raise ValueError("incomplete cursor")
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        raise CursorError(f"Invalid cursor: {e}")
+    if state.get("filters") != fingerprint(filters):
+        raise CursorError("Cursor does not match the current filters")
+    return state
+
+
+def _gsi_key(item: dict) -> dict:
+    return {name: {"S": item[name]} for name in ("day_bucket", "original_ts", "session_id", "timestamp")}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Browse
+# ──────────────────────────────────────────────────────────────────────────────
+def browse(table_name, index_name, shards, start, end, filters, limit, cursor, feedback_table, feedback_index, budget=None) -> dict:
+    """
+    Next page of conversation summaries (newest first) within [start, end].
+    filters: optional category, role (DynamoDB filter) and sentiment (user
+    feedback – applied after the per-page feedback join).
+    """
+    if cursor:
+        state = decode_cursor(cursor, filters)
+    else:
+        state = {
+            "start": start.isoformat(), "end": end.isoformat(), "day": f"{end:%Y-%m-%d}",
+            "positions": {}, "exhausted": set(),
+        }
+    start_iso, end_iso = state["start"], state["end"]
+
+    filter_parts, names, values = [], dict(SUMMARY_NAMES), {}
+    if filters.get("category"):
+        filter_parts.append("category = :cat")
+        values[":cat"] = {"S": filters["category"]}
+    if filters.get("role"):
+        filter_parts.append("user_role = :role")
+        values[":role"] = {"S": filters["role"]}
+
+    # Limit caps items evaluated (before the filter), so filtered reads use bigger pages
+    page_size = MAX_LIMIT if filter_parts else limit
+
+    def request(day, shard, start_key):
+        req = {
+            "TableName": table_name,
+            "IndexName": index_name,
+            "KeyConditionExpression": "day_bucket = :b AND original_ts BETWEEN :start AND :end",
+            "ProjectionExpression": SUMMARY_PROJECTION,
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": dict(values, **{
+                ":b": {"S": f"{day}#{shard}"}, ":start": {"S": start_iso}, ":end": {"S": end_iso},
+            }),
+            "ScanIndexForward": False,
+            "Limit": page_size,
+        }
+        if filter_parts:
+            req["FilterExpression"] = " AND ".join(filter_parts)
+        if start_key:
+            req["ExclusiveStartKey"] = start_key
+        return req
+
+    day, positions, exhausted = state["day"], state["positions"], state["exhausted"]
+    buffers, next_keys = {}, {s: positions.get(s) for s in range(shards)}
+    results, candidates, evaluated = [], [], 0
+
+    def flush():
+        # Join feedback for the examined candidates, then apply the sentiment filter
+        if not candidates:
+            return
+        rows = feedback_join.fetch_for_sessions(
+            feedback_table, feedback_index, {c["session_id"] for c in candidates}, start_iso, budget,
+        )
+        feedback_join.label_conversations(candidates, rows, table_name, budget)
+        wanted = filters.get("sentiment")
+        results.extend(c for c in candidates if not wanted or c["sentiment"] == wanted)
+        candidates.clear()
+
+    while len(results) < limit and day >= start_iso[:10]:
+        active = [s for s in range(shards) if s not in exhausted]
+        if not active:
+            # Day finished – continue with the previous one from the top
+            day = f"{datetime.strptime(day, '%Y-%m-%d') - timedelta(days=1):%Y-%m-%d}"
+            positions, exhausted = {}, set()
+            buffers, next_keys = {}, {s: None for s in range(shards)}
+            continue
+        if evaluated >= MAX_EVALUATED:
+            break
+
+        # Every active shard needs a head item (or a known end) before merging
+        refill = [s for s in active if not buffers.get(s) and (s not in buffers or next_keys[s])]
+        if refill:
+            pages = scan_engine.fetch_pages("query", [request(day, s, next_keys[s]) for s in refill], budget=budget)
+            for s, (items, last_key) in zip(refill, pages):
+                buffers[s] = items
+                next_keys[s] = last_key
+                evaluated += page_size  # upper bound – counts filtered-out items too
+            continue
+
+        heads = [s for s in active if buffers.get(s)]
+        for s in active:
+            if not buffers.get(s):
+                exhausted.add(s)
+        if not heads:
+            continue
+        shard = max(heads, key=lambda s: (buffers[s][0]["original_ts"], buffers[s][0]["timestamp"]))
+        item = buffers[shard].pop(0)
+        positions[shard] = _gsi_key(item)
+        if not buffers[shard] and not next_keys[shard]:
+            exhausted.add(shard)
+
+        candidates.append(conversation_summary(item))
+        if len(candidates) >= limit - len(results):
+            flush()
+    flush()
+
+    more = day >= start_iso[:10] and (len(exhausted) < shards or day > start_iso[:10])
+    next_cursor = None
+    if more:
+        next_cursor = encode_cursor({
+            "start": start_iso, "end": end_iso, "day": day, "filters": fingerprint(filters),
+            "positions": {str(s): key for s, key in positions.items()},
+            "exhausted": sorted(exhausted),
+        })
+    return {"conversations": results, "next_cursor": next_cursor, "has_more": bool(next_cursor)}
@@ -0,0 +1,65 @@
+"""
+Permanent per-day memo of the raw-item aggregate (NCMWAnalyticsDayCache).
+
+A day is finalized once it ended more than the grace period ago: late feedback
+has had time to land, and no more conversations are written for it. Finalized
+days inside a window are loaded from here; only the remaining days (today,
+partial edge days, cache misses) are read from the day-bucket index, and the
+misses are written back.
+
+One item per day:
+  bucket      = "<CACHE_VERSION>#YYYY-MM-DD"
+  data        = JSON of StreamingAggregate.to_partial() plus "feedback" counts
+                (session ids are not stored – distinct users come from the HLL sketch)
+  computed_at = ISO time the day was aggregated
+Bump CACHE_VERSION when the partial layout changes – old items are then ignored.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from rollups import read_buckets
+
+CACHE_VERSION = "v2"
+# DynamoDB items are capped at 400 KB; days whose partial is larger stay uncached
+# (with sketches a partial is a few KB plus the category/location counts)
+MAX_DATA_BYTES = 350 * 1024
+
+
+def window_days(start, end) -> list:
+    day, days = start.replace(hour=0, minute=0, second=0, microsecond=0), []
+    while day <= end:
+        days.append(f"{day:%Y-%m-%d}")
+        day += timedelta(days=1)
+    return days
+
+
+def finalized_days(start, end, now, grace_hours: float) -> list:
+    """Days lying wholly inside [start, end] that closed at least grace_hours before now."""
+    days = []
+    for day in window_days(start, end):
+        day_start = datetime.strptime(day, "%Y-%m-%d")
+        day_last_second = day_start + timedelta(days=1) - timedelta(seconds=1)
+        if start <= day_start and end >= day_last_second and now >= day_start + timedelta(days=1, hours=grace_hours):
+            days.append(day)
+    return days
+
+
+def load(dynamodb, table_name: str, days: list) -> dict:
+    """{day: partial} for the days already cached."""
+    items = read_buckets(dynamodb, table_name, [f"{CACHE_VERSION}#{day}" for day in days])
+    return {item["bucket"].split("#", 1)[1]: json.loads(item["data"]) for item in items}
+
+
+def store(table, day: str, partial: dict) -> bool:
+    partial = {k: v for k, v in partial.items() if k != "sessions"}
+    data = json.dumps(partial, separators=(",", ":"), sort_keys=True)
+    if len(data) > MAX_DATA_BYTES:
+        print(f"[day_cache] {day} partial is {len(data)} bytes – not cached")
+        return False
+    table.put_item(Item={
+        "bucket": f"{CACHE_VERSION}#{day}",
+        "data": data,
+        "computed_at": datetime.utcnow().isoformat(),
+    })
+    return True
@@ -0,0 +1,42 @@
+"""
+Timeframe reads through the DayBucketIndex GSI
+(layout documented in logclassifier/day_buckets.py – keep the two in sync).
+
+A window is read with one paginated Query per (day, shard), run in parallel
+by scan_engine, so read cost follows the size of the window rather than the
+whole history.
+"""
+
+from datetime import timedelta
+
+import scan_engine
+
+
+def partition_keys(start, end, shards: int, days=None) -> list:
+    """(day, shard) partitions of the window, or of just `days` ("YYYY-MM-DD") when given."""
+    keys = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end:
+        if days is None or f"{day:%Y-%m-%d}" in days:
+            keys.extend(f"{day:%Y-%m-%d}#{shard}" for shard in range(shards))
+        day += timedelta(days=1)
+    return keys
+
+
+def query_window(table_name, index_name, start, end, shards, projection=None, names=None, budget=None, days=None):
+    """Yield pages of items whose original_ts is within [start, end] (restricted to `days` if given)."""
+    start_iso, end_iso = start.isoformat(), end.isoformat()
+    requests = []
+    for key in partition_keys(start, end, shards, days):
+        request = {
+            "TableName": table_name,
+            "IndexName": index_name,
+            "KeyConditionExpression": "day_bucket = :b AND original_ts BETWEEN :start AND :end",
+            "ExpressionAttributeValues": {":b": {"S": key}, ":start": {"S": start_iso}, ":end": {"S": end_iso}},
+        }
+        if projection:
+            request["ProjectionExpression"] = projection
+        if names:
+            request["ExpressionAttributeNames"] = names
+        requests.append(request)
+    return scan_engine.stream_pages("query", requests, budget=budget)
@@ -0,0 +1,173 @@
+"""
+Per-message join of thumbs-up/down feedback onto conversation items.
+
+Feedback rows (NCMWResponseFeedback, written by lambda/feedback):
+  message_id (PK), timestamp (SK), session_id, feedback, message_preview
+Every click writes a new row, and clearing a rating writes feedback=None, so the
+newest row per message_id is that message's current rating.
+
+Only the sessions present in the conversation window are fetched, through the
+session_id GSI (see scripts/add-feedback-session-index.sh). Very large windows,
+or a table without the index, fall back to one parallel scan.
+"""
+
+import re
+from collections import defaultdict
+
+from botocore.exceptions import ClientError
+
+import scan_engine
+
+# Above this many sessions one query per session costs more than a single scan
+MAX_QUERY_SESSIONS = 2000
+PREVIEW_CHARS = 120
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def preview_key(text) -> str:
+    """Whitespace-folded prefix of an answer, comparable with message_preview."""
+    return _SPACE_RE.sub(" ", str(text or "")).strip()[:PREVIEW_CHARS]
+
+
+def fetch_for_sessions(table_name, index_name, session_ids, since_iso, budget=None) -> list:
+    """Feedback rows for `session_ids` given at or after `since_iso`."""
+    if not session_ids:
+        return []
+    projection = "message_id, #ts, session_id, feedback, message_preview"
+    names = {"#ts": "timestamp"}
+
+    if index_name and len(session_ids) <= MAX_QUERY_SESSIONS:
+        requests = [{
+            "TableName": table_name,
+            "IndexName": index_name,
+            "KeyConditionExpression": "session_id = :sid AND #ts >= :since",
+            "ProjectionExpression": projection,
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": {":sid": {"S": sid}, ":since": {"S": since_iso}},
+        } for sid in session_ids]
+        try:
+            return [row for page in scan_engine.stream_pages("query", requests, budget=budget) for row in page]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ValidationException":
+                raise
+            # Index not created (yet) on this table – fall through to the scan
+            print(f"[feedback_join] {index_name} unavailable, scanning instead: {e}")
+
+    pages = scan_engine.parallel_scan(
+        table_name,
+        budget=budget,
+        FilterExpression="#ts >= :since",
+        ProjectionExpression=projection,
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues={":since": {"S": since_iso}},
+    )
+    return [row for page in pages for row in page if row.get("session_id") in session_ids]
+
+
+def current_ratings(rows: list) -> list:
+    """Newest row per message_id – the rating the user left in place."""
+    latest = {}
+    for row in rows:
+        message_id = row.get("message_id")
+        if message_id and (message_id not in latest or row.get("timestamp", "") > latest[message_id].get("timestamp", "")):
+            latest[message_id] = row
+    return list(latest.values())
+
+
+def count_ratings(rows: list) -> dict:
+    """Messages currently rated positive / negative (one per message, cleared ratings excluded)."""
+    counts = {"positive": 0, "negative": 0}
+    for row in current_ratings(rows):
+        if row.get("feedback") in counts:
+            counts[row["feedback"]] += 1
+    return counts
+
+
+def count_ratings_by_day(rows: list, active_days: dict) -> dict:
+    """
+    count_ratings split per day, for caching day by day.
+    active_days: session_id -> sorted days ("YYYY-MM-DD") the session had messages.
+    A rating counts on the last of its session's days on or before the click
+    (the first day if it predates them all), so a session spanning days counts once.
+    """
+    counts = defaultdict(lambda: {"positive": 0, "negative": 0})
+    for row in current_ratings(rows):
+        days = active_days.get(row.get("session_id"))
+        if not days or row.get("feedback") not in ("positive", "negative"):
+            continue
+        clicked_day = str(row.get("timestamp", ""))[:10]
+        before = [day for day in days if day <= clicked_day]
+        counts[before[-1] if before else days[0]][row["feedback"]] += 1
+    return counts
+
+
+def match(session_messages: dict, rows: list) -> dict:
+    """
+    Assign each message's current rating to one conversation item.
+
+    session_messages: session_id -> [(original_ts, preview_key(response)), ...]
+    Returns {(session_id, original_ts): "positive" | "negative"}.
+
+    A rating goes to the answer whose text starts like its message_preview;
+    rows without a usable preview go to the latest answer given before the
+    click that has not been rated already.
+    """
+    by_session = defaultdict(list)
+    for row in current_ratings(rows):
+        if row.get("session_id") in session_messages:
+            by_session[row["session_id"]].append(row)
+
+    matched = {}
+    for session_id, ratings in by_session.items():
+        answers = sorted(session_messages[session_id])
+        taken = set()
+        for row in sorted(ratings, key=lambda r: r.get("timestamp", "")):
+            clicked_at = row.get("timestamp", "")
+            preview = preview_key(row.get("message_preview"))
+            target = None
+            if preview:
+                candidates = [ts for ts, key in answers if ts not in taken and key and
+                              (key.startswith(preview) or preview.startswith(key))]
+                # The same answer text can recur; prefer the latest one before the click
+                before = [ts for ts in candidates if ts <= clicked_at]
+                target = (before or candidates or [None])[-1]
+            else:
+                before = [ts for ts, _ in answers if ts not in taken and ts <= clicked_at]
+                target = before[-1] if before else None
+            if target is None:
+                continue
+            taken.add(target)
+            if row.get("feedback") in ("positive", "negative"):
+                matched[(session_id, target)] = row["feedback"]
+    return matched
+
+
+def fetch_session_answers(table_name, session_ids, budget=None) -> dict:
+    """session_id -> [(original_ts, preview_key(response))] for every message of each session."""
+    requests = [{
+        "TableName": table_name,
+        "KeyConditionExpression": "session_id = :sid",
+        "ProjectionExpression": "session_id, original_ts, #r",
+        "ExpressionAttributeNames": {"#r": "response"},
+        "ExpressionAttributeValues": {":sid": {"S": sid}},
+    } for sid in session_ids]
+    answers = defaultdict(list)
+    for page in scan_engine.stream_pages("query", requests, budget=budget):
+        for item in page:
+            if item.get("original_ts"):
+                answers[item["session_id"]].append((item["original_ts"], preview_key(item.get("response"))))
+    return answers
+
+
+def label_conversations(conversations: list, rows: list, table_name: str, budget=None):
+    """
+    Set each conversation's "sentiment" to its answer's current rating (or neutral).
+    Summaries carry no full answer text, so the complete answer list is read for
+    the sessions that have feedback – and only for those.
+    """
+    rated_sessions = {row.get("session_id") for row in rows}
+    sessions = {conv["session_id"] for conv in conversations if conv.get("session_id") in rated_sessions}
+    matched = match(fetch_session_answers(table_name, sessions, budget), rows) if sessions else {}
+    for conv in conversations:
+        conv["sentiment"] = matched.get((conv["session_id"], conv["timestamp"]), "neutral")
@@ -1,19 +1,45 @@
 import os
 import json
-from datetime import datetime, timedelta
+import hashlib
 from collections import defaultdict
+from datetime import datetime, timedelta
 
 import boto3
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Key
+
+import aggregation
+import archive_report
+import conversations
+import day_cache
+import day_index
+import feedback_join
+import rollups
+import scan_engine
+import trends
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  Env & AWS clients
 # ──────────────────────────────────────────────────────────────────────────────
 TABLE_NAME = os.environ["DYNAMODB_TABLE"]
 FEEDBACK_TABLE_NAME = os.environ.get("FEEDBACK_TABLE", "NCMWResponseFeedback")
+# session_id GSI on the feedback table (scripts/add-feedback-session-index.sh)
+FEEDBACK_SESSION_INDEX = os.environ.get("FEEDBACK_SESSION_INDEX", "SessionIndex")
+# Hour/day counters maintained by logclassifier; aggregates are read from here when set
+ROLLUP_TABLE_NAME = os.environ.get("ROLLUP_TABLE")
+# GSI over (day_bucket, original_ts); unset → fall back to the full-table scan
+DAY_INDEX_NAME = os.environ.get("DAY_INDEX_NAME")
+DAY_BUCKET_SHARDS = int(os.environ.get("DAY_BUCKET_SHARDS", "4"))
+# Permanent per-day aggregates for finalized days (unset → every day is read raw)
+DAY_CACHE_TABLE_NAME = os.environ.get("DAY_CACHE_TABLE")
+# A day is finalized this long after it ends (late feedback has landed by then)
+DAY_CACHE_GRACE_HOURS = float(os.environ.get("DAY_CACHE_GRACE_HOURS", "24"))
+# Parquet archive of closed days (sessionLogs compact_archive); needs pyarrow from a layer
+ARCHIVE_URI = os.environ.get("ARCHIVE_URI")
+ARCHIVE_TIMEFRAMES = ("custom", "yearly")
+# Max read units one request may spend on raw items (unset → unlimited)
+READ_RCU_BUDGET = float(os.environ["READ_RCU_BUDGET"]) if os.environ.get("READ_RCU_BUDGET") else None
 ddb   = boto3.resource("dynamodb")
 table = ddb.Table(TABLE_NAME)
-feedback_table = ddb.Table(FEEDBACK_TABLE_NAME)
 
 # ──────────────────────────────────────────────────────────────────────────────
 #  Helpers
@@ -40,19 +66,32 @@ def ok(body_dict):
             "Content-Type": "application/json",
             "Access-Control-Allow-Origin": "*",
         },
-        "body": json.dumps(body_dict),
+        # Sorted keys keep the body – and so its ETag – stable for unchanged results
+        "body": json.dumps(body_dict, sort_keys=True),
     }
 
 
-# ──────────────────────────────────────────────────────────────────────────────
-#  Lambda entry-point
-# ──────────────────────────────────────────────────────────────────────────────
-def lambda_handler(event, context):
-    log("=== NEW INVOCATION ============================================")
-    log("Raw queryStringParameters :", event.get("queryStringParameters"))
+def with_etag(response, request_headers):
+    """
+    Strong ETag on 200 responses (hash of the body). A matching If-None-Match
+    gets 304 with no body; the browser then reuses its cached copy.
+    """
+    if response.get("statusCode") != 200:
+        return response
+    headers = response.setdefault("headers", {})
+    etag = '"' + hashlib.sha256(response["body"].encode("utf-8")).hexdigest()[:32] + '"'
+    headers["ETag"] = etag
+    headers.setdefault("Cache-Control", "private, no-cache")  # always revalidate
 
-    # 1) Parse timeframe
-    params = event.get("queryStringParameters") or {}
+    if_none_match = next((v for k, v in request_headers.items() if k.lower() == "if-none-match"), "")
+    if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        log("ETag matched – returning 304")
+        return {"statusCode": 304, "headers": headers, "body": ""}
+    return response
+
+
+def resolve_timeframe(params):
+    """(timeframe, start, end) in UTC for the query parameters; ValueError on bad input."""
     tf = (params.get("timeframe") or "today").lower()
 
     now = datetime.utcnow()
@@ -63,14 +102,14 @@ def lambda_handler(event, context):
         end_date_str = params.get("end_date")
 
         if not start_date_str or not end_date_str:
-            return bad_request('Custom timeframe requires both start_date and end_date parameters')
+            raise ValueError('Custom timeframe requires both start_date and end_date parameters')
 
         try:
             # Parse dates in YYYY-MM-DD format
             start = datetime.strptime(start_date_str, "%Y-%m-%d")
             end = datetime.strptime(end_date_str, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
         except ValueError as e:
-            return bad_request(f'Invalid date format. Use YYYY-MM-DD: {str(e)}')
+            raise ValueError(f'Invalid date format. Use YYYY-MM-DD: {str(e)}')
     elif tf == "today":
         start = datetime(now.year, now.month, now.day)
         end = now
@@ -84,146 +123,352 @@ def lambda_handler(event, context):
         start = datetime(now.year, 1, 1)
         end = now
     else:
-        return bad_request(f'Invalid timeframe "{tf}". Use: today, weekly, monthly, yearly, or custom')
+        raise ValueError(f'Invalid timeframe "{tf}". Use: today, weekly, monthly, yearly, or custom')
+    return tf, start, end
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Lambda entry-point
+# ──────────────────────────────────────────────────────────────────────────────
+def lambda_handler(event, context):
+    """
+    GET /session-logs                       aggregate analytics for a timeframe
+    GET /session-logs/conversations         cursor-paginated conversation summaries
+    GET /session-logs/trends                hourly / daily / weekly series for a timeframe
+    GET /session-logs/{sessionId}           full text of a session (or one message by ?timestamp=)
+    """
+    log("=== NEW INVOCATION ============================================")
+    log("Raw queryStringParameters :", event.get("queryStringParameters"))
+
+    params = event.get("queryStringParameters") or {}
+    path_params = event.get("pathParameters") or {}
+    resource = (event.get("resource") or event.get("path") or "").rstrip("/")
+
+    if path_params.get("sessionId"):
+        response = get_session(path_params["sessionId"], params)
+    elif resource.endswith("/conversations"):
+        response = list_conversations(params)
+    elif resource.endswith("/trends"):
+        response = get_trends(params)
+    else:
+        response = get_analytics(params)
+    return with_etag(response, event.get("headers") or {})
+
+
+def get_analytics(params):
+    # 1) Parse timeframe
+    try:
+        tf, start, end = resolve_timeframe(params)
+    except ValueError as e:
+        return bad_request(str(e))
 
     log("Timeframe                 :", tf)
     log("Start / End UTC           :", start, "/", end)
 
-    # 2) Build filter & projection
-    start_iso, end_iso = start.isoformat(), end.isoformat()
-    filter_exp = Attr("original_ts").between(start_iso, end_iso)
-    projection = "session_id, #loc, category, sentiment, satisfaction_score, #q, #r, original_ts"
-    expr_names = { "#loc": "location", "#q": "query", "#r": "response" }
+    result = {
+        "timeframe":  tf,
+        "start_date": start.strftime("%Y-%m-%d"),
+        "end_date":   end.strftime("%Y-%m-%d"),
+    }
+
+    # ?source=index|scan forces aggregation from raw items (e.g. to cross-check rollups),
+    # read through the day-bucket index or a full-table scan respectively.
+    # Long ranges (custom, yearly) default to the Parquet archive when it is available.
+    # ?include_conversations=true adds summaries of the latest 50 conversations; browsing
+    # beyond that goes through /session-logs/conversations
+    archive_ready = bool(ARCHIVE_URI and DAY_INDEX_NAME) and archive_report.available()
+    default_source = "archive" if archive_ready and tf in ARCHIVE_TIMEFRAMES else "rollups"
+    source = (params.get("source") or default_source).lower()
+    use_archive = archive_ready and source == "archive"
+    use_rollups = bool(ROLLUP_TABLE_NAME) and source not in ("index", "scan") and not use_archive
+    include_conversations = (params.get("include_conversations") or "false").lower() == "true"
+
+    budget = scan_engine.CapacityBudget(READ_RCU_BUDGET)
+    use_index = bool(DAY_INDEX_NAME) and source != "scan"
+    latest = None
+
+    if use_rollups:
+        bucket_keys = rollups.plan_buckets(start, end)
+        rollup_items = rollups.read_buckets(ddb, ROLLUP_TABLE_NAME, bucket_keys)
+        log("Rollup buckets planned    :", len(bucket_keys))
+        log("Rollup buckets found      :", len(rollup_items))
+        result.update(rollups.summarize(rollup_items))
+        result["source"] = "rollups"
+    elif use_index:
+        result.update(aggregate_window(start, end, budget, use_archive=use_archive))
+        result["source"] = "archive" if use_archive else "index"
+    else:
+        summary, latest = scan_aggregate(start, end, budget, top_k=50 if include_conversations else 0)
+        result.update(summary)
+        result["source"] = "scan"
+
+    if include_conversations:
+        # Latest 50, text cut to previews
+        result["conversations"] = latest if latest is not None else recent_conversations(start, end, budget)
+    if budget.exhausted:
+        # Partial read – figures cover only what was read before the budget ran out
+        result["truncated"] = True
+
+    log("Distinct sessions         :", result.get("user_count"))
+    log("Distinct categories       :", len(result.get("categories", {})))
+    log("Returning 200")
+    response = ok(result)
+    if not budget.exhausted and end + timedelta(hours=DAY_CACHE_GRACE_HOURS) <= datetime.utcnow():
+        # Wholly finalized window – the answer will not change
+        response["headers"]["Cache-Control"] = "private, max-age=86400"
+    return response
+
 
-    # 3) Scan in pages
-    items = []
-    resp = table.scan(
-        FilterExpression=filter_exp,
+# ──────────────────────────────────────────────────────────────────────────────
+#  Raw conversation path
+# ──────────────────────────────────────────────────────────────────────────────
+def item_projection(with_text=False):
+    """
+    Attributes the aggregation reads. The query/response text is only needed for
+    conversation previews – leaving it out keeps pages and Lambda memory small.
+    """
+    projection = "session_id, #loc, category, sentiment, satisfaction_score, sample_rate, original_ts"
+    names = { "#loc": "location" }
+    if with_text:
+        projection += ", #ts, user_role, #q, #r"
+        names.update({ "#ts": "timestamp", "#q": "query", "#r": "response" })
+    return projection, names
+
+
+def scan_window(start_iso, end_iso, budget, projection, names):
+    """Segmented parallel scan for items whose original_ts falls in the window."""
+    pages = scan_engine.parallel_scan(
+        TABLE_NAME,
+        budget=budget,
+        FilterExpression="original_ts BETWEEN :start AND :end",
         ProjectionExpression=projection,
-        ExpressionAttributeNames=expr_names,
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues={":start": {"S": start_iso}, ":end": {"S": end_iso}},
     )
-    items.extend(resp.get("Items", []))
-    log("Page 1 items              :", len(resp.get("Items", [])))
-
-    while "LastEvaluatedKey" in resp:
-        resp = table.scan(
-            FilterExpression=filter_exp,
-            ProjectionExpression=projection,
-            ExpressionAttributeNames=expr_names,
-            ExclusiveStartKey=resp["LastEvaluatedKey"],
+    return _stream_items(pages, "Scan", budget)
+
+
+def _stream_items(pages, label, budget):
+    """Flatten pages into items as they arrive, logging totals once the read finishes."""
+    page_count = item_count = 0
+    for page in pages:
+        page_count += 1
+        item_count += len(page)
+        yield from page
+    log(f"{label + ' pages read':<26}:", page_count)
+    log(f"{label + ' items read':<26}:", item_count)
+    log(f"{label + ' RCUs consumed':<26}:", round(budget.consumed, 1))
+    if budget.exhausted:
+        log(f"{label} stopped early: RCU budget of {budget.max_units} spent")
+
+
+def aggregate_window(start, end, budget, use_archive=False):
+    """
+    Aggregate from raw items, day by day. Finalized days come from the day cache;
+    with use_archive, uncached days that are archived come from the Parquet
+    archive; the rest are read through the day-bucket index. Finalized days
+    computed here are written back to the cache.
+    """
+    days = day_cache.window_days(start, end)
+    finalized = (day_cache.finalized_days(start, end, datetime.utcnow(), DAY_CACHE_GRACE_HOURS)
+                 if DAY_CACHE_TABLE_NAME else [])
+    partials = day_cache.load(ddb, DAY_CACHE_TABLE_NAME, finalized) if finalized else {}
+
+    fresh = {}  # day -> partial without feedback
+    if use_archive:
+        today = f"{datetime.utcnow():%Y-%m-%d}"
+        archived = [day for day in days if day not in partials and day < today]
+        archived = sorted(set(archived) & archive_report.archived_days(ARCHIVE_URI))
+        if archived:
+            fresh.update(archive_report.day_partials(ARCHIVE_URI, archived, start.isoformat(), end.isoformat()))
+    to_read = [day for day in days if day not in partials and day not in fresh]
+    log("Days cached / archived / to read:", len(partials), "/", len(fresh), "/", len(to_read))
+
+    if to_read:
+        per_day = defaultdict(lambda: aggregation.StreamingAggregate(top_k=0, track_sessions=True))
+        projection, names = item_projection()
+        pages = day_index.query_window(
+            TABLE_NAME, DAY_INDEX_NAME, start, end, DAY_BUCKET_SHARDS, projection, names, budget, days=set(to_read),
         )
-        log("…Next page items          :", len(resp.get("Items", [])))
-        items.extend(resp.get("Items", []))
+        for it in _stream_items(pages, "Index", budget):
+            per_day[(it.get("original_ts") or "")[:10]].add(it)
+        fresh.update({day: per_day[day].to_partial() for day in to_read})
+
+    if fresh:
+        # Feedback is counted per day too, so each day's partial can be cached on its own
+        active_days = defaultdict(list)
+        for day in sorted(fresh):
+            for session_id in fresh[day]["sessions"]:
+                active_days[session_id].append(day)
+        rows = feedback_join.fetch_for_sessions(
+            FEEDBACK_TABLE_NAME, FEEDBACK_SESSION_INDEX, set(active_days), max(start.isoformat(), min(fresh)), budget,
+        )
+        log(f"Feedback rows fetched     : {len(rows)} for {len(active_days)} sessions")
+        feedback = feedback_join.count_ratings_by_day(rows, active_days)
+
+        cache_table = ddb.Table(DAY_CACHE_TABLE_NAME) if DAY_CACHE_TABLE_NAME else None
+        for day, partial in fresh.items():
+            partials[day] = dict(partial, feedback=dict(feedback.get(day, {"positive": 0, "negative": 0})))
+            # Never cache a day that may have been cut short by the RCU budget
+            if cache_table and day in finalized and not budget.exhausted:
+                try:
+                    day_cache.store(cache_table, day, partials[day])
+                except Exception as e:
+                    log(f"Day cache write failed for {day}: {e}")
+
+    total = aggregation.StreamingAggregate(top_k=0)
+    positive = negative = 0
+    for partial in partials.values():
+        total.merge_partial(partial)
+        positive += partial["feedback"]["positive"]
+        negative += partial["feedback"]["negative"]
+    summary = total.summary()
+    summary["sentiment"] = {
+        "positive": positive,
+        "negative": negative,
+        "neutral": max(summary["total_messages"] - positive - negative, 0),
+    }
+    return summary
+
+
+def scan_aggregate(start, end, budget, top_k=0):
+    """Aggregate (and optionally the latest top_k conversations) from a full-table scan."""
+    projection, names = item_projection(with_text=top_k > 0)
+    items = scan_window(start.isoformat(), end.isoformat(), budget, projection, names)
+    # One streaming pass: running counters plus a top-k heap of the latest conversations
+    acc = aggregation.StreamingAggregate(top_k=top_k, track_sessions=True).consume(items)
+    summary, latest = acc.summary(), acc.conversations()
+    apply_feedback(summary, latest, acc.sessions, start.isoformat(), budget)
+    return summary, latest
+
+
+def recent_conversations(start, end, budget):
+    """Latest 50 conversation summaries – the first browse page when the index exists."""
+    if not DAY_INDEX_NAME:
+        return scan_aggregate(start, end, budget, top_k=50)[1]
+    page = conversations.browse(
+        TABLE_NAME, DAY_INDEX_NAME, DAY_BUCKET_SHARDS, start, end, {}, 50, None,
+        FEEDBACK_TABLE_NAME, FEEDBACK_SESSION_INDEX, budget,
+    )
+    return page["conversations"]
+
+
+def apply_feedback(summary, latest, sessions, since_iso, budget):
+    """
+    Count the window's thumbs up/down and mark each returned conversation:
+    - positive: User clicked thumbs up on that answer
+    - negative: User clicked thumbs down on that answer
+    - neutral:  No (or cleared) feedback
+    """
+    rows = feedback_join.fetch_for_sessions(
+        FEEDBACK_TABLE_NAME, FEEDBACK_SESSION_INDEX, sessions, since_iso, budget,
+    )
+    log(f"Feedback rows fetched     : {len(rows)} for {len(sessions)} sessions")
 
-    log("TOTAL items scanned       :", len(items))
+    counts = feedback_join.count_ratings(rows)
+    counts["neutral"] = max(summary["total_messages"] - counts["positive"] - counts["negative"], 0)
 
-    # 4) Fetch user feedback from feedback table
-    log("Fetching user feedback...")
-    feedback_resp = feedback_table.scan()
-    feedback_items = feedback_resp.get("Items", [])
+    feedback_join.label_conversations(latest, rows, TABLE_NAME, budget)
+
+    log(f"Feedback counts - Positive: {counts['positive']}, Negative: {counts['negative']}, Neutral: {counts['neutral']}")
+    summary["sentiment"] = counts  # Use user feedback instead of AI sentiment
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Trends
+# ──────────────────────────────────────────────────────────────────────────────
+def get_trends(params):
+    """
+    Series of message volume, distinct users, per-category counts, feedback
+    sentiment and average satisfaction per ?interval=hour|day|week (default day).
+    """
+    if not ROLLUP_TABLE_NAME:
+        return bad_request("Trends require the rollup table (ROLLUP_TABLE)")
+    try:
+        tf, start, end = resolve_timeframe(params)
+        series = trends.build(ddb, ROLLUP_TABLE_NAME, start, end, (params.get("interval") or "day").lower())
+    except ValueError as e:
+        return bad_request(str(e))
+
+    log("Trend points              :", len(series["points"]), "| buckets read:", series["buckets_read"])
+    return ok(dict(series, timeframe=tf, start_date=start.strftime("%Y-%m-%d"), end_date=end.strftime("%Y-%m-%d")))
 
-    # Continue scanning if there are more feedback items
-    while "LastEvaluatedKey" in feedback_resp:
-        feedback_resp = feedback_table.scan(
-            ExclusiveStartKey=feedback_resp["LastEvaluatedKey"]
-        )
-        feedback_items.extend(feedback_resp.get("Items", []))
-
-    log(f"Total feedback items      : {len(feedback_items)}")
-
-    # Build feedback map: session_id -> list of feedback (positive/negative)
-    # Each session can have multiple messages with feedback
-    feedback_by_session = defaultdict(list)
-    for fb in feedback_items:
-        session_id = fb.get("session_id")
-        feedback_type = fb.get("feedback")
-        if session_id and feedback_type:
-            feedback_by_session[session_id].append(feedback_type)
-
-    log(f"Feedback map size         : {len(feedback_by_session)}")
-    log(f"Total feedback entries    : {sum(len(fb_list) for fb_list in feedback_by_session.values())}")
-
-    # 5) Aggregate using user feedback (thumbs up/down) with neutral for no feedback
-    sessions = set()
-    loc_counts = defaultdict(int)
-    cat_counts = defaultdict(int)
-    # Count based on user feedback (thumbs up/down) + neutral for no feedback
-    feedback_sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
-    satisfaction_scores = []
-    conversations = []
 
+# ──────────────────────────────────────────────────────────────────────────────
+#  Conversation browsing
+# ──────────────────────────────────────────────────────────────────────────────
+def list_conversations(params):
+    """
+    Page of conversation summaries, newest first. Filters: category, role,
+    sentiment (user feedback). Pass back next_cursor as ?cursor= for the next page.
+    """
+    if not DAY_INDEX_NAME:
+        return bad_request("Conversation browsing requires the day-bucket index (DAY_INDEX_NAME)")
+    try:
+        tf, start, end = resolve_timeframe(params)
+        limit = int(params.get("limit") or conversations.DEFAULT_LIMIT)
+    except ValueError as e:
+        return bad_request(str(e))
+    if not 1 <= limit <= conversations.MAX_LIMIT:
+        return bad_request(f"limit must be between 1 and {conversations.MAX_LIMIT}")
+
+    filters = {k: params[k] for k in ("category", "role", "sentiment") if params.get(k) and params[k] != "all"}
+    if filters.get("sentiment") and filters["sentiment"] not in conversations.FEEDBACK_SENTIMENTS:
+        return bad_request(f'Invalid sentiment. Use: {", ".join(conversations.FEEDBACK_SENTIMENTS)}')
+
+    budget = scan_engine.CapacityBudget(READ_RCU_BUDGET)
+    try:
+        page = conversations.browse(
+            TABLE_NAME, DAY_INDEX_NAME, DAY_BUCKET_SHARDS, start, end, filters, limit,
+            params.get("cursor"), FEEDBACK_TABLE_NAME, FEEDBACK_SESSION_INDEX, budget,
+        )
+    except conversations.CursorError as e:
+        return bad_request(str(e))
+
+    log("Conversations returned    :", len(page["conversations"]), "| more:", page["has_more"])
+    log("Browse RCUs consumed      :", round(budget.consumed, 1))
+    return ok(dict(page, timeframe=tf, filters=filters))
+
+
+def get_session(session_id, params):
+    """Full query/response text for one session, or for one message with ?timestamp=<sort key>."""
+    if params.get("timestamp"):
+        item = table.get_item(Key={"session_id": session_id, "timestamp": params["timestamp"]}).get("Item")
+        if not item:
+            return {
+                "statusCode": 404,
+                "headers": {
+                    "Content-Type": "application/json",
+                    "Access-Control-Allow-Origin": "*",
+                },
+                "body": json.dumps({"error": "Conversation not found"}),
+            }
+        items = [item]
+    else:
+        items = []
+        kwargs = {"KeyConditionExpression": Key("session_id").eq(session_id)}
+        while True:
+            resp = table.query(**kwargs)
+            items.extend(resp.get("Items", []))
+            if "LastEvaluatedKey" not in resp:
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    messages = []
     for it in items:
-        if sid := it.get("session_id"):
-            sessions.add(sid)
-        if loc := it.get("location"):
-            if isinstance(loc, str) and loc:  # Only count valid location strings
-                loc_counts[loc] += 1
-        if cat := it.get("category"):
-            cat_counts[cat] += 1
-        if score := it.get("satisfaction_score"):
-            satisfaction_scores.append(float(score))
-
-        # Get user feedback for this conversation's session
-        session_id = it.get("session_id")
-        timestamp = it.get("original_ts")
-
-        # Check if there's any feedback for this session
-        # If a session has multiple feedback entries, use the most recent one (last in list)
-        user_feedback = None
-        if session_id and session_id in feedback_by_session:
-            session_feedback_list = feedback_by_session[session_id]
-            if session_feedback_list:
-                # Use the last feedback entry for this session
-                user_feedback = session_feedback_list[-1]
-                log(f"Found feedback for session {session_id}: {user_feedback}")
-
-        # Determine sentiment based on user feedback:
-        # - positive: User clicked thumbs up
-        # - negative: User clicked thumbs down
-        # - neutral: User didn't click either (no feedback)
-        sentiment = user_feedback if user_feedback else "neutral"
-
-        # Count the sentiment
-        if sentiment == "positive":
-            feedback_sentiment_counts["positive"] += 1
-        elif sentiment == "negative":
-            feedback_sentiment_counts["negative"] += 1
-        else:
-            feedback_sentiment_counts["neutral"] += 1
-
-        # Build conversation log entry - include ALL conversations
-        conversations.append({
-            "session_id": session_id,
-            "timestamp": timestamp,
+        score = it.get("satisfaction_score")
+        messages.append({
+            "key": {"session_id": it.get("session_id"), "timestamp": it.get("timestamp")},
+            "timestamp": it.get("original_ts"),
             "query": it.get("query", ""),
             "response": it.get("response", ""),
             "category": it.get("category", "Unknown"),
-            "sentiment": sentiment,  # positive (👍), negative (👎), or neutral (no feedback)
-            "satisfaction_score": float(it.get("satisfaction_score", 50))
+            "location": it.get("location") or "",
+            "user_role": it.get("user_role"),
+            "ai_sentiment": it.get("sentiment"),
+            "sentiment_reason": it.get("sentiment_reason"),
+            "satisfaction_score": float(score) if score is not None else None,
         })
-
-    log(f"Feedback counts - Positive: {feedback_sentiment_counts['positive']}, Negative: {feedback_sentiment_counts['negative']}, Neutral: {feedback_sentiment_counts['neutral']}")
-
-    # Calculate average satisfaction
-    avg_satisfaction = sum(satisfaction_scores) / len(satisfaction_scores) if satisfaction_scores else 0
-
-    # Sort conversations by timestamp (most recent first)
-    conversations.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-
-    result = {
-        "timeframe":  tf,
-        "start_date": start.strftime("%Y-%m-%d"),
-        "end_date":   end.strftime("%Y-%m-%d"),
-        "user_count": len(sessions),
-        "locations":  list(loc_counts.keys()),
-        "categories": dict(cat_counts),
-        "sentiment": feedback_sentiment_counts,  # Use user feedback instead of AI sentiment
-        "avg_satisfaction": round(avg_satisfaction, 1),
-        "conversations": conversations[:50]  # Return latest 50 conversations
-    }
-
-    log("Distinct sessions         :", len(sessions))
-    log("Distinct locations        :", len(loc_counts))
-    log("Distinct categories       :", len(cat_counts))
-    log("Returning 200")
-    return ok(result)
+    messages.sort(key=lambda m: m["timestamp"] or "")
+    log("Session messages returned :", len(messages))
+    return ok({"session_id": session_id, "messages": messages})
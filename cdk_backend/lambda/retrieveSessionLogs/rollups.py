@@ -0,0 +1,85 @@
+"""
+Reader for the hour/day rollup items maintained by logclassifier
+(layout documented in logclassifier/rollups.py – keep the two in sync).
+
+A timeframe is answered from O(buckets) items: whole days come from their
+"D#" item, a partial day (e.g. today so far) from its "H#" items.
+"""
+
+import time
+from datetime import timedelta
+
+import sketches
+
+
+def plan_buckets(start, end) -> list:
+    """Bucket keys covering [start, end]; end is inclusive to the second."""
+    keys = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end:
+        day_last_second = day + timedelta(days=1) - timedelta(seconds=1)
+        if start <= day and end >= day_last_second:
+            keys.append(f"D#{day:%Y-%m-%d}")
+        else:
+            hour = max(start, day).replace(minute=0, second=0, microsecond=0)
+            while hour <= min(end, day_last_second):
+                keys.append(f"H#{hour:%Y-%m-%dT%H}")
+                hour += timedelta(hours=1)
+        day += timedelta(days=1)
+    return keys
+
+
+def read_buckets(dynamodb, table_name: str, keys: list) -> list:
+    """BatchGetItem in chunks of 100, retrying unprocessed keys with a short backoff."""
+    items = []
+    for start in range(0, len(keys), 100):
+        request = {table_name: {"Keys": [{"bucket": k} for k in keys[start:start + 100]]}}
+        for attempt in range(5):
+            resp = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(resp.get("Responses", {}).get(table_name, []))
+            request = resp.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            time.sleep(0.05 * 2 ** attempt)
+    return items
+
+
+def summarize(items: list) -> dict:
+    """Merge rollup items into the dashboard aggregate fields."""
+    counters = {}
+    hll = sketches.HyperLogLog()
+    for item in items:
+        for attr, value in item.items():
+            if attr == "hll":
+                hll.update_codes(value)
+            elif attr == "sessions":  # bucket written before sketches
+                for session_id in value:
+                    hll.add(session_id)
+            elif attr != "bucket":
+                counters[attr] = counters.get(attr, 0) + float(value)
+
+    def by_prefix(prefix):
+        return {k[len(prefix):]: int(v) for k, v in counters.items() if k.startswith(prefix) and v}
+
+    messages = int(counters.get("messages", 0))
+    feedback = by_prefix("feedback:")
+    positive, negative = feedback.get("positive", 0), feedback.get("negative", 0)
+    weight = counters.get("satisfaction_weight", 0)
+    histogram = {k[len("satisfaction_hist:"):]: v for k, v in counters.items() if k.startswith("satisfaction_hist:")}
+
+    return {
+        "user_count": hll.estimate(),
+        "total_messages": messages,
+        "locations": sorted(by_prefix("location:")),
+        "categories": by_prefix("category:"),
+        "roles": by_prefix("role:"),
+        # Dashboard sentiment is thumbs-up/down; messages without feedback count as neutral
+        "sentiment": {
+            "positive": positive,
+            "negative": negative,
+            "neutral": max(messages - positive - negative, 0),
+        },
+        "ai_sentiment": by_prefix("sentiment:"),
+        "avg_satisfaction": round(counters.get("satisfaction_weighted_sum", 0) / weight, 1) if weight else 0,
+        "satisfaction_percentiles": sketches.percentiles(histogram),
+    }
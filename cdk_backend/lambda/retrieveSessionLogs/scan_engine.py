@@ -0,0 +1,157 @@
+"""
+Parallel paginated reads (Scan segments or Query partitions) streamed page by page.
+
+Every request runs on a worker thread and pushes each page into a bounded queue
+as soon as it arrives; the caller iterates a generator of pages. At most
+`max_workers * prefetch` pages are buffered, so memory stays flat however large
+the range, and workers block (rather than read ahead) when the caller is slow.
+
+All workers charge one CapacityBudget; once it is spent no further pages are
+requested and the generator ends early with `budget.exhausted` set (requests
+already in flight still complete, so the overshoot is at most one page per worker).
+"""
+
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+
+# Target table bytes per scan segment, and the segment / worker ceilings
+SEGMENT_BYTES = 64 * 1024 * 1024
+MAX_SEGMENTS = 32
+MAX_WORKERS = 16
+TABLE_SIZE_TTL_SECONDS = 3600  # TableSizeBytes itself only refreshes about every 6 hours
+
+# Low-level clients are thread-safe; resources/Tables are not
+_client = boto3.client("dynamodb")
+_deserializer = TypeDeserializer()
+_table_sizes = {}
+
+
+class CapacityBudget:
+    """Shared read-capacity allowance for one request; None means unlimited."""
+
+    def __init__(self, max_units=None):
+        self.max_units = max_units
+        self.consumed = 0.0
+        self._lock = threading.Lock()
+
+    def charge(self, units: float):
+        with self._lock:
+            self.consumed += units
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_units is not None and self.consumed >= self.max_units
+
+
+def table_size_bytes(table_name: str) -> int:
+    cached = _table_sizes.get(table_name)
+    if cached and time.monotonic() - cached[1] < TABLE_SIZE_TTL_SECONDS:
+        return cached[0]
+    size = int(_client.describe_table(TableName=table_name)["Table"].get("TableSizeBytes", 0))
+    _table_sizes[table_name] = (size, time.monotonic())
+    return size
+
+
+def segments_for(table_name: str, segment_bytes: int = SEGMENT_BYTES, max_segments: int = MAX_SEGMENTS) -> int:
+    """One segment per `segment_bytes` of table, between 1 and max_segments."""
+    try:
+        size = table_size_bytes(table_name)
+    except Exception as e:
+        print(f"[scan_engine] describe_table failed, using {max_segments // 4} segments: {e}")
+        return max(1, max_segments // 4)
+    return max(1, min(max_segments, math.ceil(size / segment_bytes)))
+
+
+def stream_pages(operation: str, requests: list, max_workers: int = MAX_WORKERS, budget: CapacityBudget = None, prefetch: int = 2):
+    """
+    Run each low-level `operation` ("scan" or "query") request to completion in
+    parallel and yield every page as a list of plain Python items.
+    The first worker error is re-raised in the caller; closing the generator stops the workers.
+    """
+    if not requests:
+        return
+    workers = max(1, min(max_workers, len(requests)))
+    pages = queue.Queue(maxsize=workers * prefetch)
+    stop = threading.Event()
+    call = getattr(_client, operation)
+
+    def put(message):
+        # Never block forever on a consumer that has gone away
+        while not stop.is_set():
+            try:
+                pages.put(message, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def worker(request):
+        kwargs = dict(request, ReturnConsumedCapacity="TOTAL")
+        try:
+            while not stop.is_set() and not (budget and budget.exhausted):
+                resp = call(**kwargs)
+                if budget is not None:
+                    budget.charge(resp.get("ConsumedCapacity", {}).get("CapacityUnits", 0))
+                put(("page", [
+                    {k: _deserializer.deserialize(v) for k, v in raw.items()}
+                    for raw in resp.get("Items", [])
+                ]))
+                if "LastEvaluatedKey" not in resp:
+                    break
+                kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+        except Exception as e:
+            put(("error", e))
+        finally:
+            put(("done", None))
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    for request in requests:
+        pool.submit(worker, request)
+    remaining = len(requests)
+    try:
+        while remaining:
+            kind, payload = pages.get()
+            if kind == "done":
+                remaining -= 1
+            elif kind == "error":
+                raise payload
+            else:
+                yield payload
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parallel_scan(table_name: str, total_segments: int = None, max_workers: int = MAX_WORKERS, budget: CapacityBudget = None, **scan_kwargs):
+    """Segmented Scan of the whole table; segments sized from the table unless given."""
+    total = total_segments or segments_for(table_name)
+    requests = [
+        dict(scan_kwargs, TableName=table_name, Segment=segment, TotalSegments=total)
+        for segment in range(total)
+    ]
+    return stream_pages("scan", requests, max_workers=max_workers, budget=budget)
+
+
+def fetch_pages(operation: str, requests: list, max_workers: int = MAX_WORKERS, budget: CapacityBudget = None) -> list:
+    """
+    One call per request, in parallel – for callers that page by hand (cursors).
+    Returns [(items, LastEvaluatedKey or None)] in request order.
+    """
+    if not requests:
+        return []
+    call = getattr(_client, operation)
+
+    def one(request):
+        resp = call(**dict(request, ReturnConsumedCapacity="TOTAL"))
+        if budget is not None:
+            budget.charge(resp.get("ConsumedCapacity", {}).get("CapacityUnits", 0))
+        items = [{k: _deserializer.deserialize(v) for k, v in raw.items()} for raw in resp.get("Items", [])]
+        return items, resp.get("LastEvaluatedKey")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(requests)))) as pool:
+        return list(pool.map(one, requests))
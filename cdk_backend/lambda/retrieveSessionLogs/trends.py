@@ -0,0 +1,61 @@
+"""
+Hourly / daily / weekly series from the rollup buckets.
+
+Every period of the window is planned up front – a dense grid – and mapped to
+the rollup keys covering it (rollups.plan_buckets, clipped to the window), so
+one BatchGetItem round answers the whole chart. Periods without traffic have
+no rollup items and come out as zero points: gap filling is the grid itself.
+Weekly periods start on Monday, like the "weekly" timeframe.
+"""
+
+from datetime import timedelta
+
+import rollups
+
+INTERVALS = ("hour", "day", "week")
+# Hourly series are meant for short windows; bounds the keys read per request
+MAX_HOURLY_DAYS = 31
+
+
+def periods(start, end, interval: str) -> list:
+    """[(label, period_start, period_end)] covering [start, end], clipped to it."""
+    if interval == "hour":
+        cursor, step, fmt = start.replace(minute=0, second=0, microsecond=0), timedelta(hours=1), "%Y-%m-%dT%H:00"
+    elif interval == "day":
+        cursor, step, fmt = start.replace(hour=0, minute=0, second=0, microsecond=0), timedelta(days=1), "%Y-%m-%d"
+    elif interval == "week":
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        cursor, step, fmt = day - timedelta(days=day.weekday()), timedelta(days=7), "%Y-%m-%d"
+    else:
+        raise ValueError(f'Invalid interval "{interval}". Use: {", ".join(INTERVALS)}')
+
+    result = []
+    while cursor <= end:
+        period_end = cursor + step - timedelta(seconds=1)
+        result.append((f"{cursor:{fmt}}", max(cursor, start), min(period_end, end)))
+        cursor += step
+    return result
+
+
+def build(dynamodb, table_name: str, start, end, interval: str) -> dict:
+    """{"interval", "points": [...], "categories": [...]} for the window."""
+    if interval == "hour" and end - start > timedelta(days=MAX_HOURLY_DAYS):
+        raise ValueError(f"Hourly trends are limited to {MAX_HOURLY_DAYS} days; use interval=day or week")
+
+    planned = [(label, rollups.plan_buckets(p_start, p_end)) for label, p_start, p_end in periods(start, end, interval)]
+    keys = sorted({key for _, period_keys in planned for key in period_keys})
+    items = {item["bucket"]: item for item in rollups.read_buckets(dynamodb, table_name, keys)}
+
+    points, categories = [], set()
+    for label, period_keys in planned:
+        summary = rollups.summarize([items[key] for key in period_keys if key in items])
+        categories.update(summary["categories"])
+        points.append({
+            "period": label,
+            "messages": summary["total_messages"],
+            "users": summary["user_count"],
+            "categories": summary["categories"],
+            "sentiment": summary["sentiment"],
+            "avg_satisfaction": summary["avg_satisfaction"],
+        })
+    return {"interval": interval, "points": points, "categories": sorted(categories), "buckets_read": len(items)}
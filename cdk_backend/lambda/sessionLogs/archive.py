@@ -0,0 +1,137 @@
+"""
+Columnar archive of conversation items for long-range reporting.
+
+Each finished day is exported from the DayBucketIndex into one zstd-compressed
+Parquet file, hive-partitioned by day:
+
+  <ARCHIVE_URI>/dt=YYYY-MM-DD/part-0.parquet
+
+ARCHIVE_URI is "s3://bucket/prefix" in Lambda or a plain directory locally.
+Re-compacting a day overwrites its file, so runs are idempotent and late items
+are picked up by compacting the day again.
+
+A day is streamed, not loaded: the index shards are merged in original_ts order
+and written ROW_GROUP_ROWS at a time, so memory stays flat however busy the day.
+
+Read by retrieveSessionLogs/archive_report.py – keep SCHEMA in sync with it.
+"""
+
+import heapq
+from datetime import datetime, timedelta
+
+from boto3.dynamodb.conditions import Key
+
+try:
+    import pyarrow as pa
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # provided by a Lambda layer; the archive is disabled without it
+    pa = None
+
+# Rows buffered per Parquet row group
+ROW_GROUP_ROWS = 10000
+
+# (column, type) – everything the DayBucketIndex projects except the bucket itself
+COLUMNS = [
+    ("session_id", "string"),
+    ("timestamp", "string"),
+    ("original_ts", "string"),
+    ("query", "string"),
+    ("response", "string"),
+    ("location", "string"),
+    ("category", "string"),
+    ("category_source", "string"),
+    ("sentiment", "string"),
+    ("user_role", "string"),
+    ("satisfaction_score", "float64"),
+    ("sample_rate", "float64"),
+]
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def schema():
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in COLUMNS])
+
+
+def filesystem(uri: str):
+    """(FileSystem, root path) for an s3:// URI or a local directory."""
+    if "://" in uri:
+        return pafs.FileSystem.from_uri(uri)
+    return pafs.LocalFileSystem(), uri.rstrip("/")
+
+
+def _shard_items(table, index_name: str, bucket: str):
+    kwargs = {"IndexName": index_name, "KeyConditionExpression": Key("day_bucket").eq(bucket)}
+    while True:
+        resp = table.query(**kwargs)
+        yield from resp.get("Items", [])
+        if "LastEvaluatedKey" not in resp:
+            return
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def day_items(table, index_name: str, day: str, shards: int):
+    """
+    Every conversation item of `day` ("YYYY-MM-DD") in original_ts order: the
+    index returns each shard sorted, so one lazily paginated Query per shard is merged.
+    """
+    return heapq.merge(
+        *(_shard_items(table, index_name, f"{day}#{shard}") for shard in range(shards)),
+        key=lambda it: it.get("original_ts") or "",
+    )
+
+
+def to_table(items: list):
+    columns = {}
+    for name, kind in COLUMNS:
+        if kind == "float64":
+            columns[name] = [float(it[name]) if it.get(name) is not None else None for it in items]
+        else:
+            columns[name] = [str(it[name]) if it.get(name) is not None else None for it in items]
+    return pa.Table.from_pydict(columns, schema=schema())
+
+
+def write_day(uri: str, day: str, items) -> tuple:
+    """
+    Write (or replace) the day's partition from an item iterator, one row group
+    per ROW_GROUP_ROWS items; returns (path, rows). The file is written under a
+    "_" name, which dataset readers skip, and only moved into place once complete.
+    """
+    fs, root = filesystem(uri)
+    directory = f"{root}/dt={day}"
+    fs.create_dir(directory, recursive=True)
+    path = f"{directory}/part-0.parquet"
+    staging = f"{directory}/_part-0.parquet.inprogress"
+
+    rows, batch = 0, []
+    with pq.ParquetWriter(staging, schema(), filesystem=fs, compression="zstd") as writer:
+        for item in items:
+            batch.append(item)
+            if len(batch) >= ROW_GROUP_ROWS:
+                writer.write_table(to_table(batch))
+                rows += len(batch)
+                batch = []
+        # Always at least one (possibly empty) row group, so empty days still get a readable file
+        if batch or not rows:
+            writer.write_table(to_table(batch))
+            rows += len(batch)
+    fs.move(staging, path)
+    return path, rows
+
+
+def compact(table, index_name: str, uri: str, start_date: str, end_date: str, shards: int) -> dict:
+    """Archive each day from start_date to end_date (inclusive)."""
+    day = datetime.strptime(start_date, "%Y-%m-%d")
+    last = datetime.strptime(end_date, "%Y-%m-%d")
+    written = {}
+    while day <= last:
+        key = f"{day:%Y-%m-%d}"
+        # Empty days get an empty file too, so readers can tell "archived, no traffic" from "not archived"
+        path, rows = write_day(uri, key, day_items(table, index_name, key, shards))
+        print(f"[archive] {key}: {rows} items -> {path}")
+        written[key] = rows
+        day += timedelta(days=1)
+    return written
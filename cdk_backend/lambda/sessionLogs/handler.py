@@ -1,13 +1,23 @@
 import boto3
 import json
-import time
 from datetime import datetime, timedelta
 import os
 
+import archive
+import log_export
+import log_stream
+
 # Configuration
 GROUP_NAME = os.environ['GROUP_NAME']
 BUCKET = os.environ['BUCKET']
 DYNAMODB_TABLE = os.environ['DYNAMODB_TABLE']
+# Parquet conversation archive (s3://bucket/prefix); unset disables compaction
+ARCHIVE_URI = os.environ.get('ARCHIVE_URI')
+# Day-bucket GSI the archive is exported from (same index and shards as retrieveSessionLogs)
+DAY_INDEX_NAME = os.environ.get('DAY_INDEX_NAME')
+DAY_BUCKET_SHARDS = int(os.environ.get('DAY_BUCKET_SHARDS', '4'))
+# Session log parts: "gzip", or "zstd" (needs the pyarrow layer)
+LOG_COMPRESSION = os.environ.get('LOG_COMPRESSION', 'gzip')
 
 # Initialize clients
 logs_client = boto3.client('logs')
@@ -16,104 +26,55 @@ dynamodb = boto3.resource('dynamodb')
 
 table = dynamodb.Table(DYNAMODB_TABLE)
 
-def store_session_logs():
-    """Store only session logs with specified fields"""
-    today = datetime.utcnow()
-    start_time = datetime(today.year, today.month, today.day)
-    end_time = today
-    
-    date_str = today.strftime('%Y-%m-%d')
-    
-    # Check if already processed
-    try:
-        response = table.get_item(Key={'date': date_str, 'session_id': 'SESSION_LOGS'})
-        if 'Item' in response:
-            print(f"Session logs for {date_str} already processed")
-            return {'success': False, 'message': 'Logs already processed'}
-    except Exception as e:
-        print(f"DynamoDB check failed: {str(e)}")
+def store_session_logs(context=None):
+    """Export session logs written since the last run (see log_export.py)."""
+    time_left_ms = context.get_remaining_time_in_millis if context else (lambda: 10 ** 9)
+    return log_export.export(logs_client, s3_client, GROUP_NAME, BUCKET, datetime.utcnow(), time_left_ms,
+                             compression=LOG_COMPRESSION)
 
-    try:
-        # Query to find session logs
-        query = """
-        fields @message
-        | filter @message like /"session_id":/
-        | filter @message like /"query":/
-        | filter @message like /"response":/
-        | filter @message like /"location":/
-        | limit 10000
-        """
-        
-        query_response = logs_client.start_query(
-            logGroupName=GROUP_NAME,
-            startTime=int(start_time.timestamp()),
-            endTime=int(end_time.timestamp()),
-            queryString=query,
-            limit=10000
-        )
-        
-        query_id = query_response['queryId']
-        print(f"Started query: {query_id}")
-        
-        # Wait for completion
-        response = None
-        while response is None or response['status'] == 'Running':
-            time.sleep(1)
-            response = logs_client.get_query_results(queryId=query_id)
-        
-        if response['status'] != 'Complete':
-            raise Exception(f"Query failed: {response['status']}")
-        
-        # Collect matching logs
-        session_logs = []
-        for result in response['results']:
-            message = next((f['value'] for f in result if f['field'] == '@message'), None)
-            if message:
-                try:
-                    # Extract JSON part
-                    json_start = message.find('{')
-                    if json_start != -1:
-                        log_data = json.loads(message[json_start:])
-                        if all(field in log_data for field in ['session_id', 'query', 'response']):
-                            session_logs.append(log_data)
-                except json.JSONDecodeError:
-                    continue
-        
-        if not session_logs:
-            print("No matching session logs found")
-            return {'success': False, 'message': 'No matching logs found'}
-        
-        # Store raw logs in S3
-        file_key = f"session_logs/{date_str}.json"
-        s3_client.put_object(
-            Bucket=BUCKET,
-            Key=file_key,
-            Body=json.dumps(session_logs),
-            ContentType='application/json'
-        )
-        
-        print(f"Stored {len(session_logs)} session logs to s3://{BUCKET}/{file_key}")
-        return {
-            'success': True,
-            's3_path': f"s3://{BUCKET}/{file_key}",
-            'log_count': len(session_logs)
-        }
-        
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        raise
+def stream_session_logs(event):
+    """Store one log subscription delivery as it arrives (see log_stream.py)."""
+    return log_stream.ingest(event, s3_client, BUCKET, compression=LOG_COMPRESSION)
+
+def compact_archive(event):
+    """Export finished days to the Parquet archive (default: yesterday)."""
+    if not ARCHIVE_URI or not DAY_INDEX_NAME or not archive.available():
+        print("Archive disabled: ARCHIVE_URI or DAY_INDEX_NAME unset, or pyarrow unavailable")
+        return {'success': False, 'message': 'Archive disabled'}
+
+    yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+    start_date = event.get('start_date', yesterday)
+    end_date = event.get('end_date', start_date)
+    # Only closed days – an archived day is trusted to be complete
+    if end_date > yesterday:
+        return {'success': False, 'message': f'end_date must be {yesterday} or earlier'}
+
+    written = archive.compact(table, DAY_INDEX_NAME, ARCHIVE_URI, start_date, end_date, DAY_BUCKET_SHARDS)
+    return {'success': True, 'message': f'Archived {len(written)} days', 'log_count': sum(written.values())}
 
 def lambda_handler(event, context):
+    # Log subscription deliveries: failures raise so Lambda retries the batch
+    if 'awslogs' in event:
+        result = stream_session_logs(event)
+        return {'statusCode': 200, 'body': json.dumps(result)}
+
     action = event.get('action', 'store_logs')
     
-    if action == 'store_logs':
-        result = store_session_logs()
+    if action == 'compact_archive':
+        result = compact_archive(event)
+        return {
+            'statusCode': 200 if result.get('success') else 400,
+            'body': json.dumps(result)
+        }
+    elif action == 'store_logs':
+        result = store_session_logs(context)
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'success': result.get('success', False),
                 'message': result.get('message', ''),
-                'log_count': result.get('log_count', 0)
+                'log_count': result.get('log_count', 0),
+                'watermark': result.get('watermark')
             })
         }
     else:
@@ -0,0 +1,203 @@
+"""
+Incremental export of session logs from CloudWatch Logs Insights to S3.
+
+Session logs normally stream to S3 through the log subscription filter
+(log_stream.py). This export is the on-demand backfill for time the stream
+did not cover, such as before the filter existed. It is not scheduled, because
+running both would store every record twice.
+
+A high-water mark (the last epoch second fully exported) is kept in a small
+checkpoint object next to the exports. Each run only covers
+(watermark, now - INGEST_LAG_SECONDS], so its cost follows the new data.
+
+Insights returns at most ROW_CAP rows per query. A window whose query
+matched more than that is split and re-queried, sized from the reported
+recordsMatched, so busy periods are never truncated. Up to MAX_CONCURRENT
+queries run at once. All running queries are polled in a single loop
+whose delay backs off exponentially while none of them finishes.
+
+Insights time ranges are whole seconds and inclusive at both ends, so
+windows are (start, end) pairs of epoch seconds that never overlap.
+
+Records are written as compressed NDJSON parts named export-<first second>
+(layout in ndjson_writer.py); the watermark lives in
+  session_logs/_checkpoint.json   {"watermark": epoch seconds, ...}
+"""
+
+import json
+import math
+import time
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+from log_stream import parse_message
+from ndjson_writer import SessionLogWriter
+
+ROW_CAP = 10000                  # Insights hard limit on rows per query
+MAX_CONCURRENT = 4               # account-wide Insights concurrency is shared with console users
+INGEST_LAG_SECONDS = 300         # events still arriving for the last few minutes are left for next run
+MAX_RUN_SECONDS = 2 * 24 * 3600  # catch-up after an outage proceeds two days per run
+POLL_MIN_DELAY, POLL_MAX_DELAY = 0.5, 8.0
+# Leave this much of the invocation for writing the exports and the checkpoint
+DEADLINE_MARGIN_MS = 20000
+
+CHECKPOINT_KEY = "session_logs/_checkpoint.json"
+
+# Same required fields as the streaming path (log_stream.REQUIRED_FIELDS); location is optional
+QUERY = """
+fields @timestamp, @message
+| filter @message like /"session_id":/
+| filter @message like /"query":/
+| filter @message like /"response":/
+| sort @timestamp asc
+| limit 10000
+"""
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Checkpoint
+# ──────────────────────────────────────────────────────────────────────────────
+def read_checkpoint(s3, bucket: str):
+    """(watermark or None, ETag or None)."""
+    try:
+        obj = s3.get_object(Bucket=bucket, Key=CHECKPOINT_KEY)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None, None
+        raise
+    return int(json.loads(obj["Body"].read())["watermark"]), obj["ETag"]
+
+
+def write_checkpoint(s3, bucket: str, watermark: int, etag) -> bool:
+    """
+    Advance the watermark, unless another run moved it since we read it
+    (conditional write). Returns False when we lost that race.
+    """
+    body = json.dumps({"watermark": watermark, "updated_at": datetime.utcnow().isoformat()})
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    try:
+        s3.put_object(Bucket=bucket, Key=CHECKPOINT_KEY, Body=body,
+                      ContentType="application/json", **condition)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "ConditionalRequestConflict"):
+            print("[log_export] checkpoint moved by a concurrent run – not advanced")
+            return False
+        raise
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Query scheduling
+# ──────────────────────────────────────────────────────────────────────────────
+def split(window: tuple, matched: int) -> list:
+    """Equal sub-windows expected to stay under the cap (at least two, at most one per second)."""
+    start, end = window
+    seconds = end - start + 1
+    parts = min(seconds, max(2, math.ceil(matched / (ROW_CAP * 0.8))))
+    bounds = [start + seconds * i // parts for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(parts)]
+
+
+def parse_results(results: list):
+    """(day, record) for the session records among Insights result rows."""
+    for row in results:
+        fields = {f["field"]: f["value"] for f in row}
+        logged_at = fields.get("@timestamp") or ""  # "YYYY-MM-DD HH:MM:SS.mmm"
+        record = parse_message(fields.get("@message"), logged_at.replace(" ", "T") or None)
+        if record is not None:
+            yield logged_at[:10], record
+
+
+def run_queries(logs, group_name: str, window: tuple, time_left_ms, emit) -> int:
+    """
+    Query `window`, splitting sub-windows that hit the row cap, and pass each
+    completed window's result rows to emit() in time order. Windows that
+    finish out of order are held until the ones before them are done. Returns
+    the last second covered without a gap, which is less than window[1] if the
+    deadline came first.
+    """
+    pending, running, held = [window], {}, {}
+    covered = window[0] - 1
+    delay = POLL_MIN_DELAY
+    while pending or running:
+        while pending and len(running) < MAX_CONCURRENT and time_left_ms() > DEADLINE_MARGIN_MS:
+            sub = pending.pop(0)
+            query_id = logs.start_query(
+                logGroupName=group_name, startTime=sub[0], endTime=sub[1],
+                queryString=QUERY, limit=ROW_CAP,
+            )["queryId"]
+            running[query_id] = sub
+        if not running:
+            break  # out of time with windows still pending
+
+        time.sleep(delay)
+        if time_left_ms() <= DEADLINE_MARGIN_MS:
+            break
+        finished = False
+        for query_id, sub in list(running.items()):
+            response = logs.get_query_results(queryId=query_id)
+            status = response["status"]
+            if status in ("Scheduled", "Running"):
+                continue
+            finished = True
+            del running[query_id]
+            if status != "Complete":
+                raise RuntimeError(f"Insights query {query_id} for {sub} ended {status}")
+            matched = int(response.get("statistics", {}).get("recordsMatched", 0))
+            rows = response["results"]
+            if (len(rows) >= ROW_CAP or matched > len(rows)) and sub[1] > sub[0]:
+                subs = split(sub, max(matched, len(rows)))
+                print(f"[log_export] {sub} matched {matched} rows – split into {len(subs)}")
+                pending = sorted(pending + subs)
+                continue
+            if len(rows) >= ROW_CAP:
+                print(f"[log_export] WARNING: second {sub[0]} alone exceeds {ROW_CAP} rows – truncated")
+            held[sub] = rows
+            while held and min(held)[0] == covered + 1:
+                done = min(held)
+                emit(held.pop(done))
+                covered = done[1]
+        delay = POLL_MIN_DELAY if finished else min(delay * 2, POLL_MAX_DELAY)
+
+    for query_id in running:  # abandoned at the deadline; rerun next time
+        try:
+            logs.stop_query(queryId=query_id)
+        except ClientError:
+            pass
+    return covered
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Export run
+# ──────────────────────────────────────────────────────────────────────────────
+def export(logs, s3, group_name: str, bucket: str, now: datetime, time_left_ms,
+           compression: str = "gzip") -> dict:
+    watermark, etag = read_checkpoint(s3, bucket)
+    if watermark is None:
+        # First run: start from midnight, as the old daily export did
+        watermark = int(datetime(now.year, now.month, now.day).timestamp()) - 1
+    start = watermark + 1
+    end = min(int(now.timestamp()) - INGEST_LAG_SECONDS, start + MAX_RUN_SECONDS - 1)
+    if end < start:
+        return {"success": True, "message": "No new window", "log_count": 0, "watermark": watermark}
+
+    # Rows go straight into the compressed part uploads – nothing accumulates per day
+    with SessionLogWriter(s3, bucket, f"export-{start}", compression) as writer:
+        def emit(rows):
+            for day, record in parse_results(rows):
+                writer.write(day, record)
+
+        covered = run_queries(logs, group_name, (start, end), time_left_ms, emit)
+        count = writer.close()["log_count"]
+
+    advanced = covered >= start and write_checkpoint(s3, bucket, covered, etag)
+    message = (f"Exported {count} records up to {datetime.utcfromtimestamp(covered).isoformat()}"
+               if advanced else "Watermark not advanced")
+    print(f"[log_export] {message}")
+    return {
+        "success": advanced,
+        "message": message,
+        "log_count": count,
+        "watermark": covered if advanced else watermark,
+    }
@@ -0,0 +1,73 @@
+"""
+Streaming path for session logs: a CloudWatch Logs subscription filter on
+chatResponseHandler's log group delivers each batch of matching events to
+sessionLogs, which writes them to S3 as they arrive. Nothing is read back
+out with Logs Insights.
+
+Subscription events arrive as {"awslogs": {"data": base64(gzip(JSON))}}; the
+decoded JSON carries logGroup, logStream, messageType and logEvents
+[{id, timestamp (epoch ms), message}]. CONTROL_MESSAGE batches are
+CloudWatch's own connectivity checks and carry no data.
+
+Each batch is written through ndjson_writer.SessionLogWriter. It becomes
+one compressed NDJSON part per day it touches, named
+stream-<first event id>, so a retried delivery overwrites rather than
+duplicates.
+"""
+
+import base64
+import gzip
+import json
+from datetime import datetime
+
+from ndjson_writer import SessionLogWriter
+
+REQUIRED_FIELDS = ("session_id", "query", "response")
+
+
+def parse_message(message: str, timestamp=None):
+    """Session record logged by chatResponseHandler (JSON, possibly after a prefix), else None."""
+    json_start = (message or "").find("{")
+    if json_start == -1:
+        return None
+    try:
+        record = json.loads(message[json_start:])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(record, dict) or not all(k in record for k in REQUIRED_FIELDS):
+        return None
+    if timestamp is not None:
+        record.setdefault("timestamp", timestamp)
+    return record
+
+
+def decode(event: dict) -> dict:
+    return json.loads(gzip.decompress(base64.b64decode(event["awslogs"]["data"])))
+
+
+def encode(batch: dict) -> dict:
+    """Inverse of decode – builds a Lambda event from a subscription batch (local replays)."""
+    return {"awslogs": {"data": base64.b64encode(gzip.compress(json.dumps(batch).encode("utf-8"))).decode("ascii")}}
+
+
+def records(batch: dict):
+    """(day, record) for the session records of one decoded batch."""
+    for log_event in batch.get("logEvents", []):
+        logged_at = datetime.utcfromtimestamp(log_event["timestamp"] / 1000)
+        record = parse_message(log_event.get("message"), logged_at.isoformat())
+        if record is not None:
+            yield logged_at.strftime("%Y-%m-%d"), record
+
+
+def ingest(event: dict, s3, bucket: str, compression: str = "gzip") -> dict:
+    """Write one subscription delivery to the day partitions. Returns {"log_count", "keys"}."""
+    batch = decode(event)
+    if batch.get("messageType") != "DATA_MESSAGE" or not batch.get("logEvents"):
+        return {"log_count": 0, "keys": []}
+
+    with SessionLogWriter(s3, bucket, f"stream-{batch['logEvents'][0]['id']}", compression) as writer:
+        for day, record in records(batch):
+            writer.write(day, record)
+        result = writer.close()
+    print(f"[log_stream] {batch.get('logStream')}: {len(batch['logEvents'])} events, {result['log_count']} session records")
+    return result
@@ -0,0 +1,231 @@
+"""
+Streaming writer for the session_logs/ day partitions.
+
+Records are written one JSON object per line (NDJSON) and compressed as
+they arrive: gzip by default, or zstd when pyarrow is available (the
+archive layer). Compressed output is held in a buffer of at most
+UPLOAD_CHUNK_BYTES. Each full buffer is sent as one part of an S3 multipart
+upload, so memory stays flat however heavy the day.
+
+After PART_RECORDS records the current object is completed and the next
+"part" object is started. Readers can then split a day across workers.
+An object smaller than one chunk is written with a single PutObject.
+
+Layout per day:
+  session_logs/YYYY-MM-DD/<writer name>-NNNN.ndjson.gz|.zst
+  session_logs/YYYY-MM-DD/_manifest/<writer name>-NNNN.json
+    {"day", "format": "ndjson", "key", "compression", "records", "bytes",
+     "first_ts", "last_ts", "written_at"}
+Several writers add to the same day: stream deliveries, backfills. Each
+completed part therefore gets its own manifest entry object, written once
+and never read back, so concurrent writers never contend for a shared file.
+A retried writer overwrites its own entries. A day's manifest is the
+listing of its _manifest/ prefix.
+"""
+
+import json
+import posixpath
+import zlib
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+try:
+    import pyarrow as pa
+except ImportError:  # zstd needs the pyarrow layer; gzip is always available
+    pa = None
+
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024  # S3 multipart parts must be >= 5 MiB (except the last)
+PART_RECORDS = 100000
+
+
+def manifest_prefix(day: str) -> str:
+    return f"session_logs/{day}/_manifest/"
+
+
+def manifest_entry_key(day: str, part_key: str) -> str:
+    name = posixpath.basename(part_key).split(".ndjson")[0]
+    return f"{manifest_prefix(day)}{name}.json"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Compression
+# ──────────────────────────────────────────────────────────────────────────────
+class _Gzip:
+    name, extension = "gzip", ".gz"
+
+    def __init__(self):
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 → gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class _Drain:
+    """File-like sink pyarrow's compressor writes into; emptied by the caller."""
+    closed = False
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def write(self, data):
+        self.buf += bytes(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self.buf = bytes(self.buf), bytearray()
+        return data
+
+
+class _Zstd:
+    name, extension = "zstd", ".zst"
+
+    def __init__(self):
+        self._drain = _Drain()
+        self._stream = pa.CompressedOutputStream(pa.PythonFile(self._drain, mode="w"), "zstd")
+
+    def compress(self, data: bytes) -> bytes:
+        self._stream.write(data)
+        return self._drain.take()
+
+    def finish(self) -> bytes:
+        self._stream.close()
+        return self._drain.take()
+
+
+def codec_for(compression: str):
+    if compression == "zstd" and pa is not None:
+        return _Zstd
+    if compression == "zstd":
+        print("[ndjson_writer] zstd needs pyarrow – writing gzip")
+    return _Gzip
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  One part object
+# ──────────────────────────────────────────────────────────────────────────────
+class _PartUpload:
+    def __init__(self, s3, bucket: str, key: str, codec):
+        self.s3, self.bucket, self.key = s3, bucket, key
+        self.codec = codec()
+        self.buf = bytearray()
+        self.upload_id, self.uploaded = None, []
+        self.records, self.bytes = 0, 0
+        self.first_ts = self.last_ts = None
+
+    def write(self, record: dict):
+        ts = record.get("timestamp")
+        if ts:
+            self.first_ts = min(self.first_ts or ts, ts)
+            self.last_ts = max(self.last_ts or ts, ts)
+        self.buf += self.codec.compress(json.dumps(record, default=str).encode("utf-8") + b"\n")
+        self.records += 1
+        if len(self.buf) >= UPLOAD_CHUNK_BYTES:
+            self._upload_chunk()
+
+    def _upload_chunk(self):
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType="application/x-ndjson",
+            )["UploadId"]
+        number = len(self.uploaded) + 1
+        etag = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=number, Body=bytes(self.buf),
+        )["ETag"]
+        self.uploaded.append({"PartNumber": number, "ETag": etag})
+        self.bytes += len(self.buf)
+        self.buf = bytearray()
+
+    def close(self) -> dict:
+        self.buf += self.codec.finish()
+        if self.upload_id is None:
+            self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buf),
+                               ContentType="application/x-ndjson")
+            self.bytes += len(self.buf)
+        else:
+            self._upload_chunk()
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.uploaded},
+            )
+        return {
+            "key": self.key, "compression": self.codec.name, "records": self.records,
+            "bytes": self.bytes, "first_ts": self.first_ts, "last_ts": self.last_ts,
+        }
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Day-partitioned writer
+# ──────────────────────────────────────────────────────────────────────────────
+class SessionLogWriter:
+    """
+    Route records to rolling part objects per day. Parts are named
+    "<name>-NNNN", so a writer rerun with the same name (a retried delivery)
+    overwrites its own objects. Use as a context manager: open uploads are
+    aborted if the block raises.
+    """
+
+    def __init__(self, s3, bucket: str, name: str, compression: str = "gzip"):
+        self.s3, self.bucket, self.name = s3, bucket, name
+        self.codec = codec_for(compression)
+        self.open = {}      # day -> _PartUpload being written
+        self.finished = {}  # day -> [manifest entries]
+
+    def write(self, day: str, record: dict):
+        part = self.open.get(day)
+        if part is None:
+            number = len(self.finished.get(day, []))
+            key = f"session_logs/{day}/{self.name}-{number:04d}.ndjson{self.codec.extension}"
+            part = self.open[day] = _PartUpload(self.s3, self.bucket, key, self.codec)
+        part.write(record)
+        if part.records >= PART_RECORDS:
+            self._finish(day)
+
+    def _finish(self, day: str):
+        entry = self.open.pop(day).close()
+        write_manifest_entry(self.s3, self.bucket, day, entry)
+        self.finished.setdefault(day, []).append(entry)
+
+    def close(self) -> dict:
+        """Complete every open part; each gets its manifest entry as it completes."""
+        for day in list(self.open):
+            self._finish(day)
+        keys = [e["key"] for entries in self.finished.values() for e in entries]
+        return {"log_count": sum(e["records"] for entries in self.finished.values() for e in entries), "keys": keys}
+
+    def abort(self):
+        for part in self.open.values():
+            try:
+                part.abort()
+            except ClientError as e:
+                print(f"[ndjson_writer] abort of {part.key} failed: {e}")
+        self.open = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        return False
+
+
+def write_manifest_entry(s3, bucket: str, day: str, entry: dict):
+    """Record one completed part under the day's _manifest/ prefix."""
+    body = {"day": day, "format": "ndjson", **entry, "written_at": datetime.utcnow().isoformat()}
+    s3.put_object(Bucket=bucket, Key=manifest_entry_key(day, entry["key"]), Body=json.dumps(body),
+                  ContentType="application/json")
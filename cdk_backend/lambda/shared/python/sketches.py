@@ -0,0 +1,103 @@
+"""
+Mergeable, fixed-size summaries for rollups and cached aggregates.
+
+HyperLogLog (distinct sessions)
+  2^HLL_PRECISION registers, ~2.3% standard error, merged by register-wise max.
+  Writers that can only ADD to a DynamoDB set store each batch's non-empty
+  registers as integer codes (register * 64 + rank); a register's value is the
+  largest rank among its codes, so set union is a valid merge. A stored set
+  grows by at most one code per register per batch that raises it.
+
+Satisfaction histogram
+  {score rounded to an integer 0-100: weight}. Weights are the inverse sampling
+  probability, matching the weighted mean; histograms merge by adding weights.
+
+Used by logclassifier and retrieveSessionLogs, which both get it from the
+shared Lambda layer (lambda/shared, on the path as /opt/python).
+"""
+
+import base64
+import hashlib
+import math
+
+HLL_PRECISION = 11
+HLL_REGISTERS = 1 << HLL_PRECISION
+_RANK_BITS = 64 - HLL_PRECISION
+
+
+def hll_code(value: str) -> int:
+    """register * 64 + rank for one observed value."""
+    h = int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+    register = h >> _RANK_BITS
+    rest = h & ((1 << _RANK_BITS) - 1)
+    rank = _RANK_BITS - rest.bit_length() + 1
+    return register * 64 + rank
+
+
+class HyperLogLog:
+    def __init__(self, registers: bytes = None):
+        self.registers = bytearray(registers) if registers else bytearray(HLL_REGISTERS)
+
+    def add(self, value: str):
+        self.add_code(hll_code(value))
+
+    def add_code(self, code: int):
+        register, rank = divmod(int(code), 64)
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def update_codes(self, codes):
+        for code in codes:
+            self.add_code(code)
+        return self
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self) -> int:
+        m = HLL_REGISTERS
+        raw = (0.7213 / (1 + 1.079 / m)) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))  # linear counting for small cardinalities
+        return round(raw)
+
+    def codes(self) -> set:
+        """Non-empty registers as codes – the compact set to ADD into a rollup."""
+        return {register * 64 + rank for register, rank in enumerate(self.registers) if rank}
+
+    def to_b64(self) -> str:
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    @classmethod
+    def from_b64(cls, data: str) -> "HyperLogLog":
+        return cls(base64.b64decode(data))
+
+
+def histogram_add(histogram: dict, score, weight: float = 1.0):
+    key = str(min(100, max(0, int(round(float(score))))))
+    histogram[key] = histogram.get(key, 0.0) + weight
+
+
+def histogram_merge(histogram: dict, other: dict):
+    for key, weight in other.items():
+        histogram[key] = histogram.get(key, 0.0) + float(weight)
+    return histogram
+
+
+def percentiles(histogram: dict, quantiles=(0.25, 0.5, 0.9)) -> dict:
+    """Weighted nearest-rank percentiles, e.g. {"p25": 60, "p50": 75, "p90": 90}; {} when empty."""
+    bins = sorted((int(key), float(weight)) for key, weight in histogram.items() if float(weight) > 0)
+    total = sum(weight for _, weight in bins)
+    if not total:
+        return {}
+    result = {}
+    for q in quantiles:
+        cumulative = 0.0
+        for score, weight in bins:
+            cumulative += weight
+            if cumulative >= q * total - 1e-9:
+                break
+        result[f"p{round(q * 100)}"] = score
+    return result
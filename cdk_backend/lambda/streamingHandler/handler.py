@@ -6,10 +6,12 @@ from datetime import datetime
 # Initialize AWS clients
 bedrock_agent = boto3.client('bedrock-agent-runtime', region_name='us-west-2')
 lambda_client = boto3.client('lambda')
+sqs = boto3.client('sqs')
 
 agent_id = os.environ["AGENT_ID"]
 agent_alias_id = os.environ["AGENT_ALIAS_ID"]
 LOG_CLASSIFIER_FN_NAME = os.environ['LOG_CLASSIFIER_FN_NAME']
+ANALYTICS_QUEUE_URL = os.environ.get('ANALYTICS_QUEUE_URL')
 
 def get_role_specific_instructions(user_role):
     """
@@ -174,19 +176,23 @@ def stream_bedrock_response(response, session_id, query, user_role):
         })
         yield f"data: {final_data}\n\n"
 
-        # Log the interaction asynchronously
+        # Log the interaction asynchronously (queued for batch classification when configured)
         try:
-            lambda_client.invoke(
-                FunctionName=LOG_CLASSIFIER_FN_NAME,
-                InvocationType='Event',
-                Payload=json.dumps({
-                    'querytext': query,
-                    'responsetext': full_response,
-                    'session_id': session_id,
-                    'user_role': user_role,
-                    'timestamp': datetime.now().isoformat()
-                })
-            )
+            analytics_payload = json.dumps({
+                'querytext': query,
+                'responsetext': full_response,
+                'session_id': session_id,
+                'user_role': user_role,
+                'timestamp': datetime.now().isoformat()
+            })
+            if ANALYTICS_QUEUE_URL:
+                sqs.send_message(QueueUrl=ANALYTICS_QUEUE_URL, MessageBody=analytics_payload)
+            else:
+                lambda_client.invoke(
+                    FunctionName=LOG_CLASSIFIER_FN_NAME,
+                    InvocationType='Event',
+                    Payload=analytics_payload
+                )
         except Exception as log_error:
             print(f"⚠️ Logging error: {str(log_error)}")
 
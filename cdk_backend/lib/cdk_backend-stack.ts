@@ -21,6 +21,11 @@ import * as events   from 'aws-cdk-lib/aws-events';
 import * as targets  from 'aws-cdk-lib/aws-events-targets';
 import { Topic } from '@cdklabs/generative-ai-cdk-constructs/lib/cdk-lib/bedrock/guardrails/guardrail-filters';
 import * as s3n from 'aws-cdk-lib/aws-s3-notifications';
+import * as sqs from 'aws-cdk-lib/aws-sqs';
+import * as lambdaEventSources from 'aws-cdk-lib/aws-lambda-event-sources';
+import * as logs from 'aws-cdk-lib/aws-logs';
+import * as logsDestinations from 'aws-cdk-lib/aws-logs-destinations';
+import * as cloudwatch from 'aws-cdk-lib/aws-cloudwatch';
 
 export class LearningNavigatorStack extends cdk.Stack {
   constructor(scope: Construct, id: string, props?: cdk.StackProps) {
@@ -30,6 +35,10 @@ export class LearningNavigatorStack extends cdk.Stack {
     const githubOwner = this.node.tryGetContext('githubOwner');
     const githubRepo = this.node.tryGetContext('githubRepo');
     const adminEmail = this.node.tryGetContext('adminEmail');
+    // Optional Lambda layer providing pyarrow; enables the Parquet archive. pyarrow is too large to
+    // bundle with the function code, so use e.g. the public AWS SDK for pandas layer:
+    //   arn:aws:lambda:<region>:336392948345:layer:AWSSDKPandas-Python312:<version>
+    const pyarrowLayerArn = this.node.tryGetContext('pyarrowLayerArn');
 
     // Validate required parameters (githubToken is optional for public repos)
     if (!githubOwner || !githubRepo || !adminEmail) {
@@ -123,6 +132,21 @@ export class LearningNavigatorStack extends cdk.Stack {
         removalPolicy: cdk.RemovalPolicy.DESTROY,  //for production have retain
       });
 
+      // Timeframe reads query (day, shard) partitions instead of scanning all history.
+      // Shard count is shared by the writer (logclassifier) and reader (retrieveSessionLogs).
+      const dayIndexName = 'DayBucketIndex';
+      const dayBucketShards = '4';
+      sessionLogsTable.addGlobalSecondaryIndex({
+        indexName: dayIndexName,
+        partitionKey: { name: 'day_bucket', type: dynamodb.AttributeType.STRING },
+        sortKey:      { name: 'original_ts', type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.INCLUDE,
+        nonKeyAttributes: [
+          'query', 'response', 'location', 'category', 'category_source',
+          'sentiment', 'satisfaction_score', 'sample_rate', 'user_role',
+        ],
+      });
+
       // Table for escalated queries (admin email notifications)
       const escalatedQueriesTable = new dynamodb.Table(this, 'EscalatedQueriesTable', {
         tableName: 'NCMWEscalatedQueries',
@@ -304,18 +328,90 @@ export class LearningNavigatorStack extends cdk.Stack {
       autoDeploy: true,
     });
 
+    // Memo cache of LLM question classifications, keyed by normalised-question hash
+    const classificationCacheTable = new dynamodb.Table(this, 'ClassificationCacheTable', {
+      tableName: 'NCMWClassificationCache',
+      partitionKey: { name: 'question_hash', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: 'expires_at',
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // Hour/day dashboard counters ("H#YYYY-MM-DDTHH" / "D#YYYY-MM-DD"), ADDed to at ingest
+    const analyticsRollupTable = new dynamodb.Table(this, 'AnalyticsRollupTable', {
+      tableName: 'NCMWAnalyticsRollups',
+      partitionKey: { name: 'bucket', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // Permanent per-day analytics aggregates ("<version>#YYYY-MM-DD") for finalized days
+    const analyticsDayCacheTable = new dynamodb.Table(this, 'AnalyticsDayCacheTable', {
+      tableName: 'NCMWAnalyticsDayCache',
+      partitionKey: { name: 'bucket', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // Answers are queued and classified in batches instead of one logclassifier invoke per message
+    const analyticsDeadLetterQueue = new sqs.Queue(this, 'AnalyticsIngestDLQ', {
+      retentionPeriod: cdk.Duration.days(14),
+      enforceSSL: true,
+    });
+
+    const analyticsQueue = new sqs.Queue(this, 'AnalyticsIngestQueue', {
+      // Must exceed the consumer timeout so in-flight batches are not redelivered
+      visibilityTimeout: cdk.Duration.minutes(12),
+      enforceSSL: true,
+      deadLetterQueue: { queue: analyticsDeadLetterQueue, maxReceiveCount: 3 },
+    });
+
+    // Python modules used by more than one function (sketches.py), on the path as /opt/python
+    const sharedPythonLayer = new lambda.LayerVersion(this, 'SharedPythonLayer', {
+      code: lambda.Code.fromAsset('lambda/shared'),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_12],
+      description: 'Python modules shared by logclassifier and retrieveSessionLogs',
+    });
+
     const logclassifier = new lambda.Function(this, 'logclassifier', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/logclassifier'),  
-      timeout: cdk.Duration.seconds(30),
+      timeout: cdk.Duration.minutes(2),
+      layers: [sharedPythonLayer],
       environment: {  
         BUCKET:     dashboardLogsBucket.bucketName,
         DYNAMODB_TABLE: sessionLogsTable.tableName,
+        CLASSIFY_BATCH_SIZE: '10',
+        // Local classifier artifact produced by lambda/logclassifier/train_classifier.py
+        CLASSIFIER_MODEL_KEY: 'models/category_model.json',
+        CLASSIFICATION_CACHE_TABLE: classificationCacheTable.tableName,
+        CLASSIFICATION_CACHE_TTL_DAYS: '30',
+        // Share of conversations sent for Bedrock sentiment scoring (escalations always are)
+        SENTIMENT_BASE_RATE: '0.25',
+        SENTIMENT_MIN_RATE: '0.02',
+        SENTIMENT_BACKLOG_TARGET: '500',
+        ANALYTICS_QUEUE_URL: analyticsQueue.queueUrl,
+        ROLLUP_TABLE: analyticsRollupTable.tableName,
+        DAY_BUCKET_SHARDS: dayBucketShards,
+        // Read only by the rebuild_rollups reconciliation action
+        FEEDBACK_TABLE: 'NCMWResponseFeedback',
       },
     });
 
+    logclassifier.addEventSource(new lambdaEventSources.SqsEventSource(analyticsQueue, {
+      batchSize: 50,
+      maxBatchingWindow: cdk.Duration.seconds(20),
+      reportBatchItemFailures: true,
+    }));
+
     sessionLogsTable.grantReadWriteData(logclassifier)
+    classificationCacheTable.grantReadWriteData(logclassifier);
+    analyticsRollupTable.grantReadWriteData(logclassifier);
+    logclassifier.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['dynamodb:Scan'],
+      resources: [`arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback`],
+    }));
     dashboardLogsBucket.grantRead(logclassifier);  
     logclassifier.role?.addManagedPolicy(
       cdk.aws_iam.ManagedPolicy.fromAwsManagedPolicyName('AmazonBedrockFullAccess'),
@@ -330,13 +426,15 @@ export class LearningNavigatorStack extends cdk.Stack {
         WS_API_ENDPOINT: webSocketStage.callbackUrl,
         AGENT_ID: agent.agentId,
         AGENT_ALIAS_ID: AgentAlias.aliasId,
-        LOG_CLASSIFIER_FN_NAME: logclassifier.functionName
+        LOG_CLASSIFIER_FN_NAME: logclassifier.functionName,
+        ANALYTICS_QUEUE_URL: analyticsQueue.queueUrl,
       },
       timeout: cdk.Duration.seconds(120),
     });
 
     knowledgeBaseDataBucket.grantRead(chatResponseHandler);
     logclassifier.grantInvoke(chatResponseHandler);
+    analyticsQueue.grantSendMessages(chatResponseHandler);
 
     chatResponseHandler.role?.addManagedPolicy(
       cdk.aws_iam.ManagedPolicy.fromAwsManagedPolicyName('AmazonBedrockFullAccess'),
@@ -376,8 +474,6 @@ export class LearningNavigatorStack extends cdk.Stack {
       environment: {
         SOURCE_BUCKET_NAME: emailBucket.bucketName,
         DESTINATION_BUCKET_NAME: knowledgeBaseDataBucket.bucketName,
-        KNOWLEDGE_BASE_ID: kb.knowledgeBaseId,
-        DATA_SOURCE_ID: knowledgeBaseDataSource.dataSourceId,
         ADMIN_EMAIL: adminEmail,
       },
     })
@@ -540,11 +636,14 @@ export class LearningNavigatorStack extends cdk.Stack {
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/adminFile'),  
       memorySize: 1024,
-      timeout: cdk.Duration.seconds(30),
+      // API calls are still cut off by API Gateway at 29s; the long timeout is for
+      // archive imports, which run from the staging bucket's S3 event
+      timeout: cdk.Duration.minutes(15),
       environment: {
         BUCKET_NAME:         knowledgeBaseDataBucket.bucketName,
-        KNOWLEDGE_BASE_ID:   kb.knowledgeBaseId,
-        DATA_SOURCE_ID:      knowledgeBaseDataSource.dataSourceId,
+        // Upload sessions send the bytes straight to S3; this only caps document size
+        MAX_UPLOAD_MB:       '100',
+        MAX_ARCHIVE_MB:      '2048',
       }
     });
 
@@ -553,18 +652,94 @@ export class LearningNavigatorStack extends cdk.Stack {
       cdk.aws_iam.ManagedPolicy.fromAwsManagedPolicyName('AmazonBedrockFullAccess'),
     );
 
+    // Bulk archive uploads land here, outside the knowledge base data source, and are
+    // expanded into the KB bucket by the file API (adminFile/bulk_operations.py)
+    const bulkStagingBucket = new s3.Bucket(this, 'BulkStagingBucket', {
+      enforceSSL: true,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      autoDeleteObjects: true,
+      cors: [{
+        allowedMethods: [s3.HttpMethods.PUT],
+        allowedOrigins: ['*'],
+        allowedHeaders: ['*'],
+        exposedHeaders: ['ETag'],
+        maxAge: 3000,
+      }],
+      lifecycleRules: [{
+        abortIncompleteMultipartUploadAfter: cdk.Duration.days(1),
+        expiration: cdk.Duration.days(2),
+      }],
+    });
+    bulkStagingBucket.grantReadWrite(fileHandler);
+    bulkStagingBucket.addEventNotification(
+      s3.EventType.OBJECT_CREATED,
+      new s3n.LambdaDestination(fileHandler),
+      { prefix: 'archives/' },
+    );
+
+    // Archive import progress, polled by Manage Documents
+    const bulkJobsTable = new dynamodb.Table(this, 'BulkJobsTable', {
+      tableName: 'NCMWBulkJobs',
+      partitionKey: { name: 'job_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: 'expires_at',
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+    bulkJobsTable.grantReadWriteData(fileHandler);
+    fileHandler.addEnvironment('STAGING_BUCKET_NAME', bulkStagingBucket.bucketName);
+    fileHandler.addEnvironment('BULK_JOBS_TABLE', bulkJobsTable.tableName);
+    // Further archives of one S3 event, and imports cut short by the timeout, continue in a new
+    // asynchronous invocation of this function (matched by name – its own ARN would be a cycle)
+    fileHandler.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['lambda:InvokeFunction'],
+      resources: [`arn:aws:lambda:${this.region}:${this.account}:function:*FileApiHandler*`],
+    }));
+
     // ──────────────────────────────────────────────────────────────────────────────
     // Knowledge Base Auto-Sync Lambda
     // Automatically syncs KB when documents are added/deleted from S3
     // ──────────────────────────────────────────────────────────────────────────────
+    // Ingestion scheduler state (idle / dirty / running), one item per data source
+    const kbIngestionStateTable = new dynamodb.Table(this, 'KbIngestionStateTable', {
+      tableName: 'NCMWKbIngestionState',
+      partitionKey: { name: 'data_source_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // SHA-256 per KB object key; S3 events that leave the digest unchanged are not indexed
+    const kbContentManifestTable = new dynamodb.Table(this, 'KbContentManifestTable', {
+      tableName: 'NCMWKbContentManifest',
+      partitionKey: { name: 'object_key', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+    // Sparse: only current objects carry listing = "live". Admin file listing
+    // pages through it in name order (adminFile/file_index.py)
+    kbContentManifestTable.addGlobalSecondaryIndex({
+      indexName: 'ListingIndex',
+      partitionKey: { name: 'listing', type: dynamodb.AttributeType.STRING },
+      sortKey: { name: 'object_key', type: dynamodb.AttributeType.STRING },
+      projectionType: dynamodb.ProjectionType.INCLUDE,
+      nonKeyAttributes: ['size', 'last_modified'],
+    });
+
     const kbSyncLambda = new lambda.Function(this, 'KBSyncFunction', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/kb-sync'),
       timeout: cdk.Duration.minutes(5),
+      // Reconcile streams several objects through SHA-256 at once
+      memorySize: 512,
       environment: {
         KNOWLEDGE_BASE_ID: kb.knowledgeBaseId,
         DATA_SOURCE_ID: knowledgeBaseDataSource.dataSourceId,
+        INGESTION_STATE_TABLE: kbIngestionStateTable.tableName,
+        CONTENT_MANIFEST_TABLE: kbContentManifestTable.tableName,
+        KB_BUCKET_NAME: knowledgeBaseDataBucket.bucketName,
+        // A burst of uploads becomes one job once it has been quiet this long (at most 10 min late)
+        INGESTION_DEBOUNCE_SECONDS: '60',
+        INGESTION_MAX_DELAY_SECONDS: '600',
         // Optional: Add SNS topic ARN for admin notifications if needed
         // ADMIN_NOTIFICATION_TOPIC_ARN: adminNotificationTopic.topicArn,
       },
@@ -612,6 +787,89 @@ export class LearningNavigatorStack extends cdk.Stack {
       sourceArn: `arn:aws:s3:::national-council-s3-pdfs`,
     });
 
+    kbIngestionStateTable.grantReadWriteData(kbSyncLambda);
+    kbContentManifestTable.grantReadWriteData(kbSyncLambda);
+    // Hashing objects whose upload carried no checksum, and listing for reconcile
+    knowledgeBaseDataBucket.grantRead(kbSyncLambda);
+
+    // Upload skips content identical to what the manifest already holds; the
+    // file listing is served from the manifest's ListingIndex
+    fileHandler.addEnvironment('CONTENT_MANIFEST_TABLE', kbContentManifestTable.tableName);
+    kbContentManifestTable.grantReadData(fileHandler);
+
+    // Fill the manifest (and so the listing) from the bucket once, without re-indexing;
+    // S3 events keep it current from then on
+    new AwsCustomResource(this, 'KbContentManifestBackfill', {
+      onCreate: {
+        service: 'Lambda',
+        action: 'invoke',
+        parameters: {
+          FunctionName: kbSyncLambda.functionName,
+          InvocationType: 'Event',
+          Payload: JSON.stringify({ action: 'reconcile', request_sync: false }),
+        },
+        physicalResourceId: PhysicalResourceId.of('kb-content-manifest-backfill-v1'),
+      },
+      policy: AwsCustomResourcePolicy.fromStatements([
+        new iam.PolicyStatement({
+          actions: ['lambda:InvokeFunction'],
+          resources: [kbSyncLambda.functionArn],
+        }),
+      ]),
+    });
+
+    // Starts debounced jobs and follows up finished ones
+    const kbSyncTickRule = new events.Rule(this, 'KbIngestionTick', {
+      description: 'Advance the knowledge base ingestion scheduler every minute',
+      schedule: events.Schedule.rate(cdk.Duration.minutes(1)),
+    });
+    kbSyncTickRule.addTarget(new targets.LambdaFunction(kbSyncLambda, {
+      event: events.RuleTargetInput.fromObject({ action: 'tick' }),
+    }));
+
+    // Finished jobs are reported as a "Knowledge Base Sync Completed" event on the
+    // default bus and as NCMW/KnowledgeBase metrics (job_monitor.py)
+    events.EventBus.grantAllPutEvents(kbSyncLambda);
+
+    const kbSyncMetric = (metricName: string) => new cloudwatch.Metric({
+      namespace: 'NCMW/KnowledgeBase',
+      metricName,
+      dimensionsMap: { DataSourceId: knowledgeBaseDataSource.dataSourceId },
+      statistic: cloudwatch.Stats.MAXIMUM,
+      period: cdk.Duration.minutes(5),
+    });
+
+    new cloudwatch.Alarm(this, 'KbSyncFailedAlarm', {
+      alarmDescription: 'A knowledge base ingestion job failed or could not index some documents',
+      metric: kbSyncMetric('SyncFailed'),
+      threshold: 1,
+      evaluationPeriods: 1,
+      comparisonOperator: cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+      treatMissingData: cloudwatch.TreatMissingData.NOT_BREACHING,
+    });
+
+    new cloudwatch.Alarm(this, 'KbSyncSlowAlarm', {
+      alarmDescription: 'A knowledge base ingestion job took longer than 15 minutes',
+      metric: kbSyncMetric('SyncDurationSeconds'),
+      threshold: 900,
+      evaluationPeriods: 1,
+      comparisonOperator: cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+      treatMissingData: cloudwatch.TreatMissingData.NOT_BREACHING,
+    });
+
+    new cloudwatch.Alarm(this, 'KbIndexLagAlarm', {
+      alarmDescription: 'A document change took more than 30 minutes to become searchable',
+      metric: kbSyncMetric('IndexLagSeconds'),
+      threshold: 1800,
+      evaluationPeriods: 1,
+      comparisonOperator: cloudwatch.ComparisonOperator.GREATER_THAN_OR_EQUAL_TO_THRESHOLD,
+      treatMissingData: cloudwatch.TreatMissingData.NOT_BREACHING,
+    });
+
+    // Manual "sync now" and bulk-operation holds from the admin file API go through the same scheduler
+    fileHandler.addEnvironment('KB_SYNC_FUNCTION_NAME', kbSyncLambda.functionName);
+    kbSyncLambda.grantInvoke(fileHandler);
+
 
     const AdminApi = new apigateway.RestApi(this, 'admin_api', {
       restApiName: 'AdminApi',
@@ -658,6 +916,29 @@ export class LearningNavigatorStack extends cdk.Stack {
       authorizationType: apigateway.AuthorizationType.COGNITO,
     });
 
+    // Direct-to-S3 multipart upload sessions: open, complete, abort
+    const uploads = AdminApi.root.addResource('uploads');
+    [uploads, uploads.addResource('complete'), uploads.addResource('abort')].forEach(resource => {
+      resource.addMethod('POST', integ, {
+        authorizer: userPoolAuthorizer,
+        authorizationType: apigateway.AuthorizationType.COGNITO,
+      });
+    });
+
+    // Bulk operations: archive upload sessions, import status, batch delete
+    const bulk = AdminApi.root.addResource('bulk');
+    const archives = bulk.addResource('archives');
+    [archives, archives.addResource('complete'), archives.addResource('abort'), bulk.addResource('delete')].forEach(resource => {
+      resource.addMethod('POST', integ, {
+        authorizer: userPoolAuthorizer,
+        authorizationType: apigateway.AuthorizationType.COGNITO,
+      });
+    });
+    bulk.addResource('jobs').addResource('{jobId}').addMethod('GET', integ, {
+      authorizer: userPoolAuthorizer,
+      authorizationType: apigateway.AuthorizationType.COGNITO,
+    });
+
     // Add presigned-url endpoint for secure PDF access
     const presignedUrl = AdminApi.root.addResource('presigned-url');
     presignedUrl.addMethod('POST', integ, {
@@ -667,15 +948,29 @@ export class LearningNavigatorStack extends cdk.Stack {
 
     const logGroupNameChatResponseHandler = `/aws/lambda/${chatResponseHandler.functionName}`;
 
+    // Date-partitioned Parquet archive of closed days, for long-range reporting
+    const archiveUri = `s3://${dashboardLogsBucket.bucketName}/archive/conversations`;
+    const pyarrowLayers = pyarrowLayerArn
+      ? [lambda.LayerVersion.fromLayerVersionArn(this, 'PyarrowLayer', pyarrowLayerArn)]
+      : [];
+
     const sessionLogsFn = new lambda.Function(this, 'SessionLogsHandler', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code: lambda.Code.fromAsset('lambda/sessionLogs'),
-      timeout: cdk.Duration.seconds(30),
+      // Room for split Insights queries on a catch-up run; the watermark only covers completed windows
+      timeout: cdk.Duration.minutes(5),
+      memorySize: 512,
+      layers: pyarrowLayers,
       environment: {
         GROUP_NAME: logGroupNameChatResponseHandler,
         BUCKET:     dashboardLogsBucket.bucketName,
         DYNAMODB_TABLE: sessionLogsTable.tableName,
+        ARCHIVE_URI: archiveUri,
+        DAY_INDEX_NAME: dayIndexName,
+        DAY_BUCKET_SHARDS: dayBucketShards,
+        // Raw session logs are NDJSON parts; "zstd" needs the pyarrow layer
+        LOG_COMPRESSION: 'gzip',
       },
     });
 
@@ -683,44 +978,71 @@ export class LearningNavigatorStack extends cdk.Stack {
       actions: [
         'logs:StartQuery',
         'logs:GetQueryResults',
+        'logs:StopQuery',
       ],
       resources: [`arn:aws:logs:${this.region}:${this.account}:log-group:${logGroupNameChatResponseHandler}:*`],
     }));
 
-    dashboardLogsBucket.grantPut(sessionLogsFn);
+    dashboardLogsBucket.grantReadWrite(sessionLogsFn);
     sessionLogsTable.grantReadWriteData(sessionLogsFn);
 
-    const dailyRule = new events.Rule(this, 'DailySessionLogsScheduler', {
-      description: 'Trigger session-logs Lambda every night at 8:20 PM UTC',
-      schedule: events.Schedule.cron({
-        minute: '59',
-        hour:   '23',
-        day:    '*',    // every day of month
-        month:  '*',    // every month
-        year:   '*',    // every year
-      }),
+    // Stream each conversation's JSON log line to S3 as it is written
+    // (the Insights export, action "store_logs", remains for manual backfills)
+    chatResponseHandler.logGroup.addSubscriptionFilter('SessionLogsSubscription', {
+      destination: new logsDestinations.LambdaDestination(sessionLogsFn),
+      filterPattern: logs.FilterPattern.all(
+        logs.FilterPattern.exists('$.session_id'),
+        logs.FilterPattern.exists('$.query'),
+        logs.FilterPattern.exists('$.response'),
+      ),
     });
 
-    dailyRule.addTarget(new targets.LambdaFunction(sessionLogsFn));
+    // Compact yesterday into the Parquet archive once its last items have landed
+    const archiveRule = new events.Rule(this, 'DailyArchiveCompaction', {
+      description: 'Export the previous day to the Parquet conversation archive at 01:30 UTC',
+      schedule: events.Schedule.cron({ minute: '30', hour: '1' }),
+    });
+    archiveRule.addTarget(new targets.LambdaFunction(sessionLogsFn, {
+      event: events.RuleTargetInput.fromObject({ action: 'compact_archive' }),
+    }));
 
     const retrieveSessionLogsFn = new lambda.Function(this, 'RetrieveSessionLogsFn', {
       runtime: lambda.Runtime.PYTHON_3_12,
       handler: 'handler.lambda_handler',
       code:    lambda.Code.fromAsset('lambda/retrieveSessionLogs'),
-      timeout: cdk.Duration.seconds(10),
+      // Ad-hoc ranges fall back to a parallel segmented scan; stay under API Gateway's 29s limit
+      timeout: cdk.Duration.seconds(28),
+      memorySize: 512,
+      layers: [...pyarrowLayers, sharedPythonLayer],
       environment: {
         DYNAMODB_TABLE: sessionLogsTable.tableName,
         FEEDBACK_TABLE: 'NCMWResponseFeedback',
+        FEEDBACK_SESSION_INDEX: 'SessionIndex',
+        ROLLUP_TABLE: analyticsRollupTable.tableName,
+        DAY_INDEX_NAME: dayIndexName,
+        DAY_BUCKET_SHARDS: dayBucketShards,
+        DAY_CACHE_TABLE: analyticsDayCacheTable.tableName,
+        DAY_CACHE_GRACE_HOURS: '24',
+        ARCHIVE_URI: archiveUri,
+        // Per-request cap on raw reads; responses are flagged "truncated" when it is hit
+        READ_RCU_BUDGET: '25000',
       },
     });
 
     // Allow it to read from the sessions table and feedback table
     sessionLogsTable.grantReadData(retrieveSessionLogsFn);
+    analyticsRollupTable.grantReadData(retrieveSessionLogsFn);
+    analyticsDayCacheTable.grantReadWriteData(retrieveSessionLogsFn);
+    dashboardLogsBucket.grantRead(retrieveSessionLogsFn, 'archive/*');
 
     // Grant permission to read from feedback table
+    // (Query on its session_id index – see scripts/add-feedback-session-index.sh)
     retrieveSessionLogsFn.addToRolePolicy(new iam.PolicyStatement({
-      actions: ['dynamodb:Scan', 'dynamodb:Query', 'dynamodb:GetItem'],
-      resources: [`arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback`],
+      actions: ['dynamodb:Scan', 'dynamodb:Query', 'dynamodb:GetItem', 'dynamodb:DescribeTable'],
+      resources: [
+        `arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback`,
+        `arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback/index/*`,
+      ],
     }));
 
     // 2) Hook it into API Gateway
@@ -739,6 +1061,57 @@ export class LearningNavigatorStack extends cdk.Stack {
       authorizationType: apigateway.AuthorizationType.COGNITO,
     });
 
+    // Cursor-paginated conversation summaries (full text via /session-logs/{sessionId})
+    const conversationsResource = sessionLogs.addResource('conversations');
+    conversationsResource.addMethod('GET', statsIntegration, {
+      authorizer:        userPoolAuthorizer,
+      authorizationType: apigateway.AuthorizationType.COGNITO,
+    });
+
+    // Volume / category / sentiment series for dashboard charts, from the rollups
+    const trendsResource = sessionLogs.addResource('trends');
+    trendsResource.addMethod('GET', statsIntegration, {
+      authorizer:        userPoolAuthorizer,
+      authorizationType: apigateway.AuthorizationType.COGNITO,
+    });
+
+    // ──────────────────────────────────────────────────────────────────────────────
+    // Response Feedback API (thumbs up/down on chatbot answers)
+    // ──────────────────────────────────────────────────────────────────────────────
+    // NCMWResponseFeedback itself predates the stack and is referenced by name
+    const responseFeedbackFn = new lambda.Function(this, 'ResponseFeedbackFn', {
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'handler.lambda_handler',
+      code:    lambda.Code.fromAsset('lambda/feedback', { exclude: ['function.zip'] }),
+      timeout: cdk.Duration.seconds(10),
+      environment: {
+        FEEDBACK_TABLE: 'NCMWResponseFeedback',
+        // feedback:<positive|negative> counters read by the dashboard and trends
+        ROLLUP_TABLE: analyticsRollupTable.tableName,
+        // Thumbs-down answers are queued for a sentiment re-score
+        ANALYTICS_QUEUE_URL: analyticsQueue.queueUrl,
+      },
+    });
+
+    analyticsRollupTable.grantWriteData(responseFeedbackFn);
+    analyticsQueue.grantSendMessages(responseFeedbackFn);
+    responseFeedbackFn.addToRolePolicy(new iam.PolicyStatement({
+      actions: ['dynamodb:PutItem', 'dynamodb:DeleteItem', 'dynamodb:Query', 'dynamodb:Scan'],
+      resources: [`arn:aws:dynamodb:${this.region}:${this.account}:table/NCMWResponseFeedback`],
+    }));
+
+    const feedbackResource = AdminApi.root.addResource('feedback');
+    const feedbackIntegration = new apigateway.LambdaIntegration(responseFeedbackFn, { proxy: true });
+
+    // POST /feedback - Rate an answer (chat users are anonymous)
+    feedbackResource.addMethod('POST', feedbackIntegration);
+
+    // GET /feedback - Feedback statistics for the admin dashboard
+    feedbackResource.addMethod('GET', feedbackIntegration, {
+      authorizer:        userPoolAuthorizer,
+      authorizationType: apigateway.AuthorizationType.COGNITO,
+    });
+
     // ──────────────────────────────────────────────────────────────────────────────
     // Escalated Queries API (Admin email notifications management)
     // ──────────────────────────────────────────────────────────────────────────────
@@ -758,7 +1131,7 @@ export class LearningNavigatorStack extends cdk.Stack {
     // Update status function
     const updateQueryStatusFn = new lambda.Function(this, 'UpdateQueryStatusFn', {
       runtime: lambda.Runtime.PYTHON_3_12,
-      handler: 'handler.update_query_status',
+      handler: 'handler.lambda_handler',
       code:    lambda.Code.fromAsset('lambda/escalatedQueries'),
       timeout: cdk.Duration.seconds(10),
       environment: {
@@ -793,6 +1166,58 @@ export class LearningNavigatorStack extends cdk.Stack {
       authorizationType: apigateway.AuthorizationType.COGNITO,
     });
 
+    // ──────────────────────────────────────────────────────────────────────────────
+    // Live admin dashboard (analytics deltas pushed over the WebSocket API)
+    // ──────────────────────────────────────────────────────────────────────────────
+    // Producers drop small events here; adminLive drains them at most once per
+    // second and pushes one coalesced delta to each subscribed dashboard
+    const adminEventsQueue = new sqs.Queue(this, 'AdminLiveQueue', {
+      retentionPeriod: cdk.Duration.hours(1),  // stale deltas are useless
+      enforceSSL: true,
+    });
+
+    // Dashboard connections authorised by subscribeAdmin; rows expire with the connection
+    const adminSubscriptionsTable = new dynamodb.Table(this, 'AdminSubscriptionsTable', {
+      tableName: 'NCMWAdminSubscriptions',
+      partitionKey: { name: 'connection_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: 'expires_at',
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    const adminLiveFn = new lambda.Function(this, 'AdminLiveFn', {
+      runtime: lambda.Runtime.PYTHON_3_12,
+      handler: 'handler.lambda_handler',
+      code:    lambda.Code.fromAsset('lambda/adminLive'),
+      timeout: cdk.Duration.seconds(30),
+      environment: {
+        SUBSCRIPTIONS_TABLE: adminSubscriptionsTable.tableName,
+        WS_CALLBACK_URL: webSocketStage.callbackUrl,
+        USER_POOL_ID: userPool.userPoolId,
+        USER_POOL_CLIENT_ID: userPoolClient.userPoolClientId,
+      },
+    });
+
+    adminLiveFn.addEventSource(new lambdaEventSources.SqsEventSource(adminEventsQueue, {
+      batchSize: 100,
+      maxBatchingWindow: cdk.Duration.seconds(1),
+      maxConcurrency: 2,
+      reportBatchItemFailures: true,
+    }));
+    adminSubscriptionsTable.grantReadWriteData(adminLiveFn);
+    webSocketStage.grantManagementApiAccess(adminLiveFn);
+
+    const adminLiveIntegration = new apigatewayv2_integrations.WebSocketLambdaIntegration('admin-live-integration', adminLiveFn);
+    webSocketApi.addRoute('subscribeAdmin', { integration: adminLiveIntegration, returnResponse: true });
+    webSocketApi.addRoute('unsubscribeAdmin', { integration: adminLiveIntegration });
+    webSocketApi.addRoute('$disconnect', { integration: adminLiveIntegration });
+
+    // Producers: new conversations, feedback, escalations and status changes
+    for (const producer of [logclassifier, responseFeedbackFn, notificationFn, updateQueryStatusFn]) {
+      producer.addEnvironment('ADMIN_EVENTS_QUEUE_URL', adminEventsQueue.queueUrl);
+      adminEventsQueue.grantSendMessages(producer);
+    }
+
     // ──────────────────────────────────────────────────────────────────────────────
     // User Profile & Personalized Recommendations
     // ──────────────────────────────────────────────────────────────────────────────
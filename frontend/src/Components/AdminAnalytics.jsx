@@ -62,7 +62,7 @@ export default function AdminAnalytics() {
       try {
         const token = await getIdToken();
         const { data } = await axios.get(ANALYTICS_API, {
-          params: { timeframe },
+          params: { timeframe, include_conversations: false },
           headers: { Authorization: `Bearer ${token}` },
         });
 
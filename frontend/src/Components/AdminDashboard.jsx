@@ -35,8 +35,8 @@ import {
   Tooltip
 } from "recharts";
 import axios from "axios";
-import { DOCUMENTS_API } from "../utilities/constants";
-import { getIdToken, logout } from "../utilities/auth";
+import { DOCUMENTS_API, WEBSOCKET_API } from "../utilities/constants";
+import { getIdToken, getAccessToken, logout } from "../utilities/auth";
 import MHFALogo from "../Assets/mhfa_logo.png";
 import AccessibleColors from "../utilities/accessibleColors";
 
@@ -71,45 +71,98 @@ function AdminDashboard() {
     }
   }, [location]);
 
+  // Live updates: new conversations and feedback arrive as deltas over the
+  // WebSocket API, so the dashboard stays current without re-fetching
+  useEffect(() => {
+    let socket;
+    let reconnectTimer;
+    let closed = false;
+
+    const connect = () => {
+      socket = new WebSocket(WEBSOCKET_API);
+      socket.onopen = async () => {
+        try {
+          const token = await getAccessToken();
+          socket.send(JSON.stringify({ action: 'subscribeAdmin', token }));
+        } catch (err) {
+          console.error("Live updates unavailable:", err);
+        }
+      };
+      socket.onmessage = (event) => {
+        let delta;
+        try {
+          delta = JSON.parse(event.data);
+        } catch {
+          return;
+        }
+        if (delta.type === 'analytics_delta') applyDelta(delta);
+      };
+      socket.onclose = () => {
+        if (!closed) reconnectTimer = setTimeout(connect, 5000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      socket?.close();
+    };
+  }, []);
+
+  // New conversations start neutral; feedback counts are net changes (a switched
+  // rating is -1 on one side and +1 on the other), the remainder moves through neutral
+  const applyDelta = (delta) => {
+    const positive = delta.feedback?.positive || 0;
+    const negative = delta.feedback?.negative || 0;
+    setAnalytics(prev => ({
+      ...prev,
+      total_queries: prev.total_queries + (delta.messages || 0),
+      sentiment: {
+        positive: Math.max(0, (prev.sentiment.positive || 0) + positive),
+        negative: Math.max(0, (prev.sentiment.negative || 0) + negative),
+        neutral: Math.max(0, (prev.sentiment.neutral || 0) + (delta.messages || 0) - positive - negative),
+      },
+      conversations: [...(delta.conversations || []), ...prev.conversations].slice(0, 50),
+    }));
+  };
+
   const fetchAnalytics = async () => {
     try {
       setLoading(true);
       const token = await getIdToken();
 
-      // Fetch data for the last 7 days
-      const promises = [];
+      // Last 7 days as one daily series (one request, served from the rollups)
+      const end = new Date();
+      const start = new Date();
+      start.setDate(start.getDate() - 6);
 
-      for (let i = 6; i >= 0; i--) {
-        const date = new Date();
-        date.setDate(date.getDate() - i);
-        const dateStr = date.toISOString().split('T')[0];
-
-        promises.push(
-          axios.get(ANALYTICS_API, {
-            params: {
-              timeframe: 'custom',
-              start_date: dateStr,
-              end_date: dateStr
-            },
-            headers: { Authorization: `Bearer ${token}` },
-          }).then(response => ({
-            date: date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
-            queries: response.data.user_count || 0,
-            rawData: response.data
-          })).catch(() => ({
-            date: date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
-            queries: 0,
-            rawData: null
-          }))
-        );
-      }
+      const { data: trend } = await axios.get(`${ANALYTICS_API}/trends`, {
+        params: {
+          timeframe: 'custom',
+          start_date: start.toISOString().split('T')[0],
+          end_date: end.toISOString().split('T')[0],
+          interval: 'day',
+        },
+        headers: { Authorization: `Bearer ${token}` },
+      }).catch(err => {
+        // A missing trend should not block the metric cards
+        console.error("Failed to fetch usage trends:", err);
+        return { data: { points: [] } };
+      });
 
-      const results = await Promise.all(promises);
+      const results = (trend.points || []).map(point => ({
+        // Noon UTC keeps the label on the same calendar day in any US timezone
+        date: new Date(`${point.period}T12:00:00Z`).toLocaleDateString('en-US', { month: 'short', day: 'numeric' }),
+        queries: point.users || 0,
+        rawData: point
+      }));
       setUsageTrends(results);
 
       // Fetch today's data for the metric cards
       const { data } = await axios.get(ANALYTICS_API, {
-        params: { timeframe: 'today' },
+        // Latest 50 conversation summaries feed the top-questions and recent lists
+        params: { timeframe: 'today', include_conversations: true },
         headers: { Authorization: `Bearer ${token}` },
       });
 
@@ -843,7 +896,7 @@ function AdminDashboard() {
                         Total Interactions
                       </Typography>
                       <Typography variant="h3" sx={{ fontWeight: 700, color: '#111827' }}>
-                        {analytics.conversations.length}
+                        {analytics.total_queries}
                       </Typography>
                     </Card>
                   </Grid>
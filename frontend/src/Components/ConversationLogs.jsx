@@ -55,39 +55,90 @@ function ConversationLogs() {
   const [timeframe, setTimeframe] = useState("today");
   const [sentimentFilter, setSentimentFilter] = useState("all");
   const [conversations, setConversations] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
   const [selectedConv, setSelectedConv] = useState(null);
+  const [detailLoading, setDetailLoading] = useState(false);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [sentiment, setSentiment] = useState({});
 
   useEffect(() => {
-    fetchConversations();
+    fetchSentimentTotals();
   }, [timeframe]);
 
-  const fetchConversations = async () => {
+  useEffect(() => {
+    fetchConversations();
+  }, [timeframe, sentimentFilter]);
+
+  // Totals for the summary cards come from the aggregate endpoint (no conversation text)
+  const fetchSentimentTotals = async () => {
     try {
-      setLoading(true);
-      setError("");
       const token = await getIdToken();
       const { data } = await axios.get(ANALYTICS_API, {
-        params: { timeframe },
+        params: { timeframe, include_conversations: false },
         headers: { Authorization: `Bearer ${token}` },
       });
-
-      setConversations(data.conversations || []);
       setSentiment(data.sentiment || {});
+    } catch (err) {
+      console.error("Failed to fetch sentiment totals:", err);
+    }
+  };
+
+  // Conversation summaries are paged server-side; pass the returned cursor to continue
+  const fetchConversations = async (cursor = null) => {
+    try {
+      cursor ? setLoadingMore(true) : setLoading(true);
+      setError("");
+      const token = await getIdToken();
+      const params = { timeframe, limit: 25 };
+      if (sentimentFilter !== "all") params.sentiment = sentimentFilter;
+      if (cursor) params.cursor = cursor;
+
+      const { data } = await axios.get(`${ANALYTICS_API}/conversations`, {
+        params,
+        headers: { Authorization: `Bearer ${token}` },
+      });
+
+      const page = data.conversations || [];
+      setConversations(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(data.next_cursor || null);
     } catch (err) {
       console.error("Failed to fetch conversations:", err);
       setError("Failed to load conversation logs. Please try again.");
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
-  const handleViewDetails = (conv) => {
+  // The list only carries previews; load the full question and answer on demand
+  const handleViewDetails = async (conv) => {
     setSelectedConv(conv);
     setDialogOpen(true);
+    if (!conv.key) return;
+    try {
+      setDetailLoading(true);
+      const token = await getIdToken();
+      const { data } = await axios.get(
+        `${ANALYTICS_API}/${encodeURIComponent(conv.key.session_id)}`,
+        {
+          params: { timestamp: conv.key.timestamp },
+          headers: { Authorization: `Bearer ${token}` },
+        }
+      );
+      const full = (data.messages || [])[0];
+      if (full) {
+        setSelectedConv(current =>
+          current === conv ? { ...conv, query: full.query, response: full.response } : current
+        );
+      }
+    } catch (err) {
+      console.error("Failed to fetch conversation details:", err);
+    } finally {
+      setDetailLoading(false);
+    }
   };
 
   const handleCloseDialog = () => {
@@ -121,12 +172,8 @@ function ConversationLogs() {
     return sentimentIcons[normalized] || sentimentIcons.neutral;
   };
 
-  // Filter conversations by sentiment
-  const filteredConversations = sentimentFilter === "all"
-    ? conversations
-    : conversations.filter(conv =>
-        normalizeSentiment(conv.sentiment) === sentimentFilter.toLowerCase()
-      );
+  // Sentiment filtering happens server-side
+  const filteredConversations = conversations;
 
   return (
     <Box sx={{ minHeight: "100vh" }}>
@@ -229,8 +276,9 @@ function ConversationLogs() {
             variant="body2"
             sx={{ mb: 2, color: AccessibleColors.text.secondary, fontWeight: 500 }}
           >
-            Showing {filteredConversations.length} of {conversations.length} conversations
+            Showing {conversations.length} conversations
             {sentimentFilter !== "all" && ` (${sentimentFilter} only)`}
+            {nextCursor && " – more available"}
           </Typography>
         )}
 
@@ -263,7 +311,7 @@ function ConversationLogs() {
               </TableHead>
               <TableBody>
                 {filteredConversations.map((conv, idx) => (
-                  <TableRow key={idx} hover>
+                  <TableRow key={conv.key ? `${conv.key.session_id}|${conv.key.timestamp}` : idx} hover>
                     <TableCell>{formatTimestamp(conv.timestamp)}</TableCell>
                     <TableCell>
                       <Typography variant="caption" sx={{ fontFamily: "monospace" }}>
@@ -319,6 +367,19 @@ function ConversationLogs() {
             </Table>
           </TableContainer>
         )}
+
+        {!loading && nextCursor && (
+          <Box sx={{ display: "flex", justifyContent: "center", mt: 3 }}>
+            <Button
+              variant="outlined"
+              onClick={() => fetchConversations(nextCursor)}
+              disabled={loadingMore}
+              sx={{ color: "#064F80", borderColor: "#064F80" }}
+            >
+              {loadingMore ? <CircularProgress size={20} /> : "Load more"}
+            </Button>
+          </Box>
+        )}
       </Box>
 
       {/* Conversation Detail Dialog */}
@@ -357,6 +418,12 @@ function ConversationLogs() {
                 sx={{ mb: 2, backgroundColor: "#7FD3EE", color: "white" }}
               />
 
+              {detailLoading && (
+                <Box sx={{ display: "flex", justifyContent: "center", py: 1 }}>
+                  <CircularProgress size={24} />
+                </Box>
+              )}
+
               <Typography variant="subtitle2" color="text.secondary" sx={{ mt: 2 }}>
                 User Question
               </Typography>
@@ -15,12 +15,14 @@ import {
   Paper,
   Button,
   CircularProgress,
+  TableSortLabel,
 } from "@mui/material";
 import RefreshIcon   from "@mui/icons-material/Refresh";
 import FileUploadIcon from "@mui/icons-material/FileUpload";
 import CloseIcon     from "@mui/icons-material/Close";
 import FolderIcon    from "@mui/icons-material/Folder";
 import DeleteIcon    from "@mui/icons-material/Delete";
+import ArrowUpwardIcon from "@mui/icons-material/ArrowUpward";
 import { styled }    from "@mui/system";
 import AdminAppHeader from "./AdminAppHeader";
 import { DOCUMENTS_API } from "../utilities/constants";
@@ -57,6 +59,17 @@ const modalStyle = {
   alignItems: "center",
 };
 
+// Parts sent to S3 at once during an upload
+const UPLOAD_CONCURRENCY = 4;
+// WebCrypto hashes a file only as one buffer; larger files skip the "unchanged"
+// pre-check and are uploaded (the KB content manifest still drops identical content)
+const MAX_DIGEST_BYTES = 32 * 1024 * 1024;
+// Archives are expanded into the current folder server-side (POST /bulk/archives)
+const ARCHIVE_PATTERN = /\.(zip|tar|tgz|tar\.gz)$/i;
+const IMPORT_POLL_MS = 3000;
+// An import gets one invocation plus three resumes of 15 minutes each
+const IMPORT_TIMEOUT_MS = 65 * 60 * 1000;
+
 const formatSize = (bytes) => {
   if (bytes == null) return "--";
   const mb = bytes / (1024 * 1024);
@@ -82,14 +95,28 @@ export default function ManageDocuments() {
   const [searchTerm, setSearchTerm]     = useState("");
   const [loading, setLoading]           = useState(false);
   const [error, setError]               = useState("");
+  // Listing is paged and sorted server-side; folders are browsed one level at a time
+  const [folder, setFolder]             = useState("");
+  const [folders, setFolders]           = useState([]);
+  const [sort, setSort]                 = useState({ field: "name", order: "asc" });
+  const [nextCursor, setNextCursor]     = useState(null);
+  const [uploadProgress, setUploadProgress] = useState(null);
+  const [importStatus, setImportStatus] = useState("");
 
   // 1) List
-  const fetchDocuments = async () => {
+  const fetchDocuments = async (cursor = null) => {
     setLoading(true);
     setError("");
     try {
       const token = await getIdToken();
-      const res = await fetch(`${DOCUMENTS_API}files`, {
+      const params = new URLSearchParams({
+        folder,
+        sort:  sort.field,
+        order: sort.order,
+        limit: "100",
+        ...(cursor ? { cursor } : {}),
+      });
+      const res = await fetch(`${DOCUMENTS_API}files?${params}`, {
         method: "GET",
         headers: {
           "Content-Type":  "application/json",
@@ -99,7 +126,7 @@ export default function ManageDocuments() {
 
       if (!res.ok) throw new Error(`List failed: ${res.status}`);
       const data = await res.json();
-      // data.files is an array of filenames
+      // data.files: one page of {key, size, last_modified}; data.folders: subfolders on it
       const parsed = (data.files || []).map((doc) => ({
         name: doc.key,
         type: doc.key.split(".").pop().toUpperCase(),
@@ -109,7 +136,9 @@ export default function ManageDocuments() {
         deleteEndpoint: `${DOCUMENTS_API}files/${encodeURIComponent(doc.key)}`,
       }));
 
-      setDocuments(parsed);
+      setDocuments(prev => (cursor ? [...prev, ...parsed] : parsed));
+      setFolders(prev => (cursor ? [...prev, ...(data.folders || [])] : (data.folders || [])));
+      setNextCursor(data.next_cursor || null);
     } catch (err) {
       console.error(err);
       setError(err.message);
@@ -118,17 +147,14 @@ export default function ManageDocuments() {
     }
   };
 
-  // 2) Delete
+  // 2) Delete – the selection goes in one batch request, so it is re-indexed once
   const handleDeleteFiles = async () => {
     setLoading(true);
     setError("");
     try {
-      const token = await getIdToken();
-      for (const doc of documents.filter(d => selectedFiles.includes(d.name))) {
-        await fetch(doc.deleteEndpoint, {
-          method: "DELETE",
-          headers: { Authorization: `Bearer ${token}` },
-        });
+      const result = await postJson("bulk/delete", { keys: selectedFiles });
+      if (result.errors?.length) {
+        setError(`${result.errors.length} file(s) could not be deleted: ${result.errors.map(e => e.key).join(", ")}`);
       }
       // refresh
       await fetchDocuments();
@@ -168,80 +194,151 @@ export default function ManageDocuments() {
     }
   };
 
-  // 3) Upload
-  const handleFileUpload = (e) => {
+  // 3) Upload – parts go straight to S3 through presigned URLs (POST /uploads)
+  const postJson = async (path, body) => {
+    const token = await getIdToken();
+    const res = await fetch(`${DOCUMENTS_API}${path}`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Authorization:   `Bearer ${token}`,
+      },
+      body: JSON.stringify(body),
+    });
+    if (!res.ok) {
+      const errorText = await res.text();
+      throw new Error(`Request failed: ${res.status} - ${errorText}`);
+    }
+    return res.json();
+  };
+
+  // PUTs the file's parts to the session's presigned URLs; returns their ETags
+  const uploadParts = async (file, session) => {
+    const etags = [];
+    let done = 0;
+    const queue = [...session.parts];
+    const worker = async () => {
+      while (queue.length) {
+        const { part_number, url } = queue.shift();
+        const start = (part_number - 1) * session.part_size;
+        const res = await fetch(url, { method: "PUT", body: file.slice(start, start + session.part_size) });
+        if (!res.ok) throw new Error(`Upload of part ${part_number} failed: ${res.status}`);
+        etags.push({ part_number, etag: res.headers.get("ETag") });
+        done += 1;
+        setUploadProgress(Math.round((done / session.parts.length) * 100));
+      }
+    };
+    await Promise.all(Array.from({ length: UPLOAD_CONCURRENCY }, worker));
+    return etags;
+  };
+
+  // Archive import runs after the upload; poll its job until it is done
+  const waitForImport = async (jobId) => {
+    const token = await getIdToken();
+    const deadline = Date.now() + IMPORT_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      await new Promise(resolve => setTimeout(resolve, IMPORT_POLL_MS));
+      const res = await fetch(`${DOCUMENTS_API}bulk/jobs/${jobId}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error(`Import status failed: ${res.status}`);
+      const job = await res.json();
+      const counts = job.counts || {};
+      setImportStatus(`Importing… ${counts.uploaded || 0} added, ${counts.unchanged || 0} unchanged, ${counts.skipped || 0} skipped`);
+      if (job.status === "failed") throw new Error(job.error || "Import failed");
+      if (job.status === "done") return job;
+    }
+    throw new Error("Import is taking too long – check the document list later");
+  };
+
+  const handleArchiveUpload = async (file) => {
+    let session = null;
+    try {
+      session = await postJson("bulk/archives", { filename: file.name, size: file.size, folder });
+      const parts = await uploadParts(file, session);
+      await postJson("bulk/archives/complete", { job_id: session.job_id, upload_id: session.upload_id, parts });
+      setUploadProgress(null);
+      const job = await waitForImport(session.job_id);
+      if (job.counts?.skipped || job.counts?.failed || !job.complete) {
+        const notes = [...(job.skipped || []), ...(job.errors || [])].map(e => `${e.key || "archive"}: ${e.reason}`);
+        setError(`Imported with problems – ${notes.slice(0, 5).join("; ")}`);
+      }
+    } catch (err) {
+      if (session?.upload_id) {
+        postJson("bulk/archives/abort", { job_id: session.job_id, upload_id: session.upload_id }).catch(console.error);
+      }
+      throw err;
+    }
+  };
+
+  const sha256Hex = async (file) => {
+    if (!window.crypto?.subtle || file.size > MAX_DIGEST_BYTES) return undefined;
+    const digest = await window.crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, "0")).join("");
+  };
+
+  const handleFileUpload = async (e) => {
     const file = e.target.files[0];
     if (!file) return;
-    const reader = new FileReader();
-    reader.onloadend = async () => {
-      setLoading(true);
-      setError("");
-      try {
-        const token = await getIdToken();
-        const base64 = reader.result.split(",")[1];
-        const res = await fetch(`${DOCUMENTS_API}files`, {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            Authorization:   `Bearer ${token}`,
-          },
-          body: JSON.stringify({
-            filename:     file.name,
-            content_type: file.type,
-            content:      base64,
-          }),
-        });
-
-        if (!res.ok) {
-          const errorText = await res.text();
-          throw new Error(`Upload failed: ${res.status} - ${errorText}`);
-        }
+    setLoading(true);
+    setError("");
+    setUploadProgress(0);
+    let session = null;
+    try {
+      if (ARCHIVE_PATTERN.test(file.name)) {
+        await handleArchiveUpload(file);
         setUploadModalOpen(false);
         await fetchDocuments();
-      } catch (err) {
-        console.error(err);
-        setError(err.message);
-      } finally {
-        setLoading(false);
+        return;
       }
-    };
-    reader.readAsDataURL(file);
+      session = await postJson("uploads", {
+        filename:     `${folder}${file.name}`,
+        content_type: file.type,
+        size:         file.size,
+        sha256:       await sha256Hex(file),
+      });
+
+      if (!session.unchanged) {
+        const etags = await uploadParts(file, session);
+        await postJson("uploads/complete", { key: session.key, upload_id: session.upload_id, parts: etags });
+      }
+
+      setUploadModalOpen(false);
+      await fetchDocuments();
+    } catch (err) {
+      console.error(err);
+      setError(err.message);
+      if (session?.upload_id) {
+        postJson("uploads/abort", { key: session.key, upload_id: session.upload_id }).catch(console.error);
+      }
+    } finally {
+      setLoading(false);
+      setUploadProgress(null);
+      setImportStatus("");
+      e.target.value = "";
+    }
   };
 
-  // 4) Download
+  // 4) Download – the API hands out a short-lived S3 URL; the browser fetches the file itself
   const handleDownloadFile = async (url, fileName) => {
     setError("");
     try {
       const token  = await getIdToken();
-      const res    = await fetch(url, {
+      const res    = await fetch(`${url}?redirect=false`, {
         method:  "GET",
         headers: { Authorization: `Bearer ${token}` },
       });
   
       if (!res.ok) throw new Error("Download failed");
+      const { url: downloadUrl } = await res.json();
   
-      // The Lambda returns a plain text body that is BASE-64 of the bytes
-      const b64Data = await res.text();
-  
-      // Convert base64 → Uint8Array → Blob
-      const byteString = atob(b64Data.trim());
-      const byteArray  = new Uint8Array(byteString.length);
-      for (let i = 0; i < byteString.length; i++) {
-        byteArray[i] = byteString.charCodeAt(i);
-      }
-      // Use the Content-Type the Lambda sent back (falls back to octet-stream)
-      const contentType = res.headers.get("Content-Type") || "application/octet-stream";
-      const blob = new Blob([byteArray], { type: contentType });
-  
-      // Create a blob URL and download
-      const blobUrl = URL.createObjectURL(blob);
+      // The presigned URL carries Content-Disposition: attachment, so this saves the file
       const link    = document.createElement("a");
-      link.href     = blobUrl;
+      link.href     = downloadUrl;
       link.download = fileName;
       document.body.appendChild(link);
       link.click();
       link.remove();
-      URL.revokeObjectURL(blobUrl);
     } catch (err) {
       console.error(err);
       setError(err.message);
@@ -250,7 +347,26 @@ export default function ManageDocuments() {
 
   useEffect(() => {
     fetchDocuments();
-  }, []);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [folder, sort]);
+
+  const handleSort = (field) =>
+    setSort(prev => ({
+      field,
+      order: prev.field === field && prev.order === "asc" ? "desc" : "asc",
+    }));
+
+  const parentFolder = folder.split("/").slice(0, -2).map(p => `${p}/`).join("");
+
+  const sortHeader = (field, label) => (
+    <TableSortLabel
+      active={sort.field === field}
+      direction={sort.field === field ? sort.order : "asc"}
+      onClick={() => handleSort(field)}
+    >
+      {label}
+    </TableSortLabel>
+  );
 
   // Checkbox toggle
   const handleCheckboxChange = (name) =>
@@ -271,7 +387,7 @@ export default function ManageDocuments() {
           onChange={e => setSearchTerm(e.target.value)}
           sx={{ flex: 1 }}
         />
-        <IconButton onClick={fetchDocuments} disabled={loading}>
+        <IconButton onClick={() => fetchDocuments()} disabled={loading}>
           <RefreshIcon />
         </IconButton>
         <IconButton onClick={() => setUploadModalOpen(true)}>
@@ -299,14 +415,38 @@ export default function ManageDocuments() {
           <Table>
             <TableHead>
               <TableRow>
-                <TableCell>Name</TableCell>
+                <TableCell>{sortHeader("name", "Name")}</TableCell>
                 <TableCell>Type</TableCell>
-                <TableCell>Last Modified</TableCell>
-                <TableCell>Size</TableCell>
+                <TableCell>{sortHeader("last_modified", "Last Modified")}</TableCell>
+                <TableCell>{sortHeader("size", "Size")}</TableCell>
                 <TableCell>Action</TableCell>
               </TableRow>
             </TableHead>
             <TableBody>
+              {folder && (
+                <TableRow hover sx={{ cursor: "pointer" }} onClick={() => setFolder(parentFolder)}>
+                  <TableCell colSpan={5}>
+                    <FolderIconContainer>
+                      <ArrowUpwardIcon />
+                      {folder}
+                    </FolderIconContainer>
+                  </TableCell>
+                </TableRow>
+              )}
+              {folders
+                .filter(f => f.toLowerCase().includes(searchTerm.toLowerCase()))
+                .map((f) => (
+                  <TableRow key={f} hover sx={{ cursor: "pointer" }} onClick={() => setFolder(f)}>
+                    <TableCell colSpan={5}>
+                      <FolderIconContainer>
+                        <FolderBackground>
+                          <FolderIcon sx={{ color: "white" }} />
+                        </FolderBackground>
+                        {f.slice(folder.length)}
+                      </FolderIconContainer>
+                    </TableCell>
+                  </TableRow>
+                ))}
               {documents
                 .filter(d => d.name.toLowerCase().includes(searchTerm.toLowerCase()))
                 .map((doc) => (
@@ -320,7 +460,7 @@ export default function ManageDocuments() {
                         <FolderBackground>
                           <FolderIcon sx={{ color: "white" }} />
                         </FolderBackground>
-                        {doc.name}
+                        {doc.name.slice(folder.length)}
                       </FolderIconContainer>
                     </TableCell>
                     <TableCell>{doc.type}</TableCell>
@@ -358,6 +498,13 @@ export default function ManageDocuments() {
             </TableBody>
           </Table>
         )}
+        {nextCursor && (
+          <Box textAlign="center" my={2}>
+            <Button variant="outlined" onClick={() => fetchDocuments(nextCursor)} disabled={loading}>
+              Load more
+            </Button>
+          </Box>
+        )}
       </Container>
 
       {/* Upload Modal */}
@@ -380,8 +527,17 @@ export default function ManageDocuments() {
             }}
           >
             Select File
-            <input type="file" hidden onChange={handleFileUpload} />
+            <input type="file" hidden onChange={handleFileUpload} disabled={loading} />
           </Button>
+          <Typography variant="body2" mt={1}>
+            A .zip or .tar.gz archive is unpacked into the current folder.
+          </Typography>
+          {uploadProgress !== null && (
+            <Typography mt={2}>Uploading… {uploadProgress}%</Typography>
+          )}
+          {importStatus && (
+            <Typography mt={2}>{importStatus}</Typography>
+          )}
         </Paper>
       </Modal>
     </>
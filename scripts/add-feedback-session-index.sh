@@ -0,0 +1,63 @@
+#!/bin/bash
+
+# Add the session_id GSI to the feedback table
+# NCMWResponseFeedback is created outside the CDK stack, so its index is added here.
+# retrieveSessionLogs queries it (FEEDBACK_SESSION_INDEX) to fetch only the feedback
+# for sessions in the requested window; until it is ACTIVE it falls back to a scan.
+
+set -e
+
+TABLE_NAME="${FEEDBACK_TABLE:-NCMWResponseFeedback}"
+INDEX_NAME="${FEEDBACK_SESSION_INDEX:-SessionIndex}"
+
+# Colors for output
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+if ! command -v aws &> /dev/null; then
+    echo -e "${RED}ERROR: AWS CLI is not installed${NC}"
+    exit 1
+fi
+
+if aws dynamodb describe-table --table-name "$TABLE_NAME" \
+    --query "Table.GlobalSecondaryIndexes[?IndexName=='$INDEX_NAME'].IndexName" \
+    --output text | grep -q "$INDEX_NAME"; then
+    echo -e "${GREEN}✓${NC} $INDEX_NAME already exists on $TABLE_NAME"
+    exit 0
+fi
+
+BILLING_MODE=$(aws dynamodb describe-table --table-name "$TABLE_NAME" \
+    --query "Table.BillingModeSummary.BillingMode" --output text)
+
+INDEX_SPEC='{
+  "IndexName": "'"$INDEX_NAME"'",
+  "KeySchema": [
+    {"AttributeName": "session_id", "KeyType": "HASH"},
+    {"AttributeName": "timestamp", "KeyType": "RANGE"}
+  ],
+  "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["feedback", "message_preview"]}'
+if [ "$BILLING_MODE" != "PAY_PER_REQUEST" ]; then
+    INDEX_SPEC="$INDEX_SPEC"', "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}'
+fi
+INDEX_SPEC="$INDEX_SPEC}"
+
+echo -e "${YELLOW}Creating $INDEX_NAME on $TABLE_NAME...${NC}"
+aws dynamodb update-table \
+    --table-name "$TABLE_NAME" \
+    --attribute-definitions \
+        AttributeName=session_id,AttributeType=S \
+        AttributeName=timestamp,AttributeType=S \
+    --global-secondary-index-updates "[{\"Create\": $INDEX_SPEC}]" > /dev/null
+
+echo "Waiting for the index to backfill (this can take a while on large tables)..."
+while true; do
+    STATUS=$(aws dynamodb describe-table --table-name "$TABLE_NAME" \
+        --query "Table.GlobalSecondaryIndexes[?IndexName=='$INDEX_NAME'].IndexStatus" --output text)
+    [ "$STATUS" == "ACTIVE" ] && break
+    echo "  status: $STATUS"
+    sleep 15
+done
+
+echo -e "${GREEN}✓${NC} $INDEX_NAME is ACTIVE"
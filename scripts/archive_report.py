@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Run archive reports locally against a directory (or s3:// URI) in the layout
+written by sessionLogs/archive.py. Needs pyarrow (pip install pyarrow).
+
+  --generate N   first write N synthetic conversations per day for the range
+                 into the archive directory, so everything runs offline
+
+Prints the aggregate the dashboard would show for the range, using the same
+per-day partials retrieveSessionLogs merges, plus how much was read.
+
+Usage:
+  python scripts/archive_report.py --archive /tmp/archive --start 2025-01-01 --end 2025-03-31 --generate 200
+  python scripts/archive_report.py --archive /tmp/archive --start 2025-01-01 --end 2025-03-31 --category Certification
+  python scripts/archive_report.py --archive s3://my-logs-bucket/archive/conversations --start 2025-01-01 --end 2025-12-31
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "cdk_backend", "lambda", "retrieveSessionLogs"))
+sys.path.insert(0, os.path.join(HERE, "..", "cdk_backend", "lambda", "shared", "python"))
+import aggregation  # noqa: E402
+import archive_report  # noqa: E402
+
+CATEGORIES = ["Course Registration", "Certification", "Training Materials", "Technical Support", "Other"]
+LOCATIONS = ["Maryland", "Virginia", "Texas", "California", "New York", ""]
+ROLES = ["instructor", "staff", "learner"]
+
+
+def generate(uri, days, per_day, seed=7):
+    sys.path.insert(0, os.path.join(HERE, "..", "cdk_backend", "lambda", "sessionLogs"))
+    import archive  # noqa: E402 – the writer the nightly job uses
+
+    rng = random.Random(seed)
+    for day in days:
+        items = []
+        for n in range(per_day):
+            ts = f"{day}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{n:06d}"
+            sampled = rng.random() < 0.25
+            items.append({
+                "session_id": f"session-{rng.randrange(per_day * 2):06d}",
+                "timestamp": f"{ts}#{n:08x}",
+                "original_ts": ts,
+                "query": f"synthetic question {n}",
+                "response": f"synthetic answer {n} " * 20,
+                "location": rng.choice(LOCATIONS),
+                "category": rng.choice(CATEGORIES),
+                "user_role": rng.choice(ROLES),
+                "sample_rate": 0.25,
+                "satisfaction_score": rng.randint(20, 100) if sampled else None,
+            })
+        archive.write_day(uri, day, sorted(items, key=lambda it: it["original_ts"]))
+    print(f"Wrote {per_day} items/day for {len(days)} days to {uri}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate the Parquet conversation archive")
+    parser.add_argument("--archive", required=True, help="Archive directory or s3:// URI")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--category")
+    parser.add_argument("--role")
+    parser.add_argument("--location")
+    parser.add_argument("--generate", type=int, metavar="N", help="Write N synthetic items per day first")
+    args = parser.parse_args()
+
+    if not archive_report.available():
+        sys.exit("pyarrow is not installed")
+
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    days = [f"{start + timedelta(days=d):%Y-%m-%d}" for d in range((end - start).days + 1)]
+    if args.generate:
+        generate(args.archive, days, args.generate)
+
+    filters = {k: v for k, v in (("category", args.category), ("role", args.role), ("location", args.location)) if v}
+    started = time.perf_counter()
+    archived = sorted(set(days) & archive_report.archived_days(args.archive))
+    partials = archive_report.day_partials(args.archive, archived, start.isoformat(), end.isoformat(), filters)
+    total = aggregation.StreamingAggregate(top_k=0)
+    for partial in partials.values():
+        total.merge_partial(partial)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(archived)} of {len(days)} days archived; filters: {filters or 'none'}")
+    print(json.dumps(total.summary(), indent=2))
+    print(f"Aggregated in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Memory and latency of the retrieveSessionLogs aggregation over synthetic items.
+
+  materialize  the previous approach: keep every item and a conversation entry
+               per item, sort them all, return the latest 50
+  streaming    aggregation.StreamingAggregate: one pass, running counters,
+               HyperLogLog / histogram sketches and a top-k heap
+
+Items are generated lazily, so the streaming numbers show the aggregation's own
+footprint. Peak memory is measured with tracemalloc in a separate pass from the
+timing, because tracing slows allocation-heavy code down.
+
+Usage:
+  python scripts/benchmark_aggregation.py                 # 1,000,000 items
+  python scripts/benchmark_aggregation.py --items 200000 --skip-materialize
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "cdk_backend", "lambda", "retrieveSessionLogs"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "cdk_backend", "lambda", "shared", "python"))
+import aggregation  # noqa: E402
+
+CATEGORIES = ["Course Registration", "Certification", "Training Materials", "Technical Support", "Other"]
+LOCATIONS = ["Maryland", "Virginia", "Texas", "California", "New York", ""]
+WORDS = ("mental health first aid course instructor certification training session "
+         "renew login portal materials manual schedule cancel register fee group").split()
+
+
+def synthetic_items(count, seed=11):
+    """Yield items shaped like the projected session-log rows, ~1.3 KB of text each."""
+    rng = random.Random(seed)
+    days = [f"{datetime(2025, 7, 1) + timedelta(days=d):%Y-%m-%d}" for d in range(365)]
+    rate = Decimal("0.25")
+    queries = [" ".join(rng.choice(WORDS) for _ in range(15)) for _ in range(200)]
+    responses = [" ".join(rng.choice(WORDS) for _ in range(150)) for _ in range(200)]
+    sessions = max(1, count // 4)
+    for n in range(count):
+        sampled = rng.random() < 0.25
+        # Fresh strings per item, as a DynamoDB page would deliver them
+        yield {
+            "session_id": f"session-{rng.randrange(sessions):08d}",
+            "original_ts": f"{rng.choice(days)}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{n % 1000000:06d}",
+            "query": f"{rng.choice(queries)} #{n}",
+            "response": f"{rng.choice(responses)} #{n}",
+            "location": rng.choice(LOCATIONS),
+            "category": rng.choice(CATEGORIES),
+            "sample_rate": rate,
+            "satisfaction_score": Decimal(rng.randint(20, 100)) if sampled else None,
+        }
+
+
+def materialize(items, top_k=50):
+    items = list(items)
+    sessions, locations, categories = set(), defaultdict(int), defaultdict(int)
+    weighted, weights, conversations = 0.0, 0.0, []
+    for it in items:
+        sessions.add(it["session_id"])
+        if it.get("location"):
+            locations[it["location"]] += 1
+        categories[it["category"]] += 1
+        score = it.get("satisfaction_score")
+        if score is not None:
+            weight = 1.0 / float(it.get("sample_rate") or 1)
+            weighted += float(score) * weight
+            weights += weight
+        conversations.append({
+            "session_id": it["session_id"], "timestamp": it["original_ts"],
+            "query": it["query"], "response": it["response"], "category": it["category"],
+            "sentiment": "neutral", "satisfaction_score": float(score) if score is not None else None,
+        })
+    conversations.sort(key=lambda c: c["timestamp"], reverse=True)
+    return len(sessions), conversations[:top_k]
+
+
+def streaming(items, top_k=50):
+    acc = aggregation.StreamingAggregate(top_k=top_k).consume(items)
+    return acc.summary()["user_count"], acc.conversations()
+
+
+def measure(fn, count):
+    gc.collect()
+    started = time.perf_counter()
+    users, top = fn(synthetic_items(count))
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    fn(synthetic_items(count))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, users, top
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregation memory/latency benchmark")
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--skip-materialize", action="store_true", help="Only run the streaming pass")
+    args = parser.parse_args()
+
+    # Generation cost alone, so it can be subtracted from the timings
+    started = time.perf_counter()
+    for _ in synthetic_items(args.items):
+        pass
+    generation = time.perf_counter() - started
+    print(f"{args.items:,} synthetic items, generation alone {generation:.1f}s")
+    print(f"{'approach':<12} {'wall (s)':>9} {'minus gen':>10} {'peak MB':>9}")
+
+    results = {}
+    for name, fn in (("materialize", materialize), ("streaming", streaming)):
+        if name == "materialize" and args.skip_materialize:
+            continue
+        elapsed, peak, users, top = measure(fn, args.items)
+        results[name] = (users, [c["timestamp"] for c in top])
+        print(f"{name:<12} {elapsed:>9.1f} {elapsed - generation:>10.1f} {peak / 1024 / 1024:>9.1f}")
+
+    if len(results) == 2:
+        (exact, exact_top), (estimate, top) = results["materialize"], results["streaming"]
+        print("latest conversations identical:", exact_top == top)
+        print(f"distinct users: exact {exact:,}, HyperLogLog {estimate:,} ({(estimate - exact) / exact:+.2%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Compare the read cost of dashboard timeframes on the session-logs table:
+full-table Scan (before) vs parallel Query on DayBucketIndex (after).
+
+Two modes:
+  estimate (default)  Size a synthetic year of conversations in memory and apply
+                      DynamoDB's read-unit rules (4 KB units, eventually consistent
+                      = 0.5 RCU, 1 MB pages). No AWS access needed.
+  live                Load the synthetic year into a scratch table (DynamoDB Local
+                      or a throwaway table) and report ConsumedCapacity returned
+                      by the real Scan/Query calls.
+
+Usage:
+  python scripts/benchmark_session_reads.py
+  python scripts/benchmark_session_reads.py --per-day 500 --shards 4
+  python scripts/benchmark_session_reads.py --live --endpoint-url http://localhost:8000
+"""
+
+import argparse
+import math
+import random
+import sys
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+TABLE_NAME = "BenchmarkSessionLogs"
+INDEX_NAME = "DayBucketIndex"
+
+# Mirrors nonKeyAttributes of DayBucketIndex in cdk_backend-stack.ts
+INDEX_ATTRIBUTES = {
+    "session_id", "timestamp", "day_bucket", "original_ts",
+    "query", "response", "location", "category", "category_source",
+    "sentiment", "satisfaction_score", "sample_rate", "user_role",
+}
+
+CATEGORIES = ["Course Registration", "Certification", "Training Materials", "Technical Support", "Other"]
+LOCATIONS = ["Maryland", "Virginia", "Texas", "California", "New York", ""]
+ROLES = ["instructor", "internal_staff", "learner"]
+WORDS = ("mental health first aid course instructor certification training session "
+         "renew login portal materials manual schedule cancel register fee group").split()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Synthetic data (same shape as logclassifier.build_item)
+# ──────────────────────────────────────────────────────────────────────────────
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def synthetic_year(per_day, shards, end, seed=7):
+    rng = random.Random(seed)
+    start = end - timedelta(days=365)
+    for day in range(365):
+        day_start = start + timedelta(days=day)
+        for _ in range(per_day):
+            session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            ts = (day_start + timedelta(seconds=rng.randrange(86400))).isoformat()
+            sampled = rng.random() < 0.25
+            item = {
+                "session_id": session_id,
+                "timestamp": f"{ts}#{rng.getrandbits(32):08x}",
+                "original_ts": ts,
+                "day_bucket": f"{ts[:10]}#{zlib.crc32(session_id.encode()) % shards}",
+                "query": _text(rng, rng.randint(6, 25)),
+                "response": _text(rng, rng.randint(80, 260)),
+                "location": rng.choice(LOCATIONS),
+                "category": rng.choice(CATEGORIES),
+                "category_source": rng.choice(["rules", "model", "cache", "llm"]),
+                "sentiment_sampled": sampled,
+                "sample_rate": Decimal("0.25"),
+                "user_role": rng.choice(ROLES),
+            }
+            if sampled:
+                item["sentiment"] = rng.choice(["positive", "neutral", "negative"])
+                item["satisfaction_score"] = Decimal(rng.randint(20, 100))
+                item["sentiment_reason"] = _text(rng, 15)
+            yield item
+
+
+def timeframes(end):
+    day = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "today":   (day, end),
+        "weekly":  (day - timedelta(days=6), end),
+        "monthly": (day - timedelta(days=29), end),
+        "yearly":  (end - timedelta(days=365), end),
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Estimate mode
+# ──────────────────────────────────────────────────────────────────────────────
+def item_size(item, attributes=None):
+    """Approximate DynamoDB item size: attribute names plus values."""
+    size = 0
+    for name, value in item.items():
+        if attributes is not None and name not in attributes:
+            continue
+        size += len(name.encode("utf-8"))
+        if isinstance(value, bool):
+            size += 1
+        elif isinstance(value, (int, float, Decimal)):
+            size += len(str(value).lstrip("-").replace(".", "")) // 2 + 1
+        else:
+            size += len(str(value).encode("utf-8"))
+    return size
+
+
+def paged_rcus(sizes):
+    """Eventually consistent reads: 0.5 RCU per 4 KB, rounded per 1 MB page."""
+    rcus, page = 0.0, 0
+    for size in sizes:
+        if page + size > 1024 * 1024:
+            rcus += math.ceil(page / 4096) * 0.5
+            page = 0
+        page += size
+    if page:
+        rcus += math.ceil(page / 4096) * 0.5
+    return rcus
+
+
+def estimate(items, shards, end):
+    table_sizes = [item_size(it) for it in items]
+    scan_rcus = paged_rcus(table_sizes)  # a Scan reads every item, whatever the filter
+
+    partitions = {}
+    for it in items:
+        partitions.setdefault(it["day_bucket"], []).append(it)
+
+    rows = []
+    for name, (start, stop) in timeframes(end).items():
+        start_iso, stop_iso = start.isoformat(), stop.isoformat()
+        day, query_rcus, queries, matched = start, 0.0, 0, 0
+        while day <= stop:
+            for shard in range(shards):
+                queries += 1
+                hits = [it for it in partitions.get(f"{day:%Y-%m-%d}#{shard}", [])
+                        if start_iso <= it["original_ts"] <= stop_iso]
+                matched += len(hits)
+                # Every Query costs at least 0.5 RCU, even when empty
+                query_rcus += max(paged_rcus(item_size(it, INDEX_ATTRIBUTES) for it in hits), 0.5)
+            day += timedelta(days=1)
+        rows.append((name, matched, scan_rcus, queries, query_rcus))
+    return sum(table_sizes), rows
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+#  Live mode
+# ──────────────────────────────────────────────────────────────────────────────
+def live(items, shards, end, endpoint_url, region):
+    import boto3
+    from boto3.dynamodb.conditions import Attr, Key
+
+    ddb = boto3.resource("dynamodb", endpoint_url=endpoint_url, region_name=region)
+    client = ddb.meta.client
+    if TABLE_NAME in client.list_tables()["TableNames"]:
+        ddb.Table(TABLE_NAME).delete()
+        client.get_waiter("table_not_exists").wait(TableName=TABLE_NAME)
+    table = ddb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "session_id", "KeyType": "HASH"},
+                   {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": n, "AttributeType": "S"}
+                              for n in ("session_id", "timestamp", "day_bucket", "original_ts")],
+        GlobalSecondaryIndexes=[{
+            "IndexName": INDEX_NAME,
+            "KeySchema": [{"AttributeName": "day_bucket", "KeyType": "HASH"},
+                          {"AttributeName": "original_ts", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "INCLUDE",
+                           "NonKeyAttributes": sorted(INDEX_ATTRIBUTES - {"session_id", "timestamp", "day_bucket", "original_ts"})},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+
+    print(f"Loading {len(items)} items into {TABLE_NAME}...", file=sys.stderr)
+    with table.batch_writer() as writer:
+        for it in items:
+            writer.put_item(Item=it)
+
+    def consumed(resp):
+        return resp.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+
+    rows = []
+    for name, (start, stop) in timeframes(end).items():
+        start_iso, stop_iso = start.isoformat(), stop.isoformat()
+        kwargs = {"FilterExpression": Attr("original_ts").between(start_iso, stop_iso),
+                  "ReturnConsumedCapacity": "TOTAL"}
+        scan_rcus, matched = 0.0, 0
+        while True:
+            resp = table.scan(**kwargs)
+            scan_rcus += consumed(resp)
+            matched += len(resp.get("Items", []))
+            if "LastEvaluatedKey" not in resp:
+                break
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+        day, query_rcus, queries = start, 0.0, 0
+        while day <= stop:
+            for shard in range(shards):
+                kwargs = {"IndexName": INDEX_NAME, "ReturnConsumedCapacity": "TOTAL",
+                          "KeyConditionExpression": Key("day_bucket").eq(f"{day:%Y-%m-%d}#{shard}")
+                          & Key("original_ts").between(start_iso, stop_iso)}
+                while True:
+                    queries += 1
+                    resp = table.query(**kwargs)
+                    query_rcus += consumed(resp)
+                    if "LastEvaluatedKey" not in resp:
+                        break
+                    kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+            day += timedelta(days=1)
+        rows.append((name, matched, scan_rcus, queries, query_rcus))
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'timeframe':<10} {'items':>8} {'scan RCU':>10} {'queries':>8} {'query RCU':>10} {'saving':>8}")
+    for name, matched, scan_rcus, queries, query_rcus in rows:
+        saving = f"{scan_rcus / query_rcus:.0f}x" if query_rcus else "-"
+        print(f"{name:<10} {matched:>8} {scan_rcus:>10.1f} {queries:>8} {query_rcus:>10.1f} {saving:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan vs DayBucketIndex read-cost benchmark")
+    parser.add_argument("--per-day", type=int, default=300, help="Synthetic conversations per day")
+    parser.add_argument("--shards", type=int, default=4, help="DAY_BUCKET_SHARDS")
+    parser.add_argument("--live", action="store_true", help="Measure against a real table instead of estimating")
+    parser.add_argument("--endpoint-url", help="e.g. http://localhost:8000 for DynamoDB Local")
+    parser.add_argument("--region", default="us-east-1")
+    args = parser.parse_args()
+
+    end = datetime(2026, 6, 30, 15, 0, 0)
+    items = list(synthetic_year(args.per_day, args.shards, end))
+    print(f"Synthetic year: {len(items)} items, {args.per_day}/day, {args.shards} shards/day")
+
+    if args.live:
+        print_rows(live(items, args.shards, end, args.endpoint_url, args.region))
+    else:
+        total_bytes, rows = estimate(items, args.shards, end)
+        print(f"Table size ~{total_bytes / 1024 / 1024:.1f} MB (estimated)")
+        print_rows(rows)
+
+
+if __name__ == "__main__":
+    main()
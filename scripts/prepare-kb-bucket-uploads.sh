@@ -0,0 +1,68 @@
+#!/bin/bash
+
+# Prepare the knowledge base bucket for direct-to-S3 upload sessions
+# national-council-s3-pdfs is imported into the CDK stack (not created by it), so
+# its CORS and lifecycle settings are managed here. Manage Documents PUTs file
+# parts to presigned S3 URLs and needs:
+#   - a CORS rule allowing PUT from the browser and exposing the ETag header
+#   - a lifecycle rule aborting multipart uploads that were never completed
+# Existing CORS and lifecycle rules are kept; the two rules below are added or replaced by ID.
+
+set -e
+
+BUCKET="${KB_BUCKET:-national-council-s3-pdfs}"
+ALLOWED_ORIGIN="${UPLOAD_ALLOWED_ORIGIN:-*}"
+
+# Colors for output
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+if ! command -v aws &> /dev/null; then
+    echo -e "${RED}ERROR: AWS CLI is not installed${NC}"
+    exit 1
+fi
+
+TMP=$(mktemp -d)
+trap 'rm -rf "$TMP"' EXIT
+
+# ── CORS ─────────────────────────────────────────────────────────────────────
+aws s3api get-bucket-cors --bucket "$BUCKET" > "$TMP/cors.json" 2>/dev/null || echo '{"CORSRules": []}' > "$TMP/cors.json"
+python3 - "$TMP/cors.json" "$ALLOWED_ORIGIN" <<'EOF'
+import json, sys
+path, origin = sys.argv[1], sys.argv[2]
+config = json.load(open(path))
+rules = [r for r in config.get("CORSRules", []) if r.get("ID") != "kb-upload-sessions"]
+rules.append({
+    "ID": "kb-upload-sessions",
+    "AllowedMethods": ["PUT"],
+    "AllowedOrigins": [origin],
+    "AllowedHeaders": ["*"],
+    "ExposeHeaders": ["ETag"],
+    "MaxAgeSeconds": 3000,
+})
+json.dump({"CORSRules": rules}, open(path, "w"))
+EOF
+echo -e "${YELLOW}Setting CORS on $BUCKET (PUT from $ALLOWED_ORIGIN, exposing ETag)...${NC}"
+aws s3api put-bucket-cors --bucket "$BUCKET" --cors-configuration "file://$TMP/cors.json"
+echo -e "${GREEN}✓${NC} CORS rule kb-upload-sessions in place"
+
+# ── Lifecycle ────────────────────────────────────────────────────────────────
+aws s3api get-bucket-lifecycle-configuration --bucket "$BUCKET" > "$TMP/lifecycle.json" 2>/dev/null || echo '{"Rules": []}' > "$TMP/lifecycle.json"
+python3 - "$TMP/lifecycle.json" <<'EOF'
+import json, sys
+path = sys.argv[1]
+config = json.load(open(path))
+rules = [r for r in config.get("Rules", []) if r.get("ID") != "abort-incomplete-uploads"]
+rules.append({
+    "ID": "abort-incomplete-uploads",
+    "Status": "Enabled",
+    "Filter": {},
+    "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": 1},
+})
+json.dump({"Rules": rules}, open(path, "w"))
+EOF
+echo -e "${YELLOW}Setting lifecycle on $BUCKET (abort unfinished uploads after 1 day)...${NC}"
+aws s3api put-bucket-lifecycle-configuration --bucket "$BUCKET" --lifecycle-configuration "file://$TMP/lifecycle.json"
+echo -e "${GREEN}✓${NC} Lifecycle rule abort-incomplete-uploads in place"
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Feed recorded CloudWatch Logs subscription payloads through the sessionLogs
+streaming consumer (sessionLogs/log_stream.py), writing to a local directory
+in the same session_logs/YYYY-MM-DD/ layout it uses in S3: compressed NDJSON
+parts plus a _manifest/ entry per part. Needs boto3 installed (for botocore).
+
+Each input file holds one delivery, either as the Lambda event
+({"awslogs": {"data": ...}}, e.g. captured from a test invoke) or as the
+already-decoded batch ({"messageType", "logEvents", ...}).
+
+  --sample FILE       first write a synthetic recorded event to FILE
+  --compression zstd  write zstd parts (needs pyarrow) instead of gzip
+
+Usage:
+  python scripts/replay_log_subscription.py --out /tmp/session-logs --sample /tmp/event.json /tmp/event.json
+  python scripts/replay_log_subscription.py --out /tmp/session-logs recorded/*.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "cdk_backend", "lambda", "sessionLogs"))
+import log_stream  # noqa: E402
+
+
+class LocalS3:
+    """The S3 calls ndjson_writer makes, against a local directory."""
+
+    def __init__(self, root):
+        self.root, self.uploads = root, {}
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def put_object(self, Bucket, Key, Body, **_):
+        os.makedirs(os.path.dirname(self._path(Key)), exist_ok=True)
+        with open(self._path(Key), "wb") as f:
+            f.write(Body.encode("utf-8") if isinstance(Body, str) else Body)
+
+    def create_multipart_upload(self, Bucket, Key, **_):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": str(PartNumber)}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.put_object(Bucket, Key, b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"]))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+
+def sample_event(events=20, seed_ms=None) -> dict:
+    now_ms = seed_ms or int(time.time() * 1000)
+    log_events = [{"id": f"{now_ms}{n:04d}", "timestamp": now_ms + n, "message": json.dumps({
+        "session_id": f"session-{n % 5}",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now_ms / 1000)),
+        "query": f"sample question {n}",
+        "response": f"sample answer {n}",
+        "user_role": "learner",
+        "escalated": False,
+    })} for n in range(events)]
+    log_events.append({"id": f"{now_ms}9999", "timestamp": now_ms, "message": "END RequestId: sample"})
+    return log_stream.encode({
+        "messageType": "DATA_MESSAGE",
+        "logGroup": "/aws/lambda/chatResponseHandler",
+        "logStream": "sample",
+        "subscriptionFilters": ["SessionLogsSubscription"],
+        "logEvents": log_events,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="directory standing in for the logs bucket")
+    parser.add_argument("--sample", help="write a synthetic recorded event to this file first")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default="gzip")
+    parser.add_argument("payloads", nargs="+", help="recorded subscription payload files")
+    args = parser.parse_args()
+
+    if args.sample:
+        with open(args.sample, "w") as f:
+            json.dump(sample_event(), f)
+
+    s3 = LocalS3(args.out)
+
+    total = 0
+    for path in args.payloads:
+        with open(path) as f:
+            payload = json.load(f)
+        event = payload if "awslogs" in payload else log_stream.encode(payload)
+        result = log_stream.ingest(event, s3, "local", compression=args.compression)
+        total += result["log_count"]
+        for key in result["keys"]:
+            print(f"{path} -> {os.path.join(args.out, key)}")
+    print(f"{total} session records from {len(args.payloads)} payloads")
+
+
+if __name__ == "__main__":
+    main()